@@ -0,0 +1,67 @@
+"""Клавиатуры: сборка через ``InlineKeyboardBuilder`` против кэша.
+
+Для нескольких построителей из ``bot.keyboards.inline`` замеряется среднее
+время вызова без кэша (исходная функция) и через ``cached_keyboard``, то
+есть глубокая копия готовой разметки. Запуск из корня репозитория::
+
+    python benchmarks/keyboards.py --calls 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bot.keyboards import inline  # noqa: E402
+
+CASES = {
+    "ik_add_or_delete": (inline.ik_add_or_delete, (3, 10), {"back_to": "info"}),
+    "ik_num_matrix_users": (inline.ik_num_matrix_users, (5,), {}),
+    "ik_cancel_action": (inline.ik_cancel_action, (), {}),
+}
+
+
+async def _per_call_us(
+    func: Callable[..., Awaitable[Any]],
+    args: tuple[Any, ...],
+    kwargs: dict[str, Any],
+    calls: int,
+) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        await func(*args, **kwargs)
+    return (time.perf_counter() - started) / calls * 1_000_000
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+
+    results = {}
+    for name, (cached, call_args, call_kwargs) in CASES.items():
+        await cached(*call_args, **call_kwargs)
+        results[name] = {
+            "build_us": round(
+                await _per_call_us(
+                    cached.__wrapped__, call_args, call_kwargs, args.calls
+                ),
+                1,
+            ),
+            "cached_us": round(
+                await _per_call_us(cached, call_args, call_kwargs, args.calls), 1
+            ),
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
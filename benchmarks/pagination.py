@@ -0,0 +1,97 @@
+"""Листание списков: старый цикл с уменьшением страницы против ``Paginator``.
+
+Старый ``watch_data`` рендерил страницу и, если она длиннее лимита
+сообщения, уменьшал размер страницы на одну строку и рендерил заново.
+``Paginator`` рендерит строки один раз и строит границы страниц за один
+проход. Замеряется листание всех страниц списка из ``--rows`` строк:
+
+* ``short`` - короткие строки, страница упирается в ``per_page``;
+* ``long`` - длинные строки, страница упирается в лимит длины, и старый
+  цикл перерендеривает ее много раз (и, считая страницы по ``per_page``,
+  часть строк вообще не показывает).
+
+Запуск из корня репозитория::
+
+    python benchmarks/pagination.py --rows 10000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bot.utils.pagination import MAX_PAGE_LENGTH, Paginator  # noqa: E402
+
+SEP = "\n"
+
+
+def _legacy_page(data: list[str], page: int, q_string_per_page: int) -> str:
+    """Копия ``Function.watch_data`` до перехода на ``Paginator``."""
+    q = max(1, q_string_per_page)
+    data_enumerate = list(enumerate(data))
+    while True:
+        data_ = data_enumerate[(page - 1) * q : page * q]
+        s = "".join(f"{ind + 1}) {item}{SEP}" for ind, item in data_)
+        if len(s) <= MAX_PAGE_LENGTH or q == 1:
+            return s
+        q -= 1
+
+
+def _legacy(data: list[str], per_page: int) -> int:
+    # Старый код считал страницы как ceil(len / per_page)
+    pages = -(-len(data) // per_page)
+    return sum(len(_legacy_page(data, page, per_page)) for page in range(1, pages + 1))
+
+
+def _paginator(data: list[str], per_page: int) -> int:
+    paginator = Paginator.from_rows(
+        (f"{ind}) {item}{SEP}" for ind, item in enumerate(data, 1)), per_page
+    )
+    return sum(len(paginator.render(page)) for page in range(1, paginator.pages + 1))
+
+
+def _measure(
+    func: Callable[[list[str], int], int],
+    data: list[str],
+    per_page: int,
+    repeat: int,
+) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(data, per_page)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--per-page", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    datasets = {
+        "short": [f"user{i:06d}" for i in range(args.rows)],
+        "long": [f"user{i:06d} " + "x" * 300 for i in range(args.rows)],
+    }
+    results = {}
+    for name, data in datasets.items():
+        results[name] = {
+            "legacy_ms": round(_measure(_legacy, data, args.per_page, args.repeat), 1),
+            "paginator_ms": round(
+                _measure(_paginator, data, args.per_page, args.repeat), 1
+            ),
+        }
+    summary = {"rows": args.rows, "per_page": args.per_page, **results}
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
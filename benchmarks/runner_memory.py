@@ -0,0 +1,127 @@
+"""Память и CPU: процесс на аккаунт против мультиплексного воркера.
+
+Запускает ``--sessions`` сессий-заглушек двумя способами и через
+``--seconds`` секунд снимает суммарный RSS и процессорное время:
+
+* ``process`` - отдельный интерпретатор на сессию, как ``UserbotSpec``;
+* ``multiplexed`` - один ``userbot_worker.py`` со всеми сессиями.
+
+Заглушка импортирует Telethon и создает клиент без подключения: так
+учитывается основная постоянная часть памяти юзербота, но не сетевая
+нагрузка. Запуск из корня репозитория::
+
+    python benchmarks/runner_memory.py --sessions 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import psutil
+
+ROOT = Path(__file__).resolve().parent.parent
+WORKER = ROOT / "bot" / "utils" / "userbot_worker.py"
+STUB = '''
+import asyncio
+from telethon import TelegramClient
+from telethon.sessions import StringSession
+
+
+async def run(path_session, api_id, api_hash):
+    client = TelegramClient(StringSession(), api_id, api_hash)
+    while True:
+        await asyncio.sleep(1)
+
+
+if __name__ == "__main__":
+    import sys
+    asyncio.run(run(sys.argv[1], int(sys.argv[2]), sys.argv[3]))
+'''
+
+
+def _usage(processes: list[psutil.Process]) -> tuple[float, float]:
+    rss = sum(p.memory_info().rss for p in processes) / 1024 / 1024
+    cpu = sum(sum(p.cpu_times()[:2]) for p in processes)
+    return rss, cpu
+
+
+async def _process_mode(workdir: Path, sessions: int, seconds: float) -> tuple:
+    children = [
+        await asyncio.create_subprocess_exec(
+            sys.executable, "stub_userbot.py", f"s{i}", "1", "hash", cwd=workdir
+        )
+        for i in range(sessions)
+    ]
+    try:
+        await asyncio.sleep(seconds)
+        return _usage([psutil.Process(child.pid) for child in children])
+    finally:
+        for child in children:
+            child.terminate()
+            await child.wait()
+
+
+async def _multiplexed_mode(workdir: Path, sessions: int, seconds: float) -> tuple:
+    socket = workdir / "worker.sock"
+    worker = await asyncio.create_subprocess_exec(
+        sys.executable,
+        str(WORKER),
+        "--socket",
+        str(socket),
+        "--entrypoint",
+        "stub_userbot:run",
+        cwd=workdir,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+    try:
+        while not socket.exists():
+            await asyncio.sleep(0.1)
+        for i in range(sessions):
+            reader, writer = await asyncio.open_unix_connection(str(socket))
+            request = {
+                "op": "start",
+                "phone": f"s{i}",
+                "path_session": f"s{i}",
+                "api_id": 1,
+                "api_hash": "hash",
+            }
+            writer.write(json.dumps(request).encode() + b"\n")
+            await reader.readline()
+            writer.close()
+        await asyncio.sleep(seconds)
+        return _usage([psutil.Process(worker.pid)])
+    finally:
+        worker.terminate()
+        await worker.wait()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        (workdir / "stub_userbot.py").write_text(STUB)
+        for mode, bench in (
+            ("process", _process_mode),
+            ("multiplexed", _multiplexed_mode),
+        ):
+            started = time.monotonic()
+            rss, cpu = await bench(workdir, args.sessions, args.seconds)
+            print(
+                f"{mode:>12}: {args.sessions} сессий, RSS {rss:.0f} МБ "
+                f"({rss / args.sessions:.1f} МБ на сессию), CPU {cpu:.2f} с "
+                f"за {time.monotonic() - started:.0f} с"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
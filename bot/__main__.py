@@ -1,10 +1,12 @@
 from __future__ import annotations
 
 import asyncio
+import contextlib
 import logging
 from asyncio import CancelledError
+from collections.abc import Awaitable, Callable
 from functools import partial
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
 import msgspec
 from aiogram import Bot, Dispatcher
@@ -20,15 +22,33 @@ from sqlalchemy.orm.session import sessionmaker
 from bot import handlers
 from bot.background_tasks import (
     antiflood_pack_users,
+    gc_finished_jobs,
     handle_job_from_userbot,
+    reconcile_sessions,
+    sample_userbot_resources,
     send_not_accepted_posts,
+    sync_vault_sessions,
 )
 from bot.db.base import close_db, create_db_session_pool, init_db
+from bot.db.diagnostics import SQLDiagnostics, scoped_task
+from bot.middlewares.edit_dedupe import EditDedupeMiddleware
+from bot.middlewares.fsm_cache import FSMCacheMiddleware
+from bot.middlewares.query_scope import QueryScopeMiddleware
 from bot.middlewares.throw_session import DBSessionMiddleware
 from bot.middlewares.throw_user import ThrowUserMiddleware
+from bot.middlewares.tracing import (
+    HandlerNameMiddleware,
+    TracingMiddleware,
+    TracingRequestMiddleware,
+)
 from bot.scheduler import default_scheduler as scheduler
 from bot.scheduler import logger as scheduler_logger
-from bot.settings import Settings
+from bot.settings import Settings, se
+from bot.utils import fn
+from bot.utils.leader import LeaderElection
+from bot.utils.resources import SAMPLE_INTERVAL_SECONDS
+from bot.utils.tracing import instrument_engine, instrument_redis
+from bot.webhook import WebhookServer
 
 if TYPE_CHECKING:
     from redis.asyncio import Redis
@@ -43,51 +63,123 @@ logger.setLevel(logging.INFO)
 async def startup(
     dispatcher: Dispatcher, bot: Bot, settings: Settings, redis: Redis
 ) -> None:
-    await bot.delete_webhook(drop_pending_updates=True)
-
     engine, db_session = await create_db_session_pool(settings)
+    instrument_engine(engine)
+    if settings.diagnostics.sql_enabled:
+        SQLDiagnostics(
+            slow_query_ms=settings.diagnostics.slow_query_ms,
+            repeat_threshold=settings.diagnostics.repeat_threshold,
+        ).install(engine)
 
     await init_db(engine)
 
     dispatcher.workflow_data.update(
         {"sessionmaker": db_session, "db_session_closer": partial(close_db, engine)}
     )
+    dispatcher.update.outer_middleware(
+        TracingMiddleware(slow_update_ms=settings.diagnostics.slow_update_ms)
+    )
+    if settings.diagnostics.sql_enabled:
+        dispatcher.update.outer_middleware(QueryScopeMiddleware())
     dispatcher.update.outer_middleware(DBSessionMiddleware(session_pool=db_session))
     dispatcher.update.outer_middleware(ThrowUserMiddleware())
+    dispatcher.update.outer_middleware(FSMCacheMiddleware())
+    for event_name, observer in dispatcher.observers.items():
+        if event_name not in ("update", "error"):
+            observer.middleware(HandlerNameMiddleware())
 
-    asyncio.create_task(
-        start_scheduler(
-            sessionmaker=db_session,  # pyright: ignore
-            bot=bot,
-            redis=redis,
-        )
-    )
+    fn.Manager.configure(redis, db_session)
+    duties = LeaderDuties(db_session, bot, redis)  # pyright: ignore
+    election = LeaderElection(redis, duties.start, duties.stop)
+    dispatcher["leader_election"] = asyncio.create_task(election.run())
 
     logger.info("Bot started")
 
 
 async def shutdown(dispatcher: Dispatcher) -> None:
+    # Ведущая реплика при отмене останавливает юзерботы и отдает ключ
+    election: asyncio.Task[None] = dispatcher["leader_election"]
+    election.cancel()
+    with contextlib.suppress(CancelledError):
+        await election
     await dispatcher["db_session_closer"]()
     logger.info("Bot stopped")
 
 
+class LeaderDuties:
+    """Работа ведущей реплики: юзерботы, планировщик и вызовы ведомых."""
+
+    def __init__(self, sessionmaker: sessionmaker, bot: Bot, redis: Redis) -> None:
+        self._sessionmaker = sessionmaker
+        self._bot = bot
+        self._redis = redis
+        self._tasks: list[asyncio.Task[Any]] = []
+
+    async def start(self) -> None:
+        fn.Manager.set_leader(True)
+        self._tasks = [
+            asyncio.create_task(fn.Manager.serve_calls()),
+            asyncio.create_task(fn.Manager.restore_connected(self._sessionmaker)),
+            asyncio.create_task(
+                start_scheduler(
+                    sessionmaker=self._sessionmaker, bot=self._bot, redis=self._redis
+                )
+            ),
+        ]
+
+    async def stop(self) -> None:
+        fn.Manager.set_leader(False)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Задачи регистрируются заново, когда реплика снова станет ведущей
+        scheduler.clear()
+        await fn.Manager.stop_all()
+
+
+def _task(func: Callable[..., Awaitable[None]]) -> Callable[..., Awaitable[None]]:
+    """Задача планировщика; с SQL-диагностикой - в своей области поиска N+1.
+
+    Оборачивается до ``.do()``: ``Job`` хранит ``functools.partial`` и берет
+    из него аргументы для логов.
+    """
+    return scoped_task(func) if se.diagnostics.sql_enabled else func
+
+
 async def start_scheduler(sessionmaker: sessionmaker, bot: Bot, redis: Redis) -> None:
     scheduler.every(15).seconds.do(
-        antiflood_pack_users,
+        _task(antiflood_pack_users),
         sessionmaker=sessionmaker,
         bot=bot,
         redis=redis,
     )
     scheduler.every(10).seconds.do(
-        send_not_accepted_posts,
+        _task(send_not_accepted_posts),
         sessionmaker=sessionmaker,
         bot=bot,
         redis=redis,
     )
     scheduler.every(5).seconds.do(
-        handle_job_from_userbot,
+        _task(handle_job_from_userbot),
         sessionmaker=sessionmaker,
         bot=bot,
+        redis=redis,
+    )
+    scheduler.every(10).minutes.do(
+        _task(gc_finished_jobs),
+        sessionmaker=sessionmaker,
+    )
+    scheduler.every(1).minutes.do(
+        _task(reconcile_sessions),
+        sessionmaker=sessionmaker,
+    )
+    scheduler.every(SAMPLE_INTERVAL_SECONDS).seconds.do(
+        _task(sample_userbot_resources),
+        redis=redis,
+    )
+    scheduler.every(se.vault.sync_interval_minutes).minutes.do(
+        _task(sync_vault_sessions),
     )
     while True:
         await scheduler.run_pending()
@@ -110,6 +202,8 @@ async def set_default_commands(bot: Bot) -> None:
                 command="delete_sessions",
                 description="удалить все сессии",
             ),
+            BotCommand(command="import", description="импорт аккаунтов"),
+            BotCommand(command="trace", description="время обработки апдейтов"),
         ]
     )
 
@@ -125,6 +219,10 @@ async def main() -> None:
         default=DefaultBotProperties(parse_mode="HTML"),
     )
     redis = await settings.redis_dsn()
+    instrument_redis(redis)
+    bot.session.middleware(EditDedupeMiddleware(redis))
+    # После дедупликации: пропущенные правки не считаются вызовами API
+    bot.session.middleware(TracingRequestMiddleware())
     storage = RedisStorage(
         redis=redis,
         key_builder=DefaultKeyBuilder(with_bot_id=True, with_destiny=True),
@@ -144,6 +242,14 @@ async def main() -> None:
     dp.shutdown.register(shutdown)
     await set_default_commands(bot)
 
+    if settings.webhook.url and not settings.webhook.secret:
+        raise RuntimeError("Для режима вебхука нужен WEBHOOK_SECRET")
+
+    if settings.webhook.url:
+        await WebhookServer(dp, bot, settings.webhook).serve(**dp.workflow_data)
+        return
+
+    await bot.delete_webhook(drop_pending_updates=True)
     await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
 
 
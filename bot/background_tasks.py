@@ -3,26 +3,30 @@ from __future__ import annotations
 import asyncio
 import html
 import logging
+import os
 from typing import Any, Final
 
 import msgpack
 from aiogram import Bot
 from aiogram.exceptions import TelegramAPIError
 from redis.asyncio import Redis
-from sqlalchemy import select
+from sqlalchemy import ColumnElement, delete, func, select, text, update
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy.orm import selectinload
 
 from bot.db.models import Bot as DBBot
-from bot.db.models import Job, UserAnalyzed, UserManager
+from bot.db.models import Job, JobStatus, UserAnalyzed, UserManager
 from bot.keyboards.inline import ik_tool_for_pack_users
 from bot.utils import fn
+from bot.utils.func import SESSION_SUFFIX
+from bot.utils.jobs import signal_jobs_done
+from bot.utils.redis_keys import REDIS_PREFIX, redis_key
+from bot.utils.resources import sampler
 
 logger = logging.getLogger(__name__)
 
 SessionFactory = async_sessionmaker[AsyncSession]
 
-REDIS_PREFIX: Final[str] = "manager_for_userbot"
 NOT_ACCEPTED_LAST_ID_KEY: Final[str] = f"{REDIS_PREFIX}:not_accepted:last_id"
 
 # Backward compatibility with legacy `key_builder()` keys.
@@ -36,9 +40,15 @@ USERBOT_JOB_TASKS: Final[tuple[str, ...]] = (
     "flood_wait_error",
 )
 
+# Завершенные задачи хранятся час, неотвеченные удаляются через сутки.
+FINISHED_JOB_RETENTION_SECONDS: Final[int] = 60 * 60
+JOB_PENDING_TTL_SECONDS: Final[int] = 24 * 60 * 60
+JOB_GC_BATCH: Final[int] = 500
 
-def _redis_key(*parts: str) -> str:
-    return ":".join((REDIS_PREFIX, *parts))
+# Сколько ждем возвращения пропавшего файла сессии перед удалением бота.
+SESSION_ORPHAN_GRACE_SECONDS: Final[int] = 10 * 60
+# Не больше стольких ботов без сессий удаляется за один проход.
+SESSION_ORPHAN_DELETE_LIMIT: Final[int] = 10
 
 
 async def _redis_get_int(redis: Redis, key: str) -> int | None:
@@ -250,6 +260,7 @@ async def _handle_single_job(
 async def handle_job_from_userbot(
     sessionmaker: SessionFactory,
     bot: Bot,
+    redis: Redis,
 ) -> None:
     async with sessionmaker() as session:
         rows = await session.scalars(
@@ -269,6 +280,9 @@ async def handle_job_from_userbot(
         for job in jobs:
             # Mark as processed even if sending fails to avoid duplicate notifications.
             job.answer = msgpack.packb(True, use_bin_type=True)
+            job.status = JobStatus.done.value
+            job.answered_at = func.now()
+            job.dedup_key = None
 
             db_bot = job.bot
             if db_bot is None:
@@ -290,6 +304,217 @@ async def handle_job_from_userbot(
                 logger.exception("Ошибка при обработке задания job_id=%s", job.id)
 
         await session.commit()
+    await signal_jobs_done(redis, [job.id for job in jobs])
+
+
+def _seconds_ago(seconds: int) -> ColumnElement:
+    return func.timestampadd(text("SECOND"), -seconds, func.now())
+
+
+async def _delete_jobs_in_batches(session: AsyncSession, *conditions: Any) -> int:
+    deleted = 0
+    while True:
+        ids = list(
+            (
+                await session.scalars(
+                    select(Job.id).where(*conditions).limit(JOB_GC_BATCH)
+                )
+            ).all()
+        )
+        if not ids:
+            return deleted
+        await session.execute(delete(Job).where(Job.id.in_(ids)))
+        await session.commit()
+        deleted += len(ids)
+        if len(ids) < JOB_GC_BATCH:
+            return deleted
+
+
+async def gc_finished_jobs(sessionmaker: SessionFactory) -> None:
+    """Удаляет завершенные задачи старше TTL и зависшие неотвеченные.
+
+    Юзербот только заполняет ``answer``. Время ответа ставит менеджер,
+    когда замечает ответ (``bot.utils.jobs.wait_for_job``); задачи, которых
+    никто не ждал, помечаются ``done`` здесь. Удаляются они на следующих
+    проходах, когда истечет ``FINISHED_JOB_RETENTION_SECONDS``.
+    """
+
+    async with sessionmaker() as session:
+        await session.execute(
+            update(Job)
+            .where(
+                Job.status == JobStatus.pending.value,
+                Job.answer.is_not(None),
+            )
+            .values(
+                status=JobStatus.done.value,
+                answered_at=func.now(),
+                dedup_key=None,
+            )
+        )
+        await session.commit()
+
+        done = await _delete_jobs_in_batches(
+            session,
+            Job.status == JobStatus.done.value,
+            Job.answered_at < _seconds_ago(FINISHED_JOB_RETENTION_SECONDS),
+        )
+        stale = await _delete_jobs_in_batches(
+            session,
+            Job.status == JobStatus.pending.value,
+            Job.created_at < _seconds_ago(JOB_PENDING_TTL_SECONDS),
+        )
+
+    if done or stale:
+        logger.info("GC задач: удалено завершенных %s, зависших %s", done, stale)
+
+
+def _session_file(path_session: str) -> str:
+    if not path_session.endswith(SESSION_SUFFIX):
+        path_session = f"{path_session}{SESSION_SUFFIX}"
+    return os.path.abspath(path_session)
+
+
+def _snapshot_session_dirs(directories: set[str]) -> dict[str, set[str]]:
+    """Снимок файлов в каталогах сессий (выполняется в потоке).
+
+    Отсутствующие каталоги и каталоги, которые не удалось прочитать, в
+    снимок не попадают: боты из них в этом проходе не трогаются. Пропавший
+    каталог - скорее несмонтированный том, чем удаленные сессии.
+    """
+    snapshot: dict[str, set[str]] = {}
+    for directory in directories:
+        try:
+            with os.scandir(directory) as entries:
+                snapshot[directory] = {
+                    entry.name for entry in entries if entry.is_file()
+                }
+        except FileNotFoundError:
+            logger.warning("Каталог сессий %s не найден, пропускаем", directory)
+        except OSError as exc:
+            logger.warning("Не удалось прочитать каталог сессий %s: %s", directory, exc)
+    return snapshot
+
+
+async def reconcile_sessions(sessionmaker: SessionFactory) -> None:
+    """Сверяет ``bots.path_session`` с файлами сессий на диске.
+
+    Пропавший файл сначала только помечается (``session_missing_since``),
+    бот удаляется, если файл не появился за ``SESSION_ORPHAN_GRACE_SECONDS``.
+    Пустой каталог при подключенных ботах из него не сверяется, за проход
+    удаляется не больше ``SESSION_ORPHAN_DELETE_LIMIT`` ботов.
+    """
+
+    async with sessionmaker() as session:
+        rows = (
+            await session.execute(
+                select(
+                    DBBot.id,
+                    DBBot.phone,
+                    DBBot.path_session,
+                    DBBot.session_missing_since,
+                    DBBot.is_connected,
+                    DBBot.session_data.is_not(None).label("in_vault"),
+                )
+            )
+        ).all()
+        if not rows:
+            return
+
+        files = {row.id: _session_file(row.path_session or "") for row in rows}
+        snapshot = await asyncio.to_thread(
+            _snapshot_session_dirs, {os.path.dirname(path) for path in files.values()}
+        )
+        for row in rows:
+            directory = os.path.dirname(files[row.id])
+            if (
+                row.is_connected
+                and not row.in_vault
+                and directory in snapshot
+                and not snapshot[directory]
+            ):
+                # Подключенный бот работает с файлом из этого каталога, значит
+                # пустой снимок - сбой тома, а не удаленные сессии
+                logger.warning(
+                    "Каталог сессий %s пуст при подключенных ботах, пропускаем",
+                    directory,
+                )
+                del snapshot[directory]
+
+        # Удалять можно только ботов из каталогов, сверенных в этом проходе
+        checked: list[int] = []
+        found: list[int] = []
+        missing: list[int] = []
+        for row in rows:
+            directory, name = os.path.split(files[row.id])
+            if directory not in snapshot:
+                continue
+            checked.append(row.id)
+            # Сессия из хранилища выкладывается на tmpfs только на время работы
+            present = row.in_vault or (
+                bool(row.path_session) and name in snapshot[directory]
+            )
+            if present and row.session_missing_since is not None:
+                found.append(row.id)
+            elif not present and row.session_missing_since is None:
+                missing.append(row.id)
+                logger.warning(
+                    "Сессия не найдена для бота %s (ID: %s), путь: %s",
+                    row.phone,
+                    row.id,
+                    files[row.id],
+                )
+
+        if found:
+            await session.execute(
+                update(DBBot)
+                .where(DBBot.id.in_(found))
+                .values(session_missing_since=None)
+            )
+        if missing:
+            await session.execute(
+                update(DBBot)
+                .where(DBBot.id.in_(missing))
+                .values(session_missing_since=func.now())
+            )
+
+        orphans = list(
+            (
+                await session.scalars(
+                    select(DBBot)
+                    .where(
+                        DBBot.id.in_(checked),
+                        DBBot.session_missing_since
+                        < _seconds_ago(SESSION_ORPHAN_GRACE_SECONDS),
+                    )
+                    .order_by(DBBot.session_missing_since.asc())
+                    .limit(SESSION_ORPHAN_DELETE_LIMIT)
+                )
+            ).all()
+        )
+        if orphans:
+            for bot in orphans:
+                await fn.Manager.stop_bot(bot.phone, bot_id=bot.id)
+                await session.delete(bot)
+            logger.info("Удалено %s ботов без сессий из базы данных", len(orphans))
+
+        if found or missing or orphans:
+            await session.commit()
+
+
+async def sample_userbot_resources(redis: Redis) -> None:
+    """Пишет CPU/RSS/FD процессов юзерботов в Redis и применяет лимиты."""
+    await sampler.run(redis)
+
+
+async def sync_vault_sessions() -> None:
+    """Сохраняет в хранилище снимки сессий работающих юзерботов."""
+    vault = fn.Manager.vault()
+    if vault is None:
+        return
+    synced = await vault.sync_running()
+    if synced:
+        logger.info("Синхронизировано сессий с хранилищем: %s", synced)
 
 
 def _format_pack_message(db_bot: DBBot, users: list[UserAnalyzed]) -> str:
@@ -328,7 +553,7 @@ async def antiflood_pack_users(
         if user_manager is None or not user_manager.is_antiflood_mode:
             return
 
-        last_pack_key = _redis_key("antiflood", "last_id", str(active_bot.id))
+        last_pack_key = redis_key("antiflood", "last_id", str(active_bot.id))
         legacy_pack_key = f"{LEGACY_REDIS_PREFIX}:antiflood_last_id:{active_bot.id}"
         last_user_id = await _redis_get_int_fallback(
             redis, last_pack_key, legacy_pack_key
@@ -0,0 +1,173 @@
+"""Диагностика SQL: медленные запросы с EXPLAIN и поиск N+1.
+
+Включается настройкой ``SQL_DIAGNOSTICS``. ``install`` вешает на движок
+слушатели ``before/after_cursor_execute``:
+
+* запрос дольше ``slow_query_ms`` пишется в лог с параметрами и планом:
+  для SELECT план снимается ``EXPLAIN`` на отдельном курсоре того же
+  соединения (строки исходного запроса драйвер уже буферизовал);
+* внутри ``query_scope`` (апдейт или задача планировщика) считаются
+  одинаковые тексты запросов; ``repeat_threshold`` повторов одного и того
+  же запроса - вероятный N+1, о нем одно предупреждение на область.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import dataclasses
+import functools
+import logging
+import time
+from collections import Counter
+from collections.abc import Awaitable, Callable, Iterator
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, Final, ParamSpec, TypeVar
+
+from sqlalchemy import event
+
+if TYPE_CHECKING:
+    from sqlalchemy.engine import Connection
+    from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+MAX_LOGGED_PARAMETERS: Final[int] = 500
+EXPLAIN_PREFIXES: Final[dict[str, str]] = {
+    "mysql": "EXPLAIN ",
+    "postgresql": "EXPLAIN ",
+    "sqlite": "EXPLAIN QUERY PLAN ",
+}
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+
+@dataclasses.dataclass
+class QueryScope:
+    name: str
+    statements: Counter[str] = dataclasses.field(default_factory=Counter)
+    reported: set[str] = dataclasses.field(default_factory=set)
+
+
+_current_scope: ContextVar[QueryScope | None] = ContextVar(
+    "query_scope", default=None
+)
+
+
+@contextlib.contextmanager
+def query_scope(name: str) -> Iterator[QueryScope]:
+    scope = QueryScope(name)
+    token = _current_scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _current_scope.reset(token)
+
+
+def scoped_task(
+    func: Callable[P, Awaitable[T]],
+) -> Callable[P, Awaitable[T]]:
+    """Задача планировщика в своей области поиска N+1."""
+
+    @functools.wraps(func)
+    async def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
+        with query_scope(f"task {func.__name__}"):
+            return await func(*args, **kwargs)
+
+    return wrapper
+
+
+def _shorten(value: Any) -> str:
+    text = repr(value)
+    if len(text) > MAX_LOGGED_PARAMETERS:
+        return text[:MAX_LOGGED_PARAMETERS] + "..."
+    return text
+
+
+def _explain(conn: Connection, statement: str, parameters: Any) -> str:
+    prefix = EXPLAIN_PREFIXES.get(conn.dialect.name)
+    if prefix is None or not statement.lstrip().upper().startswith("SELECT"):
+        return "-"
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        return "\n".join(" | ".join(map(str, row)) for row in cursor.fetchall())
+    except Exception as exc:  # noqa: BLE001
+        return f"не удалось снять план: {exc}"
+    finally:
+        cursor.close()
+
+
+class SQLDiagnostics:
+    def __init__(self, slow_query_ms: int, repeat_threshold: int) -> None:
+        self._slow_query = slow_query_ms / 1000
+        self._repeat_threshold = repeat_threshold
+
+    def _before_cursor_execute(
+        self,
+        conn: Connection,
+        cursor: Any,
+        statement: str,
+        parameters: Any,
+        context: Any,
+        executemany: bool,
+    ) -> None:
+        context._diagnostics_started = time.perf_counter()
+
+    def _after_cursor_execute(
+        self,
+        conn: Connection,
+        cursor: Any,
+        statement: str,
+        parameters: Any,
+        context: Any,
+        executemany: bool,
+    ) -> None:
+        started = getattr(context, "_diagnostics_started", None)
+        if started is not None:
+            elapsed = time.perf_counter() - started
+            if elapsed >= self._slow_query:
+                self._log_slow(conn, statement, parameters, executemany, elapsed)
+
+        scope = _current_scope.get()
+        if scope is None:
+            return
+        scope.statements[statement] += 1
+        count = scope.statements[statement]
+        if count >= self._repeat_threshold and statement not in scope.reported:
+            scope.reported.add(statement)
+            logger.warning(
+                "Вероятный N+1 в %s: запрос выполнен %s раз\n%s",
+                scope.name,
+                count,
+                statement,
+            )
+
+    def _log_slow(
+        self,
+        conn: Connection,
+        statement: str,
+        parameters: Any,
+        executemany: bool,
+        elapsed: float,
+    ) -> None:
+        plan = "-" if executemany else _explain(conn, statement, parameters)
+        scope = _current_scope.get()
+        logger.warning(
+            "Медленный запрос %.0f мс (%s)\n%s\nПараметры: %s\nEXPLAIN:\n%s",
+            elapsed * 1000,
+            scope.name if scope else "вне области",
+            statement,
+            _shorten(parameters),
+            plan,
+        )
+
+    def install(self, engine: AsyncEngine) -> None:
+        sync_engine = engine.sync_engine
+        event.listen(sync_engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", self._after_cursor_execute)
+        logger.info(
+            "Диагностика SQL включена: порог %.0f мс, N+1 от %s повторов",
+            self._slow_query * 1000,
+            self._repeat_threshold,
+        )
@@ -1,7 +1,8 @@
+from datetime import datetime
 from enum import Enum
 
-from sqlalchemy import BigInteger, ForeignKey, String
-from sqlalchemy.dialects.mysql import BLOB
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Index, String, func
+from sqlalchemy.dialects.mysql import BLOB, MEDIUMBLOB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base
@@ -35,10 +36,15 @@ class Bot(Base):
     chats: Mapped[list["MonitoringChat"]] = relationship(
         back_populates="bot", lazy="selectin", cascade="all, delete-orphan"
     )
+    # Только задачи, ожидающие ответа: отвеченные могут нести большие
+    # `answer`. Задачи ставятся через JobClient, поэтому коллекция грузится
+    # лишь по требованию. Все задачи бота удаляет ON DELETE CASCADE в БД.
     jobs: Mapped[list["Job"]] = relationship(
-        back_populates="bot",
-        lazy="selectin",
+        lazy="select",
         cascade="all, delete-orphan",
+        passive_deletes=True,
+        primaryjoin="and_(Bot.id == Job.bot_id, "
+        "Job.status == 'pending', Job.answer.is_(None))",
     )
     users_analyzed: Mapped[list["UserAnalyzed"]] = relationship(
         back_populates="bot", lazy="selectin"
@@ -51,17 +57,55 @@ class Bot(Base):
     path_session: Mapped[str] = mapped_column(String(100))
     is_connected: Mapped[bool] = mapped_column(default=False)
     is_started: Mapped[bool] = mapped_column(default=False)
+    # Проставляет фоновая сверка с каталогом сессий, когда файл пропал;
+    # по истечении grace-периода бот удаляется.
+    session_missing_since: Mapped[datetime | None] = mapped_column(
+        DateTime, nullable=True
+    )
+    # Файл сессии (zlib + Fernet) для хранилища сессий, см.
+    # bot.utils.session_vault. Отложенная загрузка: списки ботов его не читают.
+    session_data: Mapped[bytes | None] = mapped_column(
+        MEDIUMBLOB, nullable=True, deferred=True
+    )
+    session_synced_at: Mapped[datetime | None] = mapped_column(
+        DateTime, nullable=True
+    )
+
+    @property
+    def session_present(self) -> bool:
+        return self.session_missing_since is None
+
+
+class JobStatus(Enum):
+    pending = "pending"
+    done = "done"
 
 
 class Job(Base):
     __tablename__ = "jobs"
+    __table_args__ = (Index("ix_jobs_status_answered_at", "status", "answered_at"),)
 
-    bot_id: Mapped[int] = mapped_column(ForeignKey("bots.id"), nullable=False)
-    bot: Mapped[Bot] = relationship(back_populates="jobs")
+    bot_id: Mapped[int] = mapped_column(
+        ForeignKey("bots.id", ondelete="CASCADE"), nullable=False
+    )
+    bot: Mapped[Bot] = relationship(overlaps="jobs")
 
     task: Mapped[str] = mapped_column(String(50))
     task_metadata: Mapped[int] = mapped_column(BLOB, nullable=True)
     answer: Mapped[int] = mapped_column(BLOB, nullable=True)
+    status: Mapped[str] = mapped_column(
+        String(20),
+        default=JobStatus.pending.value,
+        server_default=JobStatus.pending.value,
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, server_default=func.now(), index=True
+    )
+    answered_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    # Заполнен, пока задача ждет ответа: одинаковые задачи не дублируются.
+    dedup_key: Mapped[str | None] = mapped_column(
+        String(40), unique=True, nullable=True
+    )
 
 
 class JobName(Enum):
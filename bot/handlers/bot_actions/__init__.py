@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from aiogram import Router
 
-from . import connect, delete, disconnect, lifecycle, navigation, select_bot
+from . import bulk, connect, delete, disconnect, lifecycle, navigation, select_bot
 
 router = Router()
 
@@ -13,4 +13,5 @@ router.include_routers(
     disconnect.router,
     delete.router,
     navigation.router,
+    bulk.router,
 )
@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from typing import TYPE_CHECKING, Final
+
+from aiogram import Router
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import CallbackQuery
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from bot.db.models import Bot, BotFolder, Job, UserManager
+from bot.handlers.bots import FOLDER_BACK_PREFIX
+from bot.keyboards.factories import BotFolderBulkFactory
+from bot.keyboards.inline import ik_back
+from bot.utils import fn
+
+if TYPE_CHECKING:
+    from aiogram.types import Message
+
+router = Router()
+logger = logging.getLogger(__name__)
+
+BULK_CONCURRENCY: Final[int] = 8
+PROGRESS_EDIT_INTERVAL: Final[float] = 1.5
+PENDING_MARK: Final[str] = "⏳"
+MAX_MESSAGE_LENGTH: Final[int] = 4000
+
+ACTION_TITLES: Final[dict[str, str]] = {
+    "connect": "Подключение",
+    "disconnect": "Отключение",
+    "start": "Старт",
+    "stop": "Стоп",
+}
+
+
+async def _connect(bot: Bot) -> str:
+    if bot.is_connected and await fn.Manager.bot_run(bot.phone):
+        return "✅ уже подключен"
+    pid = await fn.Manager.start_bot(
+        bot.phone, bot.path_session, bot.api_id, bot.api_hash, bot_id=bot.id
+    )
+    if pid < 0:
+        return "❌ не запустился"
+    if not await fn.Manager.wait_ready(bot.phone):
+        # Код подтверждения в массовом режиме не запросить
+        return "❌ нужна авторизация"
+    bot.is_connected = True
+    return "✅ подключен"
+
+
+async def _disconnect(bot: Bot) -> str:
+    await fn.Manager.stop_bot(phone=bot.phone, bot_id=bot.id)
+    bot.is_connected = False
+    bot.is_started = False
+    return "✅ отключен"
+
+
+async def _start(bot: Bot) -> str:
+    if not bot.is_connected:
+        return "❌ не подключен"
+    bot.is_started = True
+    return "✅ 🟢"
+
+
+async def _stop(bot: Bot) -> str:
+    bot.is_started = False
+    return "✅ 🔴"
+
+
+ACTIONS: Final[dict[str, Callable[[Bot], Awaitable[str]]]] = {
+    "connect": _connect,
+    "disconnect": _disconnect,
+    "start": _start,
+    "stop": _stop,
+}
+
+
+class _Progress:
+    """Одно сообщение с результатами, правки не чаще PROGRESS_EDIT_INTERVAL."""
+
+    def __init__(self, message: Message, title: str, bots: list[Bot]) -> None:
+        self._message = message
+        self._title = title
+        self._results = {bot.id: PENDING_MARK for bot in bots}
+        self._labels = {bot.id: f"{bot.phone} ({bot.name or '🌀'})" for bot in bots}
+        self._last_edit = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def render(self) -> str:
+        done = sum(result != PENDING_MARK for result in self._results.values())
+        lines = [f"{self._title}: {done}/{len(self._results)}", ""]
+        lines.extend(
+            f"{self._labels[bot_id]} - {result}"
+            for bot_id, result in self._results.items()
+        )
+        text = "\n".join(lines)
+        if len(text) > MAX_MESSAGE_LENGTH:
+            text = text[: MAX_MESSAGE_LENGTH - 1].rsplit("\n", 1)[0] + "\n…"
+        return text
+
+    async def update(self, bot_id: int, result: str) -> None:
+        self._results[bot_id] = result
+        if time.monotonic() - self._last_edit < PROGRESS_EDIT_INTERVAL:
+            return
+        async with self._lock:
+            if time.monotonic() - self._last_edit < PROGRESS_EDIT_INTERVAL:
+                return
+            self._last_edit = time.monotonic()
+            with contextlib.suppress(TelegramBadRequest):
+                await self._message.edit_text(self.render())
+
+    async def finish(self, back_to: str) -> None:
+        async with self._lock:
+            await self._message.edit_text(
+                self.render(), reply_markup=await ik_back(back_to=back_to)
+            )
+
+
+@router.callback_query(BotFolderBulkFactory.filter())
+async def bulk_folder_action(
+    query: CallbackQuery,
+    callback_data: BotFolderBulkFactory,
+    session: AsyncSession,
+    user: UserManager,
+) -> None:
+    operation = ACTIONS.get(callback_data.action)
+    if operation is None:
+        await query.answer("Неизвестное действие", show_alert=True)
+        return
+
+    folder_id = callback_data.folder_id
+    stmt = select(Bot).where(Bot.user_manager_id == user.id).order_by(Bot.id.asc())
+    if folder_id == 0:
+        stmt = stmt.where(Bot.folder_id.is_(None))
+        back_to = "bots_no_folder"
+    else:
+        folder = await session.scalar(
+            select(BotFolder).where(
+                BotFolder.id == folder_id,
+                BotFolder.user_manager_id == user.id,
+            )
+        )
+        if not folder:
+            await query.answer("Папка не найдена", show_alert=True)
+            return
+        stmt = stmt.where(Bot.folder_id == folder.id)
+        back_to = f"{FOLDER_BACK_PREFIX}{folder.id}"
+
+    bots = list((await session.scalars(stmt)).all())
+    if not bots:
+        await query.answer("В папке нет ботов", show_alert=True)
+        return
+
+    await query.answer()
+    progress = _Progress(
+        query.message,  # pyright: ignore
+        ACTION_TITLES[callback_data.action],
+        bots,
+    )
+    await query.message.edit_text(progress.render())
+
+    semaphore = asyncio.Semaphore(BULK_CONCURRENCY)
+
+    async def _run(bot: Bot) -> None:
+        async with semaphore:
+            try:
+                result = await operation(bot)
+            except Exception:  # noqa: BLE001
+                logger.exception(
+                    "Массовое действие %s для %s", callback_data.action, bot.phone
+                )
+                result = "❌ ошибка"
+        await progress.update(bot.id, result)
+
+    await asyncio.gather(*(_run(bot) for bot in bots))
+
+    if callback_data.action == "disconnect":
+        await session.execute(
+            delete(Job).where(Job.bot_id.in_([bot.id for bot in bots]))
+        )
+    await session.commit()
+    await progress.finish(back_to)
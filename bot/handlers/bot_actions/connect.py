@@ -1,7 +1,7 @@
 from __future__ import annotations
 
-import asyncio
 import logging
+from typing import TYPE_CHECKING
 
 from aiogram import F, Router
 from aiogram.fsm.context import FSMContext
@@ -20,6 +20,9 @@ from bot.states.main import BotState, UserState
 from bot.utils import fn
 from bot.handlers import bots as bots_handlers
 
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
 router = Router()
 logger = logging.getLogger(__name__)
 
@@ -49,13 +52,13 @@ async def connect_bot(
         bot.path_session,
         bot.api_id,
         bot.api_hash,
+        bot_id=bot.id,
     )
     await query.message.edit_text(
         "Пытаемся подключить Бота с уже существующей сессией..."
     )
 
-    await asyncio.sleep(2)
-    if await fn.Manager.bot_run(bot.phone):
+    if await fn.Manager.wait_ready(bot.phone):
         bot.is_connected = True
         await session.commit()
         await query.message.edit_text(
@@ -80,9 +83,9 @@ async def connect_bot(
                 bot.path_session,
                 bot.api_id,
                 bot.api_hash,
+                bot_id=bot.id,
             )
-            await asyncio.sleep(2)
-            if await fn.Manager.bot_run(bot.phone):
+            if await fn.Manager.wait_ready(bot.phone):
                 bot.is_connected = True
                 await session.commit()
                 await query.message.edit_text(
@@ -157,6 +160,7 @@ async def move_bot_to_folder(
     state: FSMContext,
     session: AsyncSession,
     user: UserManager,
+    redis: Redis,
 ) -> None:
     data = await state.get_data()
     bot_id = data.get("bot_id")
@@ -195,6 +199,7 @@ async def move_bot_to_folder(
         session,
         state,
         user,
+        redis,
         old_folder_id=old_folder_id,
     )
 
@@ -226,6 +231,7 @@ async def _show_previous_folder(
     session: AsyncSession,
     state: FSMContext,
     user: UserManager,
+    redis: Redis,
     *,
     old_folder_id: int | None,
 ) -> None:
@@ -242,8 +248,9 @@ async def _show_previous_folder(
                 session,
                 state,
                 user,
+                redis,
                 folder_id=folder.id,
             )
             return
 
-    await bots_handlers.show_no_folder_bots(query, session, state, user)
+    await bots_handlers.show_no_folder_bots(query, session, state, user, redis)
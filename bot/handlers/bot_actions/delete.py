@@ -37,7 +37,9 @@ async def delete_bot_from_list(
         return
 
     user.bots.remove(bot)
-    await fn.Manager.stop_bot(phone=bot.phone, delete_session=True)
+    await fn.Manager.stop_bot(
+        phone=bot.phone, delete_session=True, bot_id=bot.id
+    )
     await session.commit()
     await fn.state_clear(state)
     await query.message.edit_text("Бот удален", reply_markup=await ik_main_menu(user))
@@ -42,15 +42,15 @@ async def disconnected_bot(
 
     bot.is_connected = False
     bot.is_started = False
-    await fn.Manager.stop_bot(phone=bot.phone)
+    await fn.Manager.stop_bot(phone=bot.phone, bot_id=bot.id)
     await session.execute(delete(Job).where(Job.bot_id == bot.id))
     await session.commit()
 
     back_to = data.get("bots_back_to", "bots_all")
     if back_to == "bots_all":
-        await bots_handlers.show_all_bots(query, session, state, user)
+        await bots_handlers.show_all_bots(query, session, state, user, redis)
     elif back_to == "bots_no_folder":
-        await bots_handlers.show_no_folder_bots(query, session, state, user)
+        await bots_handlers.show_no_folder_bots(query, session, state, user, redis)
     elif isinstance(back_to, str) and back_to.startswith(FOLDER_BACK_PREFIX):
         with contextlib.suppress(Exception):
             folder_id = int(back_to.removeprefix(FOLDER_BACK_PREFIX))
@@ -59,9 +59,10 @@ async def disconnected_bot(
                 session,
                 state,
                 user,
+                redis,
                 folder_id=folder_id,
             )
             return
-        await bots_handlers.show_all_bots(query, session, state, user)
+        await bots_handlers.show_all_bots(query, session, state, user, redis)
     else:
         await query.message.edit_text("Бот отключен", reply_markup=await ik_main_menu(user))
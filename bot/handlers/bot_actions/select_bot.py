@@ -12,6 +12,8 @@ from bot.db.models import UserManager
 from bot.keyboards.factories import BotFactory
 from bot.keyboards.inline import ik_action_with_bot, ik_connect_bot
 from bot.states.main import BotState
+from bot.utils import fn
+from bot.utils.resources import latest_sample
 
 if TYPE_CHECKING:
     from redis.asyncio import Redis
@@ -39,8 +41,15 @@ async def manage_bot(
     back_to = data.get("bots_back_to", "bots_all")
 
     if bot.is_connected:
+        text = "Выберите действие"
+        status = await fn.Manager.status(bot.phone)
+        sample = await latest_sample(redis, status.name) if status else None
+        if sample:
+            text += f"\n\n{sample.describe()}"
+            if status and status.name != bot.phone:
+                text += f" ({status.name})"
         await query.message.edit_text(
-            "Выберите действие",
+            text,
             reply_markup=await ik_action_with_bot(back_to=back_to),
         )
     else:
@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import logging
-import os
 from typing import TYPE_CHECKING
 
 from aiogram import F, Router
@@ -10,9 +9,8 @@ from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery, Message
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
-from bot.db.models import Bot, BotFolder, Job, JobName, UserManager
+from bot.db.models import Bot, BotFolder, JobName, UserManager
 from bot.keyboards.factories import (
     BackFactory,
     BotFolderDeleteFactory,
@@ -22,9 +20,10 @@ from bot.keyboards.inline import ik_available_bots, ik_back, ik_bot_folder_list
 from bot.settings import se
 from bot.states.main import BotFolderState
 from bot.utils import fn
+from bot.utils.jobs import JobClient
 
 if TYPE_CHECKING:
-    pass
+    from redis.asyncio import Redis
 
 router = Router()
 logger = logging.getLogger(__name__)
@@ -33,58 +32,12 @@ FOLDER_BACK_PREFIX = "bots_folder_"
 LIST_BACK_TO = "bots"
 
 
-async def _cleanup_bots_without_sessions(
-    bots: list[Bot],
-    session: AsyncSession,
-) -> tuple[list[Bot], int]:
-    """Удаляет ботов без файлов сессий из базы данных.
-
-    Returns:
-        tuple: (список валидных ботов, количество удаленных ботов)
-    """
-    valid_bots = []
-    bots_to_delete = []
-
-    for bot in bots:
-        # Проверяем существование файла сессии
-        # path_session содержит полный путь или относительный путь к .session файлу
-        session_path = bot.path_session
-        if not session_path:
-            bots_to_delete.append(bot)
-            continue
-
-        # Добавляем расширение .session если его нет
-        if not session_path.endswith(".session"):
-            session_path = f"{session_path}.session"
-
-        # Проверяем существование файла
-        if os.path.exists(session_path):
-            valid_bots.append(bot)
-        else:
-            bots_to_delete.append(bot)
-            logger.warning(
-                "Сессия не найдена для бота %s (ID: %s), путь: %s",
-                bot.phone,
-                bot.id,
-                session_path,
-            )
-
-    # Удаляем ботов без сессий из базы
-    deleted_count = len(bots_to_delete)
-    if bots_to_delete:
-        for bot in bots_to_delete:
-            await session.delete(bot)
-        await session.commit()
-        logger.info("Удалено %s ботов без сессий из базы данных", deleted_count)
-
-    return valid_bots, deleted_count
-
-
 async def _show_bots(
     query: CallbackQuery,
     session: AsyncSession,
     state: FSMContext,
     user: UserManager,
+    redis: Redis,
     *,
     folder_id: int | None,
     title: str,
@@ -94,7 +47,6 @@ async def _show_bots(
 ) -> None:
     stmt = (
         select(Bot)
-        .options(selectinload(Bot.jobs))
         .where(Bot.user_manager_id == user.id)
         .order_by(
             Bot.is_connected.desc(),
@@ -111,15 +63,6 @@ async def _show_bots(
     add_to_folder_id = folder_id if folder_id is not None else None
     bots = list((await session.scalars(stmt)).all())
 
-    # Очищаем ботов без сессий
-    bots, deleted_count = await _cleanup_bots_without_sessions(bots, session)
-
-    # Уведомляем об удаленных ботах
-    if deleted_count > 0:
-        await query.answer(
-            f"Удалено {deleted_count} ботов (сессии не найдены)", show_alert=True
-        )
-
     await state.update_data(bots_back_to=actions_back_to)
 
     if not bots:
@@ -141,19 +84,23 @@ async def _show_bots(
                 raise
         return
 
+    # Статусы всех ботов одним запросом; в БД пишем только изменения
+    liveness = await fn.Manager.liveness(redis, [bot.phone for bot in bots])
+    jobs = JobClient(session)
+    changed = False
     for bot in bots:
-        is_connected = await fn.Manager.bot_run(bot.phone)
-        bot.is_connected = is_connected
+        is_connected = liveness[bot.phone]
+        if bot.is_connected != is_connected:
+            logger.info("Бот %s: is_connected -> %s", bot.phone, is_connected)
+            bot.is_connected = is_connected
+            changed = True
 
         if is_connected and not bot.name:
-            has_pending_job = any(
-                job.task == JobName.get_me_name.value and job.answer is None
-                for job in bot.jobs
-            )
-            if not has_pending_job:
-                bot.jobs.append(Job(task=JobName.get_me_name.value))
+            await jobs.submit(bot.id, JobName.get_me_name)
 
-    await session.commit()
+    # Задача на имя уже ждет ответа: коммитить нечего
+    if changed or jobs.created:
+        await session.commit()
     try:
         await query.message.edit_text(
             title,
@@ -161,6 +108,7 @@ async def _show_bots(
                 bots,
                 back_to=back_to,
                 add_to_folder_id=add_to_folder_id,
+                bulk_folder_id=folder_id,
             ),
         )
     except TelegramBadRequest as e:
@@ -201,12 +149,14 @@ async def show_all_bots(
     session: AsyncSession,
     state: FSMContext,
     user: UserManager,
+    redis: Redis,
 ) -> None:
     await _show_bots(
         query,
         session,
         state,
         user,
+        redis,
         folder_id=None,
         title="Все боты",
         empty_text="Ботов еще нет",
@@ -221,12 +171,14 @@ async def show_no_folder_bots(
     session: AsyncSession,
     state: FSMContext,
     user: UserManager,
+    redis: Redis,
 ) -> None:
     await _show_bots(
         query,
         session,
         state,
         user,
+        redis,
         folder_id=0,
         title="Боты без папки",
         empty_text="Ботов без папки еще нет",
@@ -241,12 +193,14 @@ async def show_folder_bots(
     session: AsyncSession,
     state: FSMContext,
     user: UserManager,
+    redis: Redis,
 ) -> None:
     await show_folder_bots_by_id(
         query,
         session,
         state,
         user,
+        redis,
         folder_id=callback_data.id,
     )
 
@@ -256,6 +210,7 @@ async def show_folder_bots_by_id(
     session: AsyncSession,
     state: FSMContext,
     user: UserManager,
+    redis: Redis,
     *,
     folder_id: int,
 ) -> None:
@@ -274,6 +229,7 @@ async def show_folder_bots_by_id(
         session,
         state,
         user,
+        redis,
         folder_id=folder.id,
         title=f"Папка: {folder.name}",
         empty_text="В папке пока нет ботов",
@@ -393,8 +349,9 @@ async def back_bots_all(
     session: AsyncSession,
     state: FSMContext,
     user: UserManager,
+    redis: Redis,
 ) -> None:
-    await show_all_bots(query, session, state, user)
+    await show_all_bots(query, session, state, user, redis)
 
 
 @router.callback_query(BackFactory.filter(F.to == "bots_no_folder"))
@@ -403,8 +360,9 @@ async def back_bots_no_folder(
     session: AsyncSession,
     state: FSMContext,
     user: UserManager,
+    redis: Redis,
 ) -> None:
-    await show_no_folder_bots(query, session, state, user)
+    await show_no_folder_bots(query, session, state, user, redis)
 
 
 @router.callback_query(BackFactory.filter(F.to.startswith(FOLDER_BACK_PREFIX)))
@@ -414,6 +372,7 @@ async def back_bots_folder(
     session: AsyncSession,
     state: FSMContext,
     user: UserManager,
+    redis: Redis,
 ) -> None:
     folder_id_str = callback_data.to.replace(FOLDER_BACK_PREFIX, "", 1)
     if not folder_id_str.isdigit():
@@ -425,5 +384,6 @@ async def back_bots_folder(
         session,
         state,
         user,
+        redis,
         folder_id=int(folder_id_str),
     )
@@ -8,7 +8,7 @@ from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery, Message
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-from bot.db.models import Bot, Job, JobName, MonitoringChat
+from bot.db.models import Bot, JobName, MonitoringChat
 from bot.keyboards.factories import (
     ArrowInfoFactory,
     BackFactory,
@@ -25,6 +25,7 @@ from bot.keyboards.inline import (
 from bot.settings import se
 from bot.states.main import BotState, InfoState
 from bot.utils import fn
+from bot.utils.jobs import JobClient
 
 if TYPE_CHECKING:
     pass
@@ -38,16 +39,11 @@ async def data_info_to_string(
     q_string_per_page: int = 10,
     current_page: int | None = None,
 ) -> tuple[str, int, int]:
-    all_page = await fn.count_page(
-        len_data=len(data), q_string_per_page=q_string_per_page
-    )
-    current_page = current_page or all_page
-    data_str = await fn.watch_data_chats(
-        data,
-        se.sep,
-        q_string_per_page,
-        current_page,
-    )
+    # Число страниц и их границы - из одного индекса, без расхождений
+    paginator = fn.chats_paginator(data, se.sep, q_string_per_page)
+    all_page = paginator.pages
+    current_page = paginator.clamp(current_page or all_page)
+    data_str = paginator.render(current_page)
     if not data_str:
         data_str = "Нет данных"
     return data_str, current_page, all_page
@@ -133,8 +129,7 @@ async def chats_message_to_add(
     chats = await bot.awaitable_attrs.chats
     chats.extend(MonitoringChat(chat_id=int(i)) for i in data_to_add)
 
-    job = Job(task=JobName.get_chat_title.value)
-    bot.jobs.append(job)
+    await JobClient(session).submit(bot.id, JobName.get_chat_title)
 
     await session.commit()
     current_page = (await state.get_data())["current_page"]
@@ -1,6 +1,16 @@
 from aiogram import Router
 
-from . import ban, clear_analyzed, delete_sessions, getlog, reset, start, stat
+from . import (
+    ban,
+    clear_analyzed,
+    delete_sessions,
+    getlog,
+    import_accounts,
+    reset,
+    start,
+    stat,
+    trace,
+)
 
 router = Router()
 router.include_routers(
@@ -10,5 +20,7 @@ router.include_routers(
     start.router,
     reset.router,
     getlog.router,
+    import_accounts.router,
     stat.router,
+    trace.router,
 )
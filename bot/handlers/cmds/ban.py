@@ -9,6 +9,7 @@ from aiogram.fsm.context import FSMContext
 
 from bot.db.models import UserManager
 from bot.keyboards.inline import ik_cancel_action
+from bot.settings import se
 from bot.states.main import InfoState
 from bot.utils import fn
 
@@ -33,7 +34,9 @@ async def add_banned_users(
     await fn.state_clear(state)
 
     banned_users = await user.awaitable_attrs.banned_users
-    all_page = await fn.count_page(len_data=len(banned_users), q_string_per_page=10)
+    all_page = fn.data_paginator(
+        [i.username for i in banned_users], se.sep, q_string_per_page=10
+    ).pages
     current_page = all_page
 
     await state.update_data(
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 import os
 import shutil
@@ -8,14 +9,17 @@ from typing import TYPE_CHECKING
 from aiogram import F, Router
 from aiogram.filters import Command
 from aiogram.types import CallbackQuery
+from sqlalchemy import update
 
-from bot.db.models import UserManager
+from bot.db.models import Bot, UserManager
 from bot.keyboards.inline import ik_confirm_clear_keyboard
+from bot.utils import fn
 
 if TYPE_CHECKING:
     from aiogram.fsm.context import FSMContext
     from aiogram.types import Message
     from redis.asyncio import Redis
+    from sqlalchemy.ext.asyncio import AsyncSession
 
 router = Router()
 logger = logging.getLogger(__name__)
@@ -43,7 +47,7 @@ async def delete_sessions_cmd(
         return
 
     try:
-        items = os.listdir(_SESSIONS_DIR)
+        items = await asyncio.to_thread(os.listdir, _SESSIONS_DIR)
         if not items:
             await message.answer("Папка sessions пуста.")
             return
@@ -68,6 +72,7 @@ async def delete_sessions_yes(
     query: CallbackQuery,
     user: UserManager | None,
     state: FSMContext,
+    session: AsyncSession,
 ) -> None:
     if user is None:
         logger.warning(
@@ -91,7 +96,18 @@ async def delete_sessions_yes(
         return
 
     try:
-        shutil.rmtree(_SESSIONS_DIR)
+        # Каталог может быть большим: не блокируем цикл событий
+        await asyncio.to_thread(shutil.rmtree, _SESSIONS_DIR)
+        # Иначе юзерботы поднимутся из копий сессий в хранилище
+        if vault := fn.Manager.vault():
+            await vault.forget_all()
+        else:
+            await session.execute(
+                update(Bot)
+                .where(Bot.session_data.is_not(None))
+                .values(session_data=None, session_synced_at=None)
+            )
+            await session.commit()
         await query.message.edit_text("Папка sessions успешно удалена.")
         await query.answer("Удаление выполнено.")
         logger.info("Папка sessions удалена пользователем %s", query.from_user.id)
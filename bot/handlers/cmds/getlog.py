@@ -1,18 +1,30 @@
 from __future__ import annotations
 
+import asyncio
+import contextlib
+import dataclasses
 import logging
 import os
-from typing import TYPE_CHECKING
+import re
+import time
+from collections import deque
+from pathlib import Path
+from typing import TYPE_CHECKING, Final
 
 from aiogram import Router
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import Command, CommandObject
 from aiogram.fsm.context import FSMContext
+from aiogram.types import BufferedInputFile
 from aiogram.utils.formatting import Code
 from sqlalchemy.ext.asyncio import async_sessionmaker
 
 from bot.db.models import Bot, UserManager
 from bot.states import UserState
 from bot.utils import fn
+from bot.utils.logsink import log_path as sink_log_path
+from bot.utils.logsink import read_since
+from bot.utils.logtail import compile_filter, read_new_lines
 
 if TYPE_CHECKING:
     from aiogram.types import Message
@@ -22,6 +34,156 @@ router = Router()
 logger = logging.getLogger(__name__)
 path_to_folder = "sessions"
 
+DEFAULT_LINE_COUNT: Final[int] = 20
+FOLLOW_KEYWORD: Final[str] = "follow"
+FOLLOW_DEFAULT_SECONDS: Final[int] = 60
+FOLLOW_MAX_SECONDS: Final[int] = 600
+FOLLOW_POLL_INTERVAL: Final[float] = 2.0
+FOLLOW_VISIBLE_LINES: Final[int] = 30
+HTML_ESCAPE_MAX: Final[int] = 6
+SINCE_MAX_LINES: Final[int] = 5000
+MAX_LINE_COUNT: Final[int] = 5000
+DURATION_RE: Final[re.Pattern[str]] = re.compile(r"^(\d+)([smhd])$")
+DURATION_UNITS: Final[dict[str, int]] = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+# Слежение идет в фоне, чтобы не держать блокировку FSM пользователя
+_follow_tasks: set[asyncio.Task[None]] = set()
+
+
+@dataclasses.dataclass
+class LogQuery:
+    line_count: int = DEFAULT_LINE_COUNT
+    pattern: str | None = None
+    follow_seconds: int | None = None
+    since_seconds: int | None = None
+
+
+def _parse_args(raw: str | None) -> LogQuery:
+    """``/log [N|10m] [шаблон]`` или ``/log follow [секунды] [шаблон]``."""
+    args = raw.split() if raw else []
+    query = LogQuery()
+    if args and args[0] == FOLLOW_KEYWORD:
+        args.pop(0)
+        query.follow_seconds = FOLLOW_DEFAULT_SECONDS
+        if args and args[0].isdigit():
+            query.follow_seconds = min(int(args.pop(0)), FOLLOW_MAX_SECONDS)
+    elif args and args[0].isdigit():
+        query.line_count = max(1, min(int(args.pop(0)), MAX_LINE_COUNT))
+    elif args and (match := DURATION_RE.match(args[0])):
+        args.pop(0)
+        query.since_seconds = int(match[1]) * DURATION_UNITS[match[2]]
+    query.pattern = " ".join(args) or None
+    return query
+
+
+def _bot_log_path(phone: str) -> Path:
+    own_log = Path(path_to_folder) / f"{phone}_bot.log"
+    if own_log.exists():
+        return own_log
+    return sink_log_path(phone)
+
+
+async def _read_since(sink_name: str, query: LogQuery) -> list[str] | str:
+    since = time.time() - (query.since_seconds or 0)
+    lines = await asyncio.to_thread(
+        read_since, sink_name, since, SINCE_MAX_LINES, compile_filter(query.pattern)
+    )
+    if not lines:
+        return "Совпадений нет" if query.pattern else "За этот период лог пуст"
+    return lines
+
+
+async def _send_log(
+    message: Message, path: Path, query: LogQuery, sink_name: str | None
+) -> None:
+    if query.since_seconds is None:
+        r = await fn.get_log(path, query.line_count, query.pattern)
+    elif sink_name is None:
+        r = "Выборка по времени доступна только для логов юзерботов"
+    else:
+        r = await _read_since(sink_name, query)
+    if isinstance(r, str):
+        await message.answer(r)
+        return
+    txt = Code("\n\n".join(r)).as_html()
+    if len(txt) > fn.max_length_message:
+        await message.answer_document(
+            BufferedInputFile("\n".join(r).encode(), filename=f"{path.name}.txt"),
+            caption=f"Последние {len(r)} строк",
+        )
+        return
+    await message.answer(txt)
+
+
+def _follow_text(header: str, window: deque[str]) -> str:
+    """Заголовок и хвост окна, укладывающиеся в одно сообщение.
+
+    Меряется готовый HTML вместе с заголовком: экранирование (``&lt;``,
+    ``&amp;``) удлиняет текст. Старые строки выбрасываются из окна, а
+    единственная слишком длинная строка обрезается с начала.
+    """
+    while window:
+        body = Code("\n".join(window)).as_html()
+        text = f"{header}\n{body}"
+        excess = len(text) - fn.max_length_message
+        if excess <= 0:
+            return text
+        if len(window) > 1:
+            window.popleft()
+        else:
+            # Символ в HTML занимает до 6 знаков (``&quot;``): так не
+            # отрезаем лишнего, а недорезанное добираем на следующем круге
+            window[0] = window[0][max(1, excess // HTML_ESCAPE_MAX) :]
+    return header
+
+
+async def _follow_log(message: Message, path: Path, query: LogQuery) -> None:
+    seconds = query.follow_seconds or FOLLOW_DEFAULT_SECONDS
+    line_filter = compile_filter(query.pattern)
+    try:
+        offset = await asyncio.to_thread(os.path.getsize, path)
+    except OSError:
+        await message.answer("Файл не найден")
+        return
+
+    msg = await message.answer(f"Слежу за {path.name} {seconds} с...")
+    window: deque[str] = deque(maxlen=FOLLOW_VISIBLE_LINES)
+    deadline = time.monotonic() + seconds
+    while (remaining := deadline - time.monotonic()) > 0:
+        await asyncio.sleep(min(FOLLOW_POLL_INTERVAL, remaining))
+        try:
+            offset, lines = await asyncio.to_thread(
+                read_new_lines, path, offset, line_filter
+            )
+        except OSError as exc:
+            logger.info("Слежение за %s прервано: %s", path, exc)
+            break
+        if not lines:
+            continue
+        window.extend(lines)
+        header = f"{path.name}, еще {max(0, int(remaining))} с"
+        with contextlib.suppress(TelegramBadRequest):
+            await msg.edit_text(_follow_text(header, window))
+
+    footer = f"Слежение за {path.name} завершено"
+    with contextlib.suppress(TelegramBadRequest):
+        await msg.edit_text(_follow_text(footer, window))
+
+
+async def _handle_log(
+    message: Message,
+    path: Path,
+    raw_args: str | None,
+    sink_name: str | None = None,
+) -> None:
+    query = _parse_args(raw_args)
+    if query.follow_seconds is None:
+        await _send_log(message, path, query, sink_name)
+        return
+    task = asyncio.create_task(_follow_log(message, path, query))
+    _follow_tasks.add(task)
+    task.add_done_callback(_follow_tasks.discard)
+
 
 @router.message(UserState.action, Command(commands="log"))  # type: ignore
 async def start_cmd_state(
@@ -39,20 +201,7 @@ async def start_cmd_state(
     async with sessionmaker() as session:
         bot = await session.get(Bot, bot_id)
         phone = bot.phone
-    path_log = os.path.join("sessions", f"{phone}_bot.log")
-    args = command.args.split(" ") if command.args else []
-    line_count = (
-        int(args[0]) if len(args) > 0 and args[0].isdigit() and len(args) < 2 else 20
-    )
-    r = fn.get_log(path_log, line_count)
-    if isinstance(r, str):
-        await message.answer(r)
-        return
-    txt = Code("\n\n".join(r))
-    if len(txt) > 4000:
-        await message.answer("Слишком большой лог")
-        return
-    await message.answer(txt.as_html())
+    await _handle_log(message, _bot_log_path(phone), command.args, sink_name=phone)
 
 
 @router.message(Command(commands="log"))  # type: ignore
@@ -63,16 +212,4 @@ async def start_cmd(
     state: FSMContext,
     command: CommandObject,
 ) -> None:
-    args = command.args.split(" ") if command.args else []
-    line_count = (
-        int(args[0]) if len(args) > 0 and args[0].isdigit() and len(args) < 2 else 20
-    )
-    r = fn.get_log("nohup.out", line_count)
-    if isinstance(r, str):
-        await message.answer(r)
-        return
-    txt = Code("\n\n".join(r))
-    if len(txt) > 4000:
-        await message.answer("Слишком большой лог")
-        return
-    await message.answer(txt.as_html())
+    await _handle_log(message, Path("nohup.out"), command.args)
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import io
+import logging
+import time
+from typing import TYPE_CHECKING, Final
+
+from aiogram import F, Router
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.filters import Command
+from aiogram.fsm.context import FSMContext
+from aiogram.types import BufferedInputFile, CallbackQuery, ReplyKeyboardRemove
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from bot.db.models import Bot, BotFolder, JobName, UserManager
+from bot.keyboards.factories import ImportFolderFactory
+from bot.keyboards.inline import ik_import_folders, ik_main_menu
+from bot.keyboards.reply import rk_cancel
+from bot.states.main import ImportState
+from bot.utils import fn
+from bot.utils.account_import import (
+    STATUS_OK,
+    STATUS_SKIPPED,
+    ImportFileError,
+    ImportRow,
+    build_report,
+    normalize_phone,
+    parse_import_file,
+    stored_phone_variants,
+    validate_rows,
+)
+from bot.utils.jobs import JobClient
+
+if TYPE_CHECKING:
+    from aiogram import Bot as TelegramBot
+    from aiogram.types import Message
+
+router = Router()
+logger = logging.getLogger(__name__)
+
+# Лимит Bot API на скачивание файлов
+MAX_IMPORT_FILE_SIZE: Final[int] = 20 * 1024 * 1024
+PROGRESS_EDIT_INTERVAL: Final[float] = 1.5
+
+
+async def _download_rows(
+    bot: TelegramBot, file_id: str, filename: str
+) -> list[ImportRow]:
+    buffer = io.BytesIO()
+    await bot.download(file_id, destination=buffer)
+    return await asyncio.to_thread(parse_import_file, filename, buffer.getvalue())
+
+
+@router.message(Command(commands="import"))  # type: ignore
+async def import_cmd(
+    message: Message,
+    user: UserManager | None,
+    state: FSMContext,
+) -> None:
+    if user is None:
+        return
+    await state.set_state(ImportState.send_file)
+    await message.answer(
+        "Пришлите CSV (phone,api_id,api_hash) или zip с файлами "
+        "НОМЕР.session и таким CSV. Импортируются только авторизованные сессии.",
+        reply_markup=await rk_cancel(),
+    )
+
+
+@router.message(ImportState.send_file, F.document)
+async def import_file(
+    message: Message,
+    user: UserManager,
+    state: FSMContext,
+    session: AsyncSession,
+) -> None:
+    document = message.document
+    if document.file_size and document.file_size > MAX_IMPORT_FILE_SIZE:
+        await message.answer("Файл больше 20 МБ, разбейте его на части")
+        return
+
+    filename = document.file_name or ""
+    try:
+        rows = await _download_rows(message.bot, document.file_id, filename)
+    except ImportFileError as exc:
+        await message.answer(str(exc))
+        return
+    if not rows:
+        await message.answer("В файле не найдено ни одного аккаунта")
+        return
+
+    folders = (
+        await session.scalars(
+            select(BotFolder)
+            .where(BotFolder.user_manager_id == user.id)
+            .order_by(BotFolder.id.asc())
+        )
+    ).all()
+    await state.update_data(import_file_id=document.file_id, import_filename=filename)
+    await state.set_state(ImportState.choose_folder)
+    await message.answer(
+        f"Найдено аккаунтов: {len(rows)}. Куда их добавить?",
+        reply_markup=await ik_import_folders(list(folders)),
+    )
+
+
+@router.callback_query(ImportState.choose_folder, ImportFolderFactory.filter())
+async def import_to_folder(
+    query: CallbackQuery,
+    callback_data: ImportFolderFactory,
+    user: UserManager,
+    state: FSMContext,
+    session: AsyncSession,
+) -> None:
+    folder_id: int | None = callback_data.folder_id or None
+    if folder_id is not None:
+        folder = await session.scalar(
+            select(BotFolder).where(
+                BotFolder.id == folder_id,
+                BotFolder.user_manager_id == user.id,
+            )
+        )
+        if not folder:
+            await query.answer("Папка не найдена", show_alert=True)
+            return
+
+    data = await state.get_data()
+    await query.answer()
+    message = query.message
+    try:
+        rows = await _download_rows(
+            query.bot, data["import_file_id"], data["import_filename"]
+        )
+    except (ImportFileError, KeyError):
+        await message.edit_text("Файл импорта недоступен, начните заново: /import")
+        await fn.state_clear(state)
+        return
+
+    variants = [v for row in rows for v in stored_phone_variants(row.phone)]
+    existing = {
+        normalize_phone(phone)
+        for phone in await session.scalars(
+            select(Bot.phone).where(Bot.phone.in_(variants))
+        )
+    }
+    for row in rows:
+        if row.phone in existing:
+            row.fail("уже добавлен", status=STATUS_SKIPPED)
+
+    total = len(rows)
+    await message.edit_text(f"Проверка сессий: 0/{total}")
+    last_edit = time.monotonic()
+
+    async def _progress(done: int) -> None:
+        nonlocal last_edit
+        if time.monotonic() - last_edit < PROGRESS_EDIT_INTERVAL:
+            return
+        last_edit = time.monotonic()
+        with contextlib.suppress(TelegramBadRequest):
+            await message.edit_text(f"Проверка сессий: {done}/{total}")
+
+    await validate_rows(rows, on_progress=_progress)
+
+    accepted = [row for row in rows if row.status == STATUS_OK]
+    bots = [
+        Bot(
+            user_manager_id=user.id,
+            folder_id=folder_id,
+            api_id=row.api_id,
+            api_hash=row.api_hash,
+            phone=row.phone,
+            path_session=row.path_session,
+            is_connected=False,
+        )
+        for row in accepted
+    ]
+    if bots:
+        session.add_all(bots)
+        await session.flush()
+        jobs = JobClient(session)
+        for bot in bots:
+            await jobs.submit(bot.id, JobName.get_me_name)
+        await session.commit()
+    logger.info("Импортировано аккаунтов: %s из %s", len(bots), total)
+
+    skipped = sum(row.status == STATUS_SKIPPED for row in rows)
+    summary = (
+        f"Импорт завершен: добавлено {len(bots)}, пропущено {skipped}, "
+        f"ошибок {total - len(bots) - skipped}.\n"
+        "Подключить добавленных можно из папки кнопкой «Подключить все»."
+    )
+    await message.edit_text(summary)
+    await message.answer_document(
+        BufferedInputFile(build_report(rows), filename="import_report.csv"),
+        reply_markup=ReplyKeyboardRemove(),
+    )
+    await fn.state_clear(state)
+    msg = await message.answer("Главное меню", reply_markup=await ik_main_menu(user))
+    await fn.set_general_message(state, msg)
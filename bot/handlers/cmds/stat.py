@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import logging
+import sys
 from typing import TYPE_CHECKING
 
 from aiogram import Router
@@ -11,6 +12,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from bot.db.models import Bot as UserBot
 from bot.db.models import UserAnalyzed, UserManager
+from bot.middlewares.edit_dedupe import edit_dedupe_stats
 
 if TYPE_CHECKING:
     from aiogram.types import Message
@@ -21,6 +23,14 @@ logger = logging.getLogger(__name__)
 path_to_folder = "sessions"
 
 
+def _auth_pool_stats() -> str:
+    # Пул есть, только если модуль уже загружен: не тянем telethon ради /stat
+    module = sys.modules.get("bot.utils.telethon_auth")
+    if module is None:
+        return "не запускались"
+    return module.Telethon.pool_metrics().describe()
+
+
 @router.message(Command(commands="stat"))
 async def stat_cmd(
     message: Message,
@@ -51,6 +61,7 @@ async def stat_cmd(
             continue
         stat.append(f"{bot.name}[{bot.phone}] есть {counter} чел.")
     if not stat:
-        await message.answer("Нет пользователей для статистики")
-        return
+        stat.append("Нет пользователей для статистики")
+    stat.append(f"\nПравки сообщений: {edit_dedupe_stats.describe()}")
+    stat.append(f"Клиенты авторизации: {_auth_pool_stats()}")
     await message.answer("\n".join(stat))
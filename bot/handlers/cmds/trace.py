@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING
+
+from aiogram import Router
+from aiogram.filters import Command, CommandObject
+from aiogram.types import BufferedInputFile
+
+from bot.db.models import UserManager
+from bot.utils.tracing import trace_registry
+
+if TYPE_CHECKING:
+    from aiogram.types import Message
+
+router = Router()
+logger = logging.getLogger(__name__)
+
+
+@router.message(Command(commands="trace"))
+async def trace_cmd(
+    message: Message,
+    command: CommandObject,
+    user: UserManager | None,
+) -> None:
+    if user is None:
+        return
+    if (command.args or "").strip() == "reset":
+        trace_registry.reset()
+        await message.answer("Статистика апдейтов сброшена")
+        return
+
+    lines = trace_registry.summary()
+    if not lines:
+        await message.answer("Апдейтов пока не было")
+        return
+    await message.answer_document(
+        BufferedInputFile(trace_registry.export().encode(), filename="traces.prom"),
+        caption="\n".join(lines)[:1024],
+    )
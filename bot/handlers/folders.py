@@ -1,10 +1,10 @@
 from __future__ import annotations
 
-import asyncio
 import contextlib
+import itertools
 import logging
 import time
-from typing import Any, Optional
+from typing import TYPE_CHECKING, Any, Optional
 
 import msgpack
 from aiogram import F, Router
@@ -28,52 +28,74 @@ from bot.keyboards.inline import (
     ik_processed_users,
 )
 from bot.states.main import BotState
-from bot.settings import se
 from bot.utils import fn
+from bot.utils.blob_store import BlobStore
+from bot.utils.jobs import JobClient
+from bot.utils.pagination import PageIndex
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
 
 router = Router()
 logger = logging.getLogger(__name__)
 
 # Константы
-POLL_INTERVAL = 0.35
 UI_UPDATE_INTERVAL = 0.8
 WAIT_TIMEOUT = 20.0
 SPINNER_FRAMES = ("", ".", "..", "...")
 USERS_PER_PAGE = 15
+EXPIRED_FOLDERS_TEXT = "Данные о папках устарели, запросите их заново"
+# Все варианты форматирования (имя, username, копирование) для индексов
+FORMATTING_VARIANTS = [list(v) for v in itertools.product((True, False), repeat=3)]
+
+
+def _folder_page_indexes(
+    pinned_peers: list[dict[str, Any]],
+) -> dict[str, tuple[int, ...]]:
+    """Границы страниц папки для каждого варианта форматирования."""
+    return {
+        fn.formatting_key(formatting): fn.processed_users_index(
+            pinned_peers, USERS_PER_PAGE, formatting
+        ).bounds
+        for formatting in FORMATTING_VARIANTS
+    }
 
 
-async def _wait_for_job_completion(
+async def _run_job(
+    session: AsyncSession,
     sessionmaker: async_sessionmaker,
+    redis: Redis,
     bot_id: int,
-    job_id: int,
+    task: JobName,
     message: Message,
+    metadata: Any = None,
     error_text: str = "Не смог получить данные",
 ) -> Optional[Job]:
-    """Ожидает завершения конкретной задачи и возвращает результат."""
-    deadline = time.monotonic() + WAIT_TIMEOUT
-    last_ui_update = 0.0
+    """Ставит задачу юзерботу и ожидает результат с анимацией."""
     frame_index = 0
+    last_ui_update = 0.0
 
-    while time.monotonic() < deadline:
-        async with sessionmaker() as session:
-            job: Job | None = await session.get(Job, job_id)
-
-        if job and job.bot_id == bot_id and job.answer:
-            return job
-
+    async def _spin() -> None:
+        nonlocal frame_index, last_ui_update
         now = time.monotonic()
-        if now - last_ui_update >= UI_UPDATE_INTERVAL:
-            text = f"Получаю данные{SPINNER_FRAMES[frame_index]}"
-            with contextlib.suppress(Exception):
-                await message.edit_text(text=text, reply_markup=None)
-            frame_index = (frame_index + 1) % len(SPINNER_FRAMES)
-            last_ui_update = now
-
-        await asyncio.sleep(POLL_INTERVAL)
+        if now - last_ui_update < UI_UPDATE_INTERVAL:
+            return
+        text = f"Получаю данные{SPINNER_FRAMES[frame_index]}"
+        with contextlib.suppress(Exception):
+            await message.edit_text(text=text, reply_markup=None)
+        frame_index = (frame_index + 1) % len(SPINNER_FRAMES)
+        last_ui_update = now
+
+    jobs = JobClient(session, redis=redis, sessionmaker=sessionmaker)
+    job = await jobs.submit_and_wait(
+        bot_id, task, metadata, timeout=WAIT_TIMEOUT, on_tick=_spin
+    )
+    if job:
+        return job
 
     logger.warning(
         "Timeout while waiting for job %s for bot_id=%s",
-        job_id,
+        task.value,
         bot_id,
     )
     await message.edit_text(
@@ -90,24 +112,24 @@ async def add_job_to_get_processed_users(
     state: FSMContext,
     session: AsyncSession,
     sessionmaker: async_sessionmaker,
+    redis: Redis,
 ) -> None:
     """Получает список папок для обработанных пользователей."""
 
     # Создание задачи на получение папок
     data = await state.get_data()
     bot_id = data["bot_id"]
-    bot = await user.get_obj_bot(bot_id)
-    job = Job(task=JobName.get_folders.value)
-    bot.jobs.append(job)
-    await session.flush()
-    job_id = int(job.id)
-    await session.commit()
+    if not await user.get_obj_bot(bot_id):
+        await query.answer("Бот не найден", show_alert=True)
+        return
 
     # Ожидание результата
-    job_result = await _wait_for_job_completion(
+    job_result = await _run_job(
+        session,
         sessionmaker,
+        redis,
         bot_id=bot_id,
-        job_id=job_id,
+        task=JobName.get_folders,
         message=query.message,  # pyright: ignore
     )
 
@@ -156,15 +178,23 @@ async def get_processed_users_from_folder(
     state: FSMContext,
     session: AsyncSession,
     sessionmaker: async_sessionmaker,
+    redis: Redis,
     from_state: bool | None = None,
 ) -> None:
     """Получает обработанных пользователей из выбранных папок."""
     data = await state.get_data()
+    blobs = BlobStore(redis)
 
     if from_state:
-        # Используем данные из состояния
-        folders = data.get("folders", [])
-        name_folders = [folder["name"] for folder in folders]
+        # Используем ранее сохраненный blob, в FSM лежит только handle
+        handle = data.get("folders_blob")
+        sections = await blobs.sections(handle) if handle else None
+        if sections is None:
+            await query.message.edit_text(
+                EXPIRED_FOLDERS_TEXT, reply_markup=await ik_action_with_bot()
+            )
+            return
+        name_folders = list(sections)
     else:
         # Получаем пользователей из выбранных папок
         choice_folders: dict[str, bool] = data["choice_folders"]
@@ -177,21 +207,19 @@ async def get_processed_users_from_folder(
 
         # Создание задачи на получение пользователей
         bot_id = data["bot_id"]
-        bot = await user.get_obj_bot(bot_id)
-        job = Job(
-            task=JobName.processed_users.value, task_metadata=msgpack.packb(folders)
-        )
-        bot.jobs.append(job)
-        await session.flush()
-        job_id = int(job.id)
-        await session.commit()
+        if not await user.get_obj_bot(bot_id):
+            await query.answer("Бот не найден", show_alert=True)
+            return
 
         # Ожидание результата с анимацией
-        job_result = await _wait_for_job_completion(
+        job_result = await _run_job(
+            session,
             sessionmaker,
+            redis,
             bot_id=bot_id,
-            job_id=job_id,
+            task=JobName.processed_users,
             message=query.message,  # pyright: ignore
+            metadata=folders,
             error_text="Не смог получить папки",
         )
 
@@ -201,8 +229,22 @@ async def get_processed_users_from_folder(
         folders: list[dict[str, list[dict[str, Any]] | str]] = msgpack.unpackb(
             job_result.answer
         )
-        name_folders = [folder["name"] for folder in folders]
-        await state.update_data(folders=folders)
+        # Пользователи папок уходят в blob store, в FSM кладем только handle
+        sections: dict[str, list[dict[str, Any]]] = {}
+        for folder in folders:
+            pinned_peers = folder.get("pinned_peers") or []
+            sections.setdefault(folder["name"], pinned_peers)  # pyright: ignore
+        # Границы страниц считаются один раз здесь: листание потом читает
+        # только чанки своей страницы
+        handle = await blobs.put_sections(
+            sections,
+            indexes={
+                name: _folder_page_indexes(pinned_peers)
+                for name, pinned_peers in sections.items()
+            },
+        )
+        name_folders = list(sections)
+        await state.update_data(folders_blob=handle)
 
     await query.message.edit_text(
         text="Папки",
@@ -218,40 +260,49 @@ async def view_target_folder(
     query: CallbackQuery,
     state: FSMContext,
     callback_data: FolderGetFactory,
+    redis: Redis,
     current_page: int | None = None,
 ) -> None:
     """Отображает содержимое выбранной папки."""
     data = await state.get_data()
 
     # Определение текущей папки
-    if current_page:
-        folder = data["current_folder"]
-    else:
-        target_folder = callback_data.name
-        folders: list[dict[str, dict[str, Any] | str]] = data["folders"]
-        folder = next(i for i in folders if i["name"] == target_folder)
+    folder_name = data["current_folder"] if current_page else callback_data.name
 
     # Настройка пагинации
     page = current_page or 1
     formatting_choices = data.get("formatting_choices", [True, True, False])
 
-    pinned_peers = folder.get("pinned_peers", [])
-    all_page = await fn.count_page(len(pinned_peers), USERS_PER_PAGE)
+    # Границы страниц посчитаны при записи blob'а по всей папке (лимит
+    # длины сообщения сдвигает их), читаются только чанки этой страницы
+    handle = data.get("folders_blob")
+    blobs = BlobStore(redis)
+    bounds = (
+        await blobs.page_index(
+            handle, folder_name, fn.formatting_key(formatting_choices)
+        )
+        if handle
+        else None
+    )
+    index = PageIndex(bounds) if bounds is not None else None
+    folder_page = None
+    if index is not None:
+        start, end = index.span(page)
+        folder_page = await blobs.page(handle, folder_name, start, end)
+    if index is None or folder_page is None:
+        await query.answer(EXPIRED_FOLDERS_TEXT, show_alert=True)
+        return
+    all_page = index.pages
+    page = index.clamp(page)
 
     # Формирование текста для отображения
-    formatted_text = await fn.watch_processed_users(
-        pinned_peers,  # pyright: ignore
-        se.sep,
-        USERS_PER_PAGE,
-        page,
-        formatting_choices,
-    )
+    formatted_text = fn.render_processed_users(folder_page[1], formatting_choices)
 
     # Обновление состояния
     await state.update_data(
         current_page=page,
         all_page=all_page,
-        current_folder=folder,
+        current_folder=folder_name,
         formatting_choices=formatting_choices,
     )
 
@@ -273,6 +324,7 @@ async def arrow_processed_users(
     query: CallbackQuery,
     callback_data: ArrowFoldersFactory,
     state: FSMContext,
+    redis: Redis,
 ) -> None:
     """Обрабатывает навигацию по страницам пользователей."""
     arrow = callback_data.to
@@ -292,6 +344,7 @@ async def arrow_processed_users(
             query,
             state,
             FolderGetFactory(name=""),
+            redis,
             current_page=page,
         )
     except Exception as e:
@@ -304,7 +357,10 @@ async def arrow_processed_users(
     FormattingFactory.filter(),
 )
 async def formatting_(
-    query: CallbackQuery, state: FSMContext, callback_data: FormattingFactory
+    query: CallbackQuery,
+    state: FSMContext,
+    callback_data: FormattingFactory,
+    redis: Redis,
 ) -> None:
     """Обрабатывает изменение форматирования отображения пользователей."""
     data = await state.get_data()
@@ -329,6 +385,7 @@ async def formatting_(
             query,
             state,
             FolderGetFactory(name=""),
+            redis,
             current_page=data["current_page"],
         )
 
@@ -352,6 +409,7 @@ async def back_accept_folders(
     user: UserManager,
     session: AsyncSession,
     sessionmaker: async_sessionmaker,
+    redis: Redis,
 ) -> None:
     await get_processed_users_from_folder(
         query,
@@ -359,5 +417,6 @@ async def back_accept_folders(
         state,
         session,
         sessionmaker,
+        redis,
         from_state=True,
     )
@@ -6,7 +6,7 @@ from typing import TYPE_CHECKING, Final
 from aiogram import F, Router
 from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery
-from sqlalchemy import and_, func, select
+from sqlalchemy import and_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from bot.db.models import UserAnalyzed, UserManager
@@ -27,30 +27,13 @@ HISTORY_FILTER = (
 ITOI_BACK_TARGET: Final = "itoi"
 
 
-def _normalize_page(page: int, total_pages: int) -> int:
-    if page < 1:
-        return 1
-    if page > total_pages:
-        return total_pages
-    return page
-
-
-def _build_history_text(users: list[UserAnalyzed], start_index: int) -> str:
-    rows = []
-    for index, user in enumerate(users, start=start_index):
-        preview = user.additional_message.replace("\n", " ")
-        preview = f"{preview[:10]}..." if len(preview) > 10 else preview
-        bot_tag = f"[{user.bot_id}]" if user.bot_id else ""
-        username = user.username or "без username"
-        line = " ".join(
-            part for part in (f"{index}.", bot_tag, username, preview) if part
-        )
-        rows.append(line)
-
-    text = "\n".join(rows)
-    if len(text) > fn.max_length_message:
-        text = text[: fn.max_length_message - 3] + "..."
-    return text
+def _history_item(bot_id: int | None, username: str | None, message: str) -> str:
+    preview = message.replace("\n", " ")
+    preview = f"{preview[:10]}..." if len(preview) > 10 else preview
+    bot_tag = f"[{bot_id}]" if bot_id else ""
+    return " ".join(
+        part for part in (bot_tag, username or "без username", preview) if part
+    )
 
 
 @router.callback_query(F.data == "history")
@@ -61,29 +44,30 @@ async def history(
     session: AsyncSession,
     current_page: int | None = None,
 ) -> None:
-    rows_count = await session.scalar(
-        select(func.count(UserAnalyzed.id)).where(and_(*HISTORY_FILTER))
-    )
-    if not rows_count:
+    # Только поля для строки списка: страницы режет Paginator по длине
+    rows = (
+        await session.execute(
+            select(
+                UserAnalyzed.bot_id,
+                UserAnalyzed.username,
+                UserAnalyzed.additional_message,
+            )
+            .where(and_(*HISTORY_FILTER))
+            .order_by(UserAnalyzed.id.asc())
+        )
+    ).all()
+    if not rows:
         await query.message.edit_text(
             text="История пуста", reply_markup=await ik_back(back_to=ITOI_BACK_TARGET)
         )
         return
 
-    all_page = await fn.count_page(rows_count, ROWS_PER_PAGE)
-    current_page = _normalize_page(current_page or all_page, all_page)
-    user_analyzed: list[UserAnalyzed] = (
-        await session.scalars(
-            select(UserAnalyzed)
-            .where(and_(*HISTORY_FILTER))
-            .order_by(UserAnalyzed.id.asc())
-            .offset((current_page - 1) * ROWS_PER_PAGE)
-            .limit(ROWS_PER_PAGE)
-        )
-    ).all()  # pyright: ignore
-    text = _build_history_text(
-        user_analyzed, start_index=((current_page - 1) * ROWS_PER_PAGE) + 1
+    paginator = fn.data_paginator(
+        [_history_item(*row) for row in rows], "\n", ROWS_PER_PAGE
     )
+    all_page = paginator.pages
+    current_page = paginator.clamp(current_page or all_page)
+    text = paginator.render(current_page)
     await state.update_data(
         current_page_history=current_page, all_page_history=all_page
     )
@@ -25,6 +25,7 @@ from bot.keyboards.inline import (
 from bot.settings import se
 from bot.states.main import InfoState
 from bot.utils import fn
+from bot.utils.page_cache import PageCache
 
 if TYPE_CHECKING:
     from redis.asyncio import Redis
@@ -103,38 +104,47 @@ async def get_obj_for_info(
     return None
 
 
-async def data_info_to_string(
-    data: list[str],
-    q_string_per_page: int = 10,
+async def data_info_page(
+    redis: Redis,
+    user: UserManager,
+    type_data: str,
     current_page: int | None = None,
-) -> tuple[str, int, int]:
-    all_page = await fn.count_page(
-        len_data=len(data), q_string_per_page=q_string_per_page
-    )
-    current_page = current_page or all_page
-    data_str = await fn.watch_data(
-        data,
-        se.sep,
-        q_string_per_page,
-        current_page,
-    )
+    version: int | None = None,
+    q_string_per_page: int = 10,
+) -> tuple[str, int, int, int]:
+    """Страница списка: из кэша версии ``version`` или рендер всех страниц."""
+    cache = PageCache(redis)
+    cached = await cache.fetch(user.id, type_data, version, current_page)
+    if cached is not None:
+        return cached.text, cached.page, cached.pages, cached.version
+
+    version = await cache.version(user.id, type_data)
+    data = await get_data_for_info(user, type_data)
+    # Число страниц и их границы - из одного индекса, без расхождений
+    paginator = fn.data_paginator(data, se.sep, q_string_per_page)
+    await cache.store(user.id, type_data, version, paginator)
+    all_page = paginator.pages
+    current_page = paginator.clamp(current_page or all_page)
+    data_str = paginator.render(current_page)
     if not data_str:
         data_str = "Нет данных"
-    return data_str, current_page, all_page
+    return data_str, current_page, all_page, version
 
 
 @router.callback_query(InfoFactory.filter())
 async def info(
     query: CallbackQuery | Message,
     user: UserManager,
+    redis: Redis,
     state: FSMContext,
     callback_data: InfoFactory,
 ) -> None:
     type_data = callback_data.key
     back_target = _info_back_target(type_data)
 
-    data = await get_data_for_info(user, type_data)
-    data_str, current_page, all_page = await data_info_to_string(data)
+    data_str, current_page, all_page, version = await data_info_page(
+        redis, user, type_data
+    )
 
     await query.message.edit_text(
         text=data_str,
@@ -148,6 +158,7 @@ async def info(
         type_data=type_data,
         current_page=current_page,
         all_page=all_page,
+        page_version=version,
     )
 
 
@@ -173,10 +184,14 @@ async def arrow_info(
             page = page + 1 if page < all_page else 1
     await state.update_data(current_page=page)
     try:
-        data = await get_data_for_info(user, type_data)
-        data_str, current_page, all_page = await data_info_to_string(
-            data=data, current_page=page
+        data_str, current_page, all_page, version = await data_info_page(
+            redis,
+            user,
+            type_data,
+            current_page=page,
+            version=data_state.get("page_version"),
         )
+        await state.update_data(all_page=all_page, page_version=version)
         await query.message.edit_text(
             text=data_str,
             reply_markup=await ik_add_or_delete(
@@ -221,6 +236,7 @@ async def add(
 async def processing_message_to_add(
     message: Message,
     user: UserManager,
+    redis: Redis,
     state: FSMContext,
     session: AsyncSession,
 ) -> None:
@@ -255,13 +271,15 @@ async def processing_message_to_add(
             )
             keywords.extend([KeyWord(word=i) for i in data_to_add])
     await session.commit()
+    await PageCache(redis).bump(user.id, type_data)
     current_page = (await state.get_data())["current_page"]
 
-    data = await get_data_for_info(user, type_data)
-    data_str, current_page, all_page = await data_info_to_string(
-        data, current_page=current_page
+    data_str, current_page, all_page, version = await data_info_page(
+        redis, user, type_data, current_page=current_page
+    )
+    await state.update_data(
+        current_page=current_page, all_page=all_page, page_version=version
     )
-    await state.update_data(current_page=current_page, all_page=all_page)
     msg = await message.answer(
         text=data_str,
         reply_markup=await ik_add_or_delete(
@@ -307,6 +325,8 @@ async def delete_by_id_obj(
 
     await session.delete(obj)
     await session.commit()
+    # После коммита и до рендера: страницы ниже строятся уже по новой версии
+    await PageCache(redis).bump(user.id, type_data)
 
     async with sessionmaker() as session:
         user_updated = await session.get(UserManager, user.id)
@@ -317,14 +337,17 @@ async def delete_by_id_obj(
 
     type_data = (await state.get_data())["type_data"]
 
-    data = await get_data_for_info(user_updated, type_data)
-    data_str, current_page, all_page = await data_info_to_string(data)
+    data_str, current_page, all_page, version = await data_info_page(
+        redis, user_updated, type_data
+    )
 
     ids = await get_ids_for_info(user_updated, type_data)
     await query.message.edit_text(
         text=data_str, reply_markup=await ik_num_matrix_del(ids, "info")
     )
-    await state.update_data(ids=ids)
+    await state.update_data(
+        ids=ids, current_page=current_page, all_page=all_page, page_version=version
+    )
 
 
 @router.callback_query(InfoState.delete, BackFactory.filter(F.to == "info"))
@@ -332,9 +355,10 @@ async def back_info(
     query: CallbackQuery,
     state: FSMContext,
     user: UserManager,
+    redis: Redis,
 ) -> None:
     key = (await state.get_data())["type_data"]
-    await info(query, user, state, InfoFactory(key=key))
+    await info(query, user, redis, state, InfoFactory(key=key))
 
 
 @router.callback_query(InfoState.add, CancelFactory.filter(F.to == "default"))
@@ -342,14 +366,19 @@ async def cancel(
     query: CallbackQuery,
     state: FSMContext,
     user: UserManager,
+    redis: Redis,
 ) -> None:
-    current_page = (await state.get_data())["current_page"]
-    type_data = (await state.get_data())["type_data"]
+    data_state = await state.get_data()
+    current_page = data_state["current_page"]
+    type_data = data_state["type_data"]
     back_target = _info_back_target(type_data)
 
-    data = await get_data_for_info(user, type_data)
-    data_str, current_page, all_page = await data_info_to_string(
-        data, current_page=current_page
+    data_str, current_page, all_page, _ = await data_info_page(
+        redis,
+        user,
+        type_data,
+        current_page=current_page,
+        version=data_state.get("page_version"),
     )
 
     msg = await query.message.answer(
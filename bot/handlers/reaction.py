@@ -15,9 +15,10 @@ from bot.db.models import BannedUser, UserAnalyzed, UserManager
 from bot.db.models import Bot as UserBot
 from bot.keyboards.inline import ik_tool_for_not_accepted_message
 from bot.utils import fn
+from bot.utils.page_cache import PageCache
 
 if TYPE_CHECKING:
-    pass
+    from redis.asyncio import Redis
 
 router = Router()
 logger = logging.getLogger(__name__)
@@ -201,6 +202,7 @@ async def tool_send_messages(
 async def tool_ban_user(
     query: CallbackQuery,
     user: UserManager,
+    redis: Redis,
     state: FSMContext,
     session: AsyncSession,
 ) -> None:
@@ -230,6 +232,7 @@ async def tool_ban_user(
     banned_users.extend([BannedUser(username=i) for i in data_to_add])
 
     await session.commit()
+    await PageCache(redis).bump(user.id, "ban")
     await query.message.edit_text(
         f"Пользователь <b>@{user_a.username}</b> заблокирован"
     )
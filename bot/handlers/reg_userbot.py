@@ -13,13 +13,14 @@ from aiogram.types.reply_keyboard_remove import ReplyKeyboardRemove
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-from bot.db.models import Bot, BotFolder, Job, JobName, UserManager
+from bot.db.models import Bot, BotFolder, JobName, UserManager
 from bot.keyboards.factories import BotAddFactory
 from bot.keyboards.inline import ik_main_menu
 from bot.keyboards.reply import rk_cancel
 from bot.settings import se
 from bot.states import UserState
 from bot.utils import fn
+from bot.utils.jobs import JobClient
 
 if TYPE_CHECKING:
     from aiogram.types import Message
@@ -69,13 +70,13 @@ async def _finish_bot_setup(
             is_connected=True,
             folder_id=target_folder_id,
         )
-        job = Job(task=JobName.get_me_name.value)
-        jobs = await bot.awaitable_attrs.jobs
-        jobs.append(job)
         bots = await user.awaitable_attrs.bots
         bots.append(bot)
         session.add(bot)
+        await session.flush()
+        await JobClient(session).submit(bot.id, JobName.get_me_name)
         await session.commit()
+        bot_id = bot.id
     elif bot_id:
         bot = await user.get_obj_bot(bot_id)
         if not bot:
@@ -89,7 +90,9 @@ async def _finish_bot_setup(
         bot.path_session = path_session
         await session.commit()
 
-    asyncio.create_task(fn.Manager.start_bot(phone, path_session, api_id, api_hash))
+    asyncio.create_task(
+        fn.Manager.start_bot(phone, path_session, api_id, api_hash, bot_id=bot_id)
+    )
     status_text = "Бот подключен и запущен"
     if folder_name:
         status_text += f"\nПапка: {folder_name}"
@@ -0,0 +1,47 @@
+"""Мемоизация построителей клавиатур.
+
+Клавиатура строится один раз на набор аргументов и лежит в LRU. Разметка
+aiogram - изменяемые pydantic-модели, поэтому каждый вызов получает
+глубокую копию: правка разметки вызывающим не испортит кэш. Копия все равно
+в разы дешевле сборки через ``*KeyboardBuilder`` (см.
+``benchmarks/keyboards.py``). Аргументы должны быть хешируемыми:
+построители от списков и моделей БД не кэшируются.
+"""
+
+from __future__ import annotations
+
+import functools
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Final, ParamSpec, TypeVar
+
+from pydantic import BaseModel
+
+KEYBOARD_CACHE_SIZE: Final[int] = 256
+
+P = ParamSpec("P")
+T = TypeVar("T", bound=BaseModel)
+
+
+def cached_keyboard(
+    maxsize: int = KEYBOARD_CACHE_SIZE,
+) -> Callable[[Callable[P, Awaitable[T]]], Callable[P, Awaitable[T]]]:
+    def decorator(func: Callable[P, Awaitable[T]]) -> Callable[P, Awaitable[T]]:
+        cache: OrderedDict[Hashable, T] = OrderedDict()
+
+        @functools.wraps(func)
+        async def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
+            key = (args, tuple(sorted(kwargs.items())))
+            markup = cache.get(key)
+            if markup is not None:
+                cache.move_to_end(key)
+            else:
+                markup = cache[key] = await func(*args, **kwargs)
+                if len(cache) > maxsize:
+                    cache.popitem(last=False)
+            return markup.model_copy(deep=True)
+
+        wrapper.cache_clear = cache.clear  # type: ignore[attr-defined]
+        return wrapper
+
+    return decorator
@@ -33,6 +33,11 @@ class BotFolderDeleteFactory(CallbackData, prefix="bfd"):
     id: int
 
 
+class BotFolderBulkFactory(CallbackData, prefix="bfb"):
+    folder_id: int
+    action: str
+
+
 class BotAddFactory(CallbackData, prefix="ba"):
     folder_id: int
 
@@ -41,6 +46,10 @@ class BotMoveToFolderFactory(CallbackData, prefix="bmf"):
     id: int
 
 
+class ImportFolderFactory(CallbackData, prefix="imf"):
+    folder_id: int
+
+
 class FolderFactory(CallbackData, prefix="f"):
     name: str
 
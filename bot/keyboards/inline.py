@@ -6,6 +6,7 @@ from aiogram.utils.keyboard import InlineKeyboardBuilder
 
 from bot.db.models import Bot, BotFolder, UserManager
 
+from .cache import cached_keyboard
 from .factories import (
     ArrowFoldersFactory,
     ArrowHistoryFactory,
@@ -13,6 +14,7 @@ from .factories import (
     BackFactory,
     BotAddFactory,
     BotFactory,
+    BotFolderBulkFactory,
     BotFolderDeleteFactory,
     BotFolderFactory,
     BotMoveToFolderFactory,
@@ -21,6 +23,7 @@ from .factories import (
     FolderFactory,
     FolderGetFactory,
     FormattingFactory,
+    ImportFolderFactory,
     InfoFactory,
     UserPerMinuteFactory,
 )
@@ -30,6 +33,13 @@ logger = logging.getLogger(__name__)
 _CONFIRM_YES = "clear_analyzed_yes"
 _CONFIRM_NO = "clear_analyzed_no"
 
+BULK_ACTIONS: Final[tuple[tuple[str, str], ...]] = (
+    ("connect", "❇️ Подключить все"),
+    ("disconnect", "⛔️ Отключить все"),
+    ("start", "🟢 Старт всех"),
+    ("stop", "🔴 Стоп всех"),
+)
+
 
 async def ik_main_menu(user: UserManager) -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
@@ -78,13 +88,25 @@ async def ik_available_bots(
     back_to: str = "default",
     delete_folder_id: int | None = None,
     add_to_folder_id: int | None = None,
+    bulk_folder_id: int | None = None,
 ) -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
+    sizes: list[int] = []
     if add_to_folder_id is not None:
         builder.button(
             text="➕ Добавить аккаунт",
             callback_data=BotAddFactory(folder_id=add_to_folder_id),
         )
+        sizes.append(1)
+    if bulk_folder_id is not None:
+        for action, text in BULK_ACTIONS:
+            builder.button(
+                text=text,
+                callback_data=BotFolderBulkFactory(
+                    folder_id=bulk_folder_id, action=action
+                ),
+            )
+        sizes.extend([2, 2])
     if delete_folder_id is not None:
         builder.button(
             text="🗑 Удалить папку",
@@ -92,12 +114,13 @@ async def ik_available_bots(
         )
     if bots_data:
         for bot in bots_data:
+            missing = "" if bot.session_present else "⚠️ "
             builder.button(
-                text=f"{'❇️' if bot.is_connected else '⛔️'} {'🟢' if bot.is_started else '🔴'} {bot.phone} ({bot.name or '🌀'}) [{bot.id}]",
+                text=f"{missing}{'❇️' if bot.is_connected else '⛔️'} {'🟢' if bot.is_started else '🔴'} {bot.phone} ({bot.name or '🌀'}) [{bot.id}]",
                 callback_data=BotFactory(id=bot.id),
             )
     builder.button(text="<-", callback_data=BackFactory(to=back_to))
-    builder.adjust(1)
+    builder.adjust(*sizes, 1)
     return builder.as_markup()
 
 
@@ -118,6 +141,7 @@ async def ik_bot_folder_list(
     return builder.as_markup()
 
 
+@cached_keyboard()
 async def ik_action_with_bot(back_to: str = "default") -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     builder.button(text="⛓️‍💥 Отключить", callback_data="disconnected")
@@ -134,6 +158,7 @@ async def ik_action_with_bot(back_to: str = "default") -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@cached_keyboard()
 async def ik_cancel_action(back_to: str = "default") -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     builder.button(text="🚫 Отмена", callback_data=CancelFactory(to=back_to))
@@ -141,6 +166,7 @@ async def ik_cancel_action(back_to: str = "default") -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@cached_keyboard()
 async def ik_add_or_delete(
     current_page: int,
     all_page: int,
@@ -189,17 +215,20 @@ async def ik_num_matrix_del(
 
 
 max_users_per_minute: Final = 30
+# Callback data кнопок пропускной упаковывается один раз при импорте
+_users_per_minute_callbacks: Final[tuple[str, ...]] = tuple(
+    UserPerMinuteFactory(value=i).pack() for i in range(1, max_users_per_minute + 1)
+)
 
 
+@cached_keyboard(maxsize=max_users_per_minute + 1)
 async def ik_num_matrix_users(
     current_choose: int, back_to: str = "default"
 ) -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
-    for i in range(1, max_users_per_minute + 1):
-        if current_choose == i:
-            builder.button(text=f"{i}🔘", callback_data=UserPerMinuteFactory(value=i))
-            continue
-        builder.button(text=str(i), callback_data=UserPerMinuteFactory(value=i))
+    for i, callback_data in enumerate(_users_per_minute_callbacks, 1):
+        text = f"{i}🔘" if current_choose == i else str(i)
+        builder.button(text=text, callback_data=callback_data)
     builder.button(text="<-", callback_data=BackFactory(to=back_to))
     builder.adjust(5)
     return builder.as_markup()
@@ -240,6 +269,7 @@ async def ik_processed_users(
     return builder.as_markup()
 
 
+@cached_keyboard()
 async def ik_history_back(
     all_page: int, current_page: int, back_to: str = "default"
 ) -> InlineKeyboardMarkup:
@@ -259,6 +289,7 @@ async def ik_history_back(
     return builder.as_markup()
 
 
+@cached_keyboard()
 async def ik_back(back_to: str = "default") -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     builder.button(text="<-", callback_data=BackFactory(to=back_to))
@@ -266,6 +297,7 @@ async def ik_back(back_to: str = "default") -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@cached_keyboard()
 async def ik_connect_bot(back_to: str = "default") -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     builder.button(text="🗑 Удалить", callback_data="delete")
@@ -328,6 +360,18 @@ async def ik_move_bot_folders(
     return builder.as_markup()
 
 
+async def ik_import_folders(folders: list[BotFolder]) -> InlineKeyboardMarkup:
+    builder = InlineKeyboardBuilder()
+    builder.button(text="Без папки", callback_data=ImportFolderFactory(folder_id=0))
+    for folder in folders:
+        builder.button(
+            text=folder.name, callback_data=ImportFolderFactory(folder_id=folder.id)
+        )
+    builder.adjust(1)
+    return builder.as_markup()
+
+
+@cached_keyboard()
 async def ik_tool_for_not_accepted_message() -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     builder.button(text="🚷", callback_data="ban_user")
@@ -338,6 +382,7 @@ async def ik_tool_for_not_accepted_message() -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@cached_keyboard()
 async def ik_tool_for_pack_users() -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     builder.button(text="✍🏻", callback_data="send_messages")
@@ -345,6 +390,7 @@ async def ik_tool_for_pack_users() -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@cached_keyboard()
 async def ik_confirm_clear_keyboard(
     yes_callback: str = _CONFIRM_YES,
     no_callback: str = _CONFIRM_NO,
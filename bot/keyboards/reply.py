@@ -2,6 +2,8 @@ import logging
 
 from aiogram.utils.keyboard import ReplyKeyboardBuilder
 
+from .cache import cached_keyboard
+
 logger = logging.getLogger(__name__)
 
 BTN_START = "🚀 Старт"
@@ -10,6 +12,7 @@ BTN_CLEAR = "🧹 Очистить"
 BTN_CANCEL = "Отмена"
 
 
+@cached_keyboard()
 async def rk_cancel():
     builder = ReplyKeyboardBuilder()
     builder.button(text=BTN_CANCEL)
@@ -17,6 +20,7 @@ async def rk_cancel():
     return builder.as_markup(resize_keyboard=True)
 
 
+@cached_keyboard()
 async def rk_processing(mode_label: str | None = None):
     """Клавиатура для процессов с файлами: старт, список, очистка, отмена."""
 
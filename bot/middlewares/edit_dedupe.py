@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import logging
+from typing import TYPE_CHECKING, Any, Final
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.methods import DeleteMessage, EditMessageReplyMarkup, EditMessageText
+
+from bot.utils.redis_keys import redis_key
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+    from aiogram.client.session.middlewares.base import NextRequestMiddlewareType
+    from aiogram.methods import Response, TelegramMethod
+    from aiogram.methods.base import TelegramType
+    from redis.asyncio import Redis
+
+logger = logging.getLogger(__name__)
+
+EDIT_DIGEST_TTL_SECONDS: Final[int] = 24 * 60 * 60
+NOT_MODIFIED: Final[str] = "message is not modified"
+NOT_MODIFIED_MESSAGE: Final[str] = (
+    f"Bad Request: {NOT_MODIFIED}: specified new message content and reply "
+    "markup are exactly the same as a current content and reply markup "
+    "of the message"
+)
+TEXT_FIELD: Final[str] = "text"
+MARKUP_FIELD: Final[str] = "markup"
+
+
+@dataclasses.dataclass
+class EditDedupeStats:
+    avoided: int = 0
+    forwarded: int = 0
+    not_modified: int = 0
+
+    def describe(self) -> str:
+        return (
+            f"правок отправлено {self.forwarded}, пропущено без запроса "
+            f"{self.avoided}, отклонено Telegram как неизмененные "
+            f"{self.not_modified}"
+        )
+
+
+edit_dedupe_stats: Final = EditDedupeStats()
+
+
+def _digest(*parts: Any) -> bytes:
+    return hashlib.blake2b(repr(parts).encode(), digest_size=16).digest()
+
+
+def _markup_digest(method: EditMessageText | EditMessageReplyMarkup) -> bytes:
+    markup = method.reply_markup
+    return _digest(markup.model_dump_json(exclude_none=True) if markup else None)
+
+
+def _text_digest(method: EditMessageText) -> bytes:
+    entities = [entity.model_dump_json() for entity in method.entities or ()]
+    return _digest(
+        method.text,
+        str(method.parse_mode),
+        entities,
+        str(method.link_preview_options),
+    )
+
+
+def _message_key(
+    chat_id: int | str | None,
+    message_id: int | None,
+    inline_message_id: str | None = None,
+) -> str | None:
+    if inline_message_id:
+        return redis_key("edits", "inline", inline_message_id)
+    if chat_id is None or message_id is None:
+        return None
+    return redis_key("edits", str(chat_id), str(message_id))
+
+
+class EditDedupeMiddleware(BaseRequestMiddleware):
+    """Не отправляет в Telegram правки, которые ничего не меняют.
+
+    Для каждого сообщения в Redis лежат дайджесты последних текста и
+    клавиатуры, которые бот в него отправил. Совпадающая правка сразу
+    завершается локальным TelegramBadRequest "message is not modified" -
+    тем же, что вернул бы Telegram, поэтому обработчики не меняются.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        stats: EditDedupeStats = edit_dedupe_stats,
+        ttl: int = EDIT_DIGEST_TTL_SECONDS,
+    ) -> None:
+        self._redis = redis
+        self._ttl = ttl
+        self.stats = stats
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        if isinstance(method, (EditMessageText, EditMessageReplyMarkup)):
+            key = _message_key(
+                method.chat_id, method.message_id, method.inline_message_id
+            )
+            if key is not None:
+                return await self._edit(make_request, bot, method, key)
+        elif isinstance(method, DeleteMessage):
+            key = _message_key(method.chat_id, method.message_id)
+            await self._redis.delete(key)
+        return await make_request(bot, method)
+
+    async def _edit(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: EditMessageText | EditMessageReplyMarkup,
+        key: str,
+    ) -> Response[TelegramType]:
+        digests = {MARKUP_FIELD: _markup_digest(method)}
+        if isinstance(method, EditMessageText):
+            digests[TEXT_FIELD] = _text_digest(method)
+
+        stored = await self._redis.hmget(key, *digests)
+        if stored == list(digests.values()):
+            self.stats.avoided += 1
+            logger.debug("Пропущена неизменная правка %s", key)
+            raise TelegramBadRequest(method=method, message=NOT_MODIFIED_MESSAGE)
+
+        try:
+            response = await make_request(bot, method)
+        except TelegramBadRequest as exc:
+            if NOT_MODIFIED in exc.message:
+                # Сообщение уже в этом виде: запоминаем, чтобы не повторять
+                self.stats.not_modified += 1
+                await self._remember(key, digests)
+            raise
+        self.stats.forwarded += 1
+        await self._remember(key, digests)
+        return response
+
+    async def _remember(self, key: str, digests: dict[str, bytes]) -> None:
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping=digests)
+            pipe.expire(key, self._ttl)
+            await pipe.execute()
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import dataclasses
+import logging
+from typing import TYPE_CHECKING, Any, Final
+
+from aiogram import BaseMiddleware
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.redis import RedisStorage
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+    from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+    from aiogram.types import TelegramObject
+
+logger = logging.getLogger(__name__)
+
+_UNSET: Final = object()
+
+
+@dataclasses.dataclass
+class FSMStats:
+    """Счетчики обращений к хранилищу FSM за один апдейт."""
+
+    reads: int = 0
+    writes: int = 0
+    cached_reads: int = 0
+    buffered_writes: int = 0
+
+
+class BufferedFSMContext(FSMContext):
+    """FSMContext, который читает хранилище один раз и пишет один раз.
+
+    Состояние и данные загружаются при первом обращении, дальше чтения
+    обслуживаются из памяти, а изменения копятся до ``flush()``.
+    ``get_data()`` отдает поверхностную копию: вложенные объекты общие
+    с кешем, как и раньше их нужно явно записывать через ``update_data``.
+    """
+
+    def __init__(
+        self,
+        storage: BaseStorage,
+        key: StorageKey,
+        raw_state: Any = _UNSET,
+    ) -> None:
+        super().__init__(storage=storage, key=key)
+        self.stats = FSMStats()
+        self._state: Any = raw_state
+        self._data: dict[str, Any] | None = None
+        self._state_dirty = False
+        self._data_dirty = False
+
+    async def get_state(self) -> str | None:
+        if self._state is _UNSET:
+            self._state = await self.storage.get_state(key=self.key)
+            self.stats.reads += 1
+        else:
+            self.stats.cached_reads += 1
+        return self._state
+
+    async def set_state(self, state: StateType = None) -> None:
+        self._state = state.state if isinstance(state, State) else state
+        self._state_dirty = True
+        self.stats.buffered_writes += 1
+
+    async def _load_data(self) -> dict[str, Any]:
+        if self._data is None:
+            self._data = await self.storage.get_data(key=self.key)
+            self.stats.reads += 1
+        else:
+            self.stats.cached_reads += 1
+        return self._data
+
+    async def get_data(self) -> dict[str, Any]:
+        return (await self._load_data()).copy()
+
+    async def get_value(self, key: str, default: Any | None = None) -> Any | None:
+        return (await self._load_data()).get(key, default)
+
+    async def set_data(self, data: dict[str, Any]) -> None:
+        self._data = data.copy()
+        self._data_dirty = True
+        self.stats.buffered_writes += 1
+
+    async def update_data(
+        self, data: dict[str, Any] | None = None, **kwargs: Any
+    ) -> dict[str, Any]:
+        if data:
+            kwargs.update(data)
+        current = await self._load_data()
+        current.update(kwargs)
+        self._data_dirty = True
+        self.stats.buffered_writes += 1
+        return current.copy()
+
+    async def clear(self) -> None:
+        await self.set_state(state=None)
+        await self.set_data({})
+
+    async def flush(self) -> None:
+        """Записывает накопленные изменения одним запросом к хранилищу."""
+        if not (self._state_dirty or self._data_dirty):
+            return
+
+        if isinstance(self.storage, RedisStorage):
+            await self._flush_redis(self.storage)
+        else:
+            if self._state_dirty:
+                await self.storage.set_state(key=self.key, state=self._state)
+            if self._data_dirty:
+                await self.storage.set_data(key=self.key, data=self._data or {})
+        self.stats.writes += 1
+        self._state_dirty = False
+        self._data_dirty = False
+
+    async def _flush_redis(self, storage: RedisStorage) -> None:
+        # Повторяет семантику RedisStorage.set_state/set_data, но в одном
+        # MULTI/EXEC вместо двух отдельных команд.
+        async with storage.redis.pipeline(transaction=True) as pipe:
+            if self._state_dirty:
+                state_key = storage.key_builder.build(self.key, "state")
+                if self._state is None:
+                    pipe.delete(state_key)
+                else:
+                    pipe.set(state_key, self._state, ex=storage.state_ttl)
+            if self._data_dirty:
+                data_key = storage.key_builder.build(self.key, "data")
+                if not self._data:
+                    pipe.delete(data_key)
+                else:
+                    pipe.set(
+                        data_key,
+                        storage.json_dumps(self._data),
+                        ex=storage.data_ttl,
+                    )
+            await pipe.execute()
+
+
+class FSMCacheMiddleware(BaseMiddleware):
+    """Подменяет ``state`` на BufferedFSMContext на время обработки апдейта.
+
+    Должен стоять после FSMContextMiddleware диспетчера: изменения
+    сбрасываются в хранилище, пока еще держится блокировка events_isolation.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        state: FSMContext | None = data.get("state")
+        if state is None or isinstance(state, BufferedFSMContext):
+            return await handler(event, data)
+
+        buffered = BufferedFSMContext(
+            state.storage,
+            state.key,
+            raw_state=data.get("raw_state", _UNSET),
+        )
+        data["state"] = buffered
+        data["fsm_stats"] = buffered.stats
+        try:
+            return await handler(event, data)
+        finally:
+            await buffered.flush()
+            logger.debug(
+                "FSM %s: reads=%s writes=%s cached_reads=%s buffered_writes=%s",
+                state.key.user_id,
+                buffered.stats.reads,
+                buffered.stats.writes,
+                buffered.stats.cached_reads,
+                buffered.stats.buffered_writes,
+            )
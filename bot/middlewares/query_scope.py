@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+
+from bot.db.diagnostics import query_scope
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+    from aiogram.types import TelegramObject
+
+
+class QueryScopeMiddleware(BaseMiddleware):
+    """Отдельная область поиска N+1 на каждый апдейт."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        if isinstance(event, Update):
+            name = f"update {event.update_id} ({event.event_type})"
+        else:
+            name = type(event).__name__
+        with query_scope(name):
+            return await handler(event, data)
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import logging
+import time
+from typing import TYPE_CHECKING, Any
+
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.types import Update
+
+from bot.utils.tracing import (
+    KIND_API,
+    current_trace,
+    finish_trace,
+    record,
+    start_trace,
+    trace_registry,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+    from aiogram import Bot
+    from aiogram.client.session.middlewares.base import NextRequestMiddlewareType
+    from aiogram.methods import Response, TelegramMethod
+    from aiogram.methods.base import TelegramType
+    from aiogram.types import TelegramObject
+
+logger = logging.getLogger(__name__)
+
+
+class TracingMiddleware(BaseMiddleware):
+    """Замеряет апдейт целиком и пишет медленные в лог с разбивкой.
+
+    Должен стоять первым среди outer-middleware апдейта, чтобы в замер
+    попали открытие сессии БД и загрузка пользователя.
+    """
+
+    def __init__(self, slow_update_ms: int) -> None:
+        self._slow_update = slow_update_ms / 1000
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        event_type = event.event_type if isinstance(event, Update) else "unknown"
+        trace, token = start_trace(event_type)
+        try:
+            return await handler(event, data)
+        finally:
+            finish_trace(token)
+            total = trace.elapsed()
+            trace_registry.observe(trace, total)
+            if total >= self._slow_update:
+                logger.warning(
+                    "Медленный апдейт %s (%s): %.0f мс, %s",
+                    event_type,
+                    trace.handler,
+                    total * 1000,
+                    trace.describe(),
+                )
+
+
+class HandlerNameMiddleware(BaseMiddleware):
+    """Inner-middleware: записывает в трассу имя выбранного обработчика."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        trace = current_trace()
+        handler_object = data.get("handler")
+        if trace is not None and handler_object is not None:
+            callback = handler_object.callback
+            trace.handler = f"{callback.__module__}.{callback.__qualname__}"
+        return await handler(event, data)
+
+
+class TracingRequestMiddleware(BaseRequestMiddleware):
+    """Считает вызовы Bot API внутри апдейта."""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        finally:
+            record(KIND_API, time.perf_counter() - started)
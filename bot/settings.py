@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -33,19 +34,98 @@ class DBSettings:
         self.password = os.environ.get(f"{_env_prefix}PASSWORD", "password")
 
 
+class UserbotSettings:
+    def __init__(self) -> None:
+        default_dir = Path(__file__).resolve().parent.parent.parent / "userbot"
+        self.project_dir = os.environ.get("USERBOT_PROJECT_DIR", str(default_dir))
+        # Интерпретатор из venv юзербота: без `uv run` на каждый запуск
+        self.python = os.environ.get(
+            "USERBOT_PYTHON", str(Path(self.project_dir) / ".venv" / "bin" / "python")
+        )
+        self.restart_backoff_max = float(
+            os.environ.get("USERBOT_RESTART_BACKOFF_MAX", 300)
+        )
+        # process - процесс на аккаунт, multiplexed - сессии в общих воркерах
+        self.runner = os.environ.get("USERBOT_RUNNER", "process")
+        self.workers = int(os.environ.get("USERBOT_WORKERS", 0)) or os.cpu_count() or 1
+        self.entrypoint = os.environ.get("USERBOT_ENTRYPOINT", "bot.runner:run")
+        # Перезапуск по утечке ресурсов, 0 - выключено
+        self.rss_limit_mb = int(os.environ.get("USERBOT_RSS_LIMIT_MB", 0))
+        self.fd_limit = int(os.environ.get("USERBOT_FD_LIMIT", 0))
+        # Ротация логов: размер активного файла и общий бюджет архивов
+        self.log_max_mb = int(os.environ.get("USERBOT_LOG_MAX_MB", 10))
+        self.log_budget_mb = int(os.environ.get("USERBOT_LOG_BUDGET_MB", 512))
+        # Ждать сигнала готовности в Redis (см. bot.utils.readiness). Включать,
+        # только если юзербот его отправляет: иначе подключение ждет таймаут.
+        self.ready_handshake = os.environ.get(
+            "USERBOT_READY_HANDSHAKE", ""
+        ).lower() in ("1", "true", "yes")
+        # Юзербот сигналит об ответах на задачи (см. bot.utils.jobs). Без
+        # этого ожидание ответа часто опрашивает БД.
+        self.job_signals = os.environ.get("USERBOT_JOB_SIGNALS", "").lower() in (
+            "1",
+            "true",
+            "yes",
+        )
+
+
+class VaultSettings:
+    def __init__(self) -> None:
+        # Ключ Fernet; пустой - хранилище сессий выключено
+        self.key = os.environ.get("SESSION_VAULT_KEY", "")
+        default_runtime = (
+            "/dev/shm/manager_for_userbot"
+            if Path("/dev/shm").is_dir()
+            else str(Path(tempfile.gettempdir()) / "manager_for_userbot")
+        )
+        self.runtime_dir = os.environ.get("SESSION_RUNTIME_DIR", default_runtime)
+        self.sync_interval_minutes = int(
+            os.environ.get("SESSION_VAULT_SYNC_MINUTES", 5)
+        )
+
+
+class WebhookSettings:
+    def __init__(self) -> None:
+        # Публичный URL вебхука; пустой - long polling. Вебхук может
+        # обслуживать несколько реплик, юзерботы и планировщик работают
+        # только на ведущей (см. bot.utils.leader)
+        self.url = os.environ.get("WEBHOOK_URL", "")
+        self.path = os.environ.get("WEBHOOK_PATH", "/webhook")
+        self.host = os.environ.get("WEBHOOK_HOST", "0.0.0.0")
+        self.port = int(os.environ.get("WEBHOOK_PORT", 8080))
+        self.secret = os.environ.get("WEBHOOK_SECRET", "")
+        # Одновременно обрабатываемые апдейты
+        self.concurrency = int(os.environ.get("WEBHOOK_CONCURRENCY", 32))
+
+
+class DiagnosticsSettings:
+    def __init__(self) -> None:
+        # Апдейты дольше порога пишутся в лог с разбивкой по БД/Redis/API
+        self.slow_update_ms = int(os.environ.get("TRACE_SLOW_UPDATE_MS", 1000))
+        # Лог медленных SQL-запросов с EXPLAIN и поиск N+1
+        self.sql_enabled = os.environ.get("SQL_DIAGNOSTICS", "").lower() in (
+            "1",
+            "true",
+            "yes",
+        )
+        self.slow_query_ms = int(os.environ.get("SQL_SLOW_QUERY_MS", 200))
+        # Сколько одинаковых запросов за апдейт/задачу считать N+1
+        self.repeat_threshold = int(os.environ.get("SQL_REPEAT_THRESHOLD", 5))
+
+
 class Settings:
     def __init__(self) -> None:
         self.bot_token = os.environ.get("BOT_TOKEN", "")
         self.path_to_folder = os.environ.get("PATH_TO_FOLDER", "sessions")
-        self.script_path = os.environ.get(
-            "SCRIPT_PATH",
-            str(Path(__file__).resolve().parent.parent / "start_bot.sh"),
-        )
         raw_sep = os.environ.get("SEP", "\n")
         self.sep = _decode_sep(raw_sep)
 
         self.db: DBSettings = DBSettings()
         self.redis: RedisSettings = RedisSettings()
+        self.userbot: UserbotSettings = UserbotSettings()
+        self.vault: VaultSettings = VaultSettings()
+        self.diagnostics: DiagnosticsSettings = DiagnosticsSettings()
+        self.webhook: WebhookSettings = WebhookSettings()
 
     def mysql_dsn(self) -> URL:
         return URL.create(
@@ -29,3 +29,8 @@ class BotState(StatesGroup):
 
 class BotFolderState(StatesGroup):
     enter_name = State()
+
+
+class ImportState(StatesGroup):
+    send_file = State()
+    choose_folder = State()
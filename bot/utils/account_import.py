@@ -0,0 +1,209 @@
+"""Массовый импорт аккаунтов из CSV и zip-архива сессий.
+
+CSV: строки ``phone,api_id,api_hash`` (заголовок необязателен, разделитель
+``,`` или ``;``). Zip: файлы ``<phone>.session`` и CSV с данными API для
+них. Для строки CSV без файла в архиве используется уже лежащий в
+``path_to_folder`` файл сессии.
+
+Код подтверждения в массовом режиме не запросить, поэтому импортируются
+только уже авторизованные сессии: каждая проверяется через
+``is_user_authorized`` не более чем ``IMPORT_CONCURRENCY`` соединениями.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import csv
+import dataclasses
+import io
+import logging
+import os
+import zipfile
+from collections.abc import Awaitable, Callable
+from pathlib import Path, PurePosixPath
+from typing import Final
+
+from bot.settings import se
+from bot.utils.func import SESSION_SUFFIX, Function
+
+logger = logging.getLogger(__name__)
+
+IMPORT_CONCURRENCY: Final[int] = 5
+IMPORT_MAX_ROWS: Final[int] = 500
+# Защита от zip-бомб: суммарный размер распакованных файлов
+IMPORT_MAX_UNPACKED_BYTES: Final[int] = 200 * 1024 * 1024
+CSV_SUFFIX: Final[str] = ".csv"
+ZIP_SUFFIX: Final[str] = ".zip"
+
+STATUS_OK: Final[str] = "ok"
+STATUS_SKIPPED: Final[str] = "skipped"
+STATUS_FAILED: Final[str] = "failed"
+
+
+class ImportFileError(Exception):
+    """Файл импорта не удалось разобрать."""
+
+
+@dataclasses.dataclass
+class ImportRow:
+    phone: str
+    api_id: int | None = None
+    api_hash: str | None = None
+    session_data: bytes | None = dataclasses.field(default=None, repr=False)
+    status: str = ""
+    detail: str = ""
+
+    @property
+    def path_session(self) -> str:
+        return os.path.abspath(f"{se.path_to_folder}/{self.phone}{SESSION_SUFFIX}")
+
+    def fail(self, detail: str, status: str = STATUS_FAILED) -> None:
+        self.status = status
+        self.detail = detail
+
+
+def normalize_phone(raw: str) -> str:
+    return "".join(ch for ch in raw if ch.isdigit())
+
+
+def stored_phone_variants(phone: str) -> tuple[str, str]:
+    """Формы, в которых номер может лежать в ``Bot.phone``.
+
+    Импорт хранит только цифры, а регистрация - номер как его ввели, то есть
+    цифры с необязательным ``+`` (другие символы она не пропускает).
+    """
+    return phone, f"+{phone}"
+
+
+def _parse_csv(text: str) -> list[ImportRow]:
+    """Строки CSV; из повторов одного номера остается последняя."""
+    try:
+        dialect = csv.Sniffer().sniff(text[:4096], delimiters=",;")
+    except csv.Error:
+        dialect = csv.excel
+    rows: dict[str, ImportRow] = {}
+    for record in csv.reader(io.StringIO(text), dialect):
+        cells = [cell.strip() for cell in record]
+        if not any(cells):
+            continue
+        phone = normalize_phone(cells[0])
+        if not phone:
+            # Заголовок или мусор
+            continue
+        row = ImportRow(phone=phone)
+        api_id = cells[1] if len(cells) > 1 else ""
+        row.api_id = int(api_id) if api_id.isdigit() else None
+        row.api_hash = (cells[2] if len(cells) > 2 else "") or None
+        rows[phone] = row
+    return list(rows.values())
+
+
+def _parse_zip(data: bytes) -> list[ImportRow]:
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(data))
+    except zipfile.BadZipFile as exc:
+        raise ImportFileError("Архив поврежден") from exc
+
+    members = [info for info in archive.infolist() if not info.is_dir()]
+    if sum(info.file_size for info in members) > IMPORT_MAX_UNPACKED_BYTES:
+        raise ImportFileError("Архив слишком большой")
+
+    rows: dict[str, ImportRow] = {}
+    sessions: dict[str, bytes] = {}
+    with archive:
+        for info in members:
+            # Из путей внутри архива берется только имя файла
+            name = PurePosixPath(info.filename).name
+            if name.endswith(SESSION_SUFFIX):
+                phone = normalize_phone(name.removesuffix(SESSION_SUFFIX))
+                if phone:
+                    sessions[phone] = archive.read(info)
+            elif name.endswith(CSV_SUFFIX):
+                text = archive.read(info).decode("utf-8-sig", errors="replace")
+                rows.update((row.phone, row) for row in _parse_csv(text))
+
+    for phone, session_data in sessions.items():
+        rows.setdefault(phone, ImportRow(phone=phone)).session_data = session_data
+    return list(rows.values())
+
+
+def parse_import_file(filename: str, data: bytes) -> list[ImportRow]:
+    """Разбирает CSV или zip; выполняется в потоке."""
+    suffix = Path(filename).suffix.lower()
+    if suffix == CSV_SUFFIX:
+        rows = _parse_csv(data.decode("utf-8-sig", errors="replace"))
+    elif suffix == ZIP_SUFFIX:
+        rows = _parse_zip(data)
+    else:
+        raise ImportFileError("Нужен файл .csv или .zip")
+    if len(rows) > IMPORT_MAX_ROWS:
+        raise ImportFileError(f"Слишком много аккаунтов, максимум {IMPORT_MAX_ROWS}")
+    return rows
+
+
+def _write_session(row: ImportRow) -> bool:
+    """Кладет сессию из архива на место; False - файл уже есть."""
+    path = Path(row.path_session)
+    if path.exists():
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as file:
+        file.write(row.session_data or b"")
+    return True
+
+
+async def _validate_row(row: ImportRow) -> None:
+    if row.api_id is None or not row.api_hash:
+        row.fail("нет api_id/api_hash")
+        return
+
+    written = False
+    if row.session_data is not None:
+        written = await asyncio.to_thread(_write_session, row)
+    elif not await asyncio.to_thread(os.path.exists, row.path_session):
+        row.fail("нет файла сессии")
+        return
+
+    result = await Function.Telethon.check_authorized(
+        row.phone, row.api_id, row.api_hash, row.path_session
+    )
+    if result.success:
+        row.status = STATUS_OK
+        row.detail = "из архива" if written else "файл уже был"
+        return
+    row.fail(str(result.message))
+    if written:
+        # Непринятую сессию из архива не оставляем в каталоге сессий
+        await asyncio.to_thread(Path(row.path_session).unlink, missing_ok=True)
+
+
+async def validate_rows(
+    rows: list[ImportRow],
+    on_progress: Callable[[int], Awaitable[None]] | None = None,
+) -> None:
+    """Проверяет строки без статуса, не больше IMPORT_CONCURRENCY сразу."""
+    semaphore = asyncio.Semaphore(IMPORT_CONCURRENCY)
+    done = 0
+
+    async def _run(row: ImportRow) -> None:
+        nonlocal done
+        async with semaphore:
+            try:
+                await _validate_row(row)
+            except Exception as exc:  # noqa: BLE001
+                logger.exception("Импорт %s", row.phone)
+                row.fail(f"ошибка: {exc}")
+        done += 1
+        if on_progress:
+            await on_progress(done)
+
+    await asyncio.gather(*(_run(row) for row in rows if not row.status))
+
+
+def build_report(rows: list[ImportRow]) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["phone", "status", "detail"])
+    writer.writerows([row.phone, row.status, row.detail] for row in rows)
+    return buffer.getvalue().encode("utf-8-sig")
@@ -0,0 +1,149 @@
+"""Хранилище крупных payload'ов вне FSM.
+
+Ответы юзербота (например, все папки со всеми ``pinned_peers``) не кладутся
+в данные FSM целиком: они сохраняются в Redis-хеш, разбитый на чанки по
+``BLOB_CHUNK_ROWS`` строк, а в FSM остается только короткий handle.
+Страница читается одним HMGET только тех чанков, которые она покрывает.
+
+Вместе с секцией можно сохранить ее индексы страниц (границы, посчитанные
+при записи, по одному на вариант отображения) в поле ``<секция>:index``:
+тогда листание читает индекс и чанки одной страницы, не распаковывая всю
+секцию. Поля чанков - ``<секция>:<номер>``, поэтому имена не пересекаются.
+"""
+
+from __future__ import annotations
+
+import logging
+import secrets
+import zlib
+from collections.abc import Mapping, Sequence
+from typing import TYPE_CHECKING, Any, Final
+
+import msgpack
+
+from bot.utils.redis_keys import redis_key
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+logger = logging.getLogger(__name__)
+
+BLOB_TTL_SECONDS: Final[int] = 60 * 60
+BLOB_CHUNK_ROWS: Final[int] = 50
+COMPRESSION_LEVEL: Final[int] = 3
+META_FIELD: Final[str] = "meta"
+INDEX_FIELD: Final[str] = "index"
+
+
+def _pack(obj: Any) -> bytes:
+    return zlib.compress(msgpack.packb(obj, use_bin_type=True), COMPRESSION_LEVEL)
+
+
+def _unpack(raw: bytes) -> Any:
+    return msgpack.unpackb(zlib.decompress(raw), raw=False)
+
+
+def _chunk_field(section: str, index: int | str) -> str:
+    return f"{section}:{index}"
+
+
+class BlobStore:
+    def __init__(self, redis: Redis, ttl: int = BLOB_TTL_SECONDS) -> None:
+        self._redis = redis
+        self._ttl = ttl
+
+    @staticmethod
+    def _key(handle: str) -> str:
+        return redis_key("blob", handle)
+
+    async def put_sections(
+        self,
+        sections: Mapping[str, list[Any]],
+        indexes: Mapping[str, Mapping[str, Sequence[int]]] | None = None,
+    ) -> str:
+        """Сохраняет именованные списки строк и возвращает handle.
+
+        ``indexes`` - ``{секция: {вариант: границы страниц}}``.
+        """
+        handle = secrets.token_hex(8)
+        counts = [[name, len(rows)] for name, rows in sections.items()]
+        mapping: dict[str, bytes] = {META_FIELD: _pack(counts)}
+        for name, rows in sections.items():
+            for index, start in enumerate(range(0, len(rows), BLOB_CHUNK_ROWS)):
+                mapping[_chunk_field(name, index)] = _pack(
+                    rows[start : start + BLOB_CHUNK_ROWS]
+                )
+        for name, variants in (indexes or {}).items():
+            mapping[_chunk_field(name, INDEX_FIELD)] = _pack(
+                {variant: list(bounds) for variant, bounds in variants.items()}
+            )
+
+        key = self._key(handle)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping=mapping)
+            pipe.expire(key, self._ttl)
+            await pipe.execute()
+        return handle
+
+    async def sections(self, handle: str) -> dict[str, int] | None:
+        """Возвращает ``{имя секции: количество строк}`` или None, если blob истек."""
+        key = self._key(handle)
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.hget(key, META_FIELD)
+            pipe.expire(key, self._ttl)
+            raw, _ = await pipe.execute()
+        if raw is None:
+            return None
+        return {name: count for name, count in _unpack(raw)}
+
+    async def page(
+        self, handle: str, section: str, start: int, stop: int
+    ) -> tuple[int, list[Any]] | None:
+        """Возвращает общее число строк секции и строки ``[start:stop]``.
+
+        Читаются только метаданные и чанки, пересекающиеся с диапазоном.
+        """
+        start = max(0, start)
+        first_chunk = start // BLOB_CHUNK_ROWS
+        last_chunk = max(first_chunk, (stop - 1) // BLOB_CHUNK_ROWS)
+        fields = [META_FIELD] + [
+            _chunk_field(section, index) for index in range(first_chunk, last_chunk + 1)
+        ]
+
+        key = self._key(handle)
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.hmget(key, fields)
+            pipe.expire(key, self._ttl)
+            values, _ = await pipe.execute()
+
+        raw_meta, *raw_chunks = values
+        if raw_meta is None:
+            return None
+        counts = {name: count for name, count in _unpack(raw_meta)}
+        if section not in counts:
+            return None
+
+        rows: list[Any] = []
+        for raw in raw_chunks:
+            if raw is None:
+                break
+            rows.extend(_unpack(raw))
+        offset = start - first_chunk * BLOB_CHUNK_ROWS
+        return counts[section], rows[offset : offset + (stop - start)]
+
+    async def page_index(
+        self, handle: str, section: str, variant: str
+    ) -> tuple[int, ...] | None:
+        """Границы страниц секции, сохраненные при записи, или None."""
+        key = self._key(handle)
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.hget(key, _chunk_field(section, INDEX_FIELD))
+            pipe.expire(key, self._ttl)
+            raw, _ = await pipe.execute()
+        if raw is None:
+            return None
+        bounds = _unpack(raw).get(variant)
+        return tuple(bounds) if bounds is not None else None
+
+    async def delete(self, handle: str) -> None:
+        await self._redis.delete(self._key(handle))
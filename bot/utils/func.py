@@ -2,39 +2,31 @@ from __future__ import annotations
 
 import asyncio
 import dataclasses
-from collections import deque
+import importlib
 import logging
 import os
 import re
-import signal
-import subprocess
 from pathlib import Path
-from typing import Any, Awaitable, Callable, Final
+from typing import TYPE_CHECKING, Any, Final
 
-import psutil  # type: ignore
 from aiogram.fsm.context import FSMContext
 from aiogram.types import Message
 from aiogram.utils.formatting import Code
 from sqlalchemy import and_, select
 from sqlalchemy.ext.asyncio import AsyncSession
-from telethon import TelegramClient  # type: ignore
-from telethon.errors import (
-    PhoneCodeExpiredError,
-    PhoneCodeInvalidError,
-    PhoneNumberBannedError,
-    PhoneNumberInvalidError,
-    SessionPasswordNeededError,
-)
-from telethon.errors.rpcerrorlist import FloodWaitError
 
 from bot.db.models import MonitoringChat, UserAnalyzed
-from bot.settings import se
+from bot.utils.logtail import compile_filter, tail_lines
+from bot.utils.pagination import MAX_PAGE_LENGTH, PageIndex, Paginator, build_page_index
+
+if TYPE_CHECKING:
+    from bot.utils.manager import Manager
+    from bot.utils.telethon_auth import Telethon
 
 logger = logging.getLogger(__name__)
 
-PID_SUFFIX: Final[str] = ".pid"
 SESSION_SUFFIX: Final[str] = ".session"
-START_BOT_SCRIPT_TIMEOUT: Final[float] = 15.0
+PROCESSED_USERS_JOINER: Final[str] = "\n\n"
 
 
 @dataclasses.dataclass
@@ -43,25 +35,38 @@ class Result:
     message: str | None
 
 
-def _pid_file(phone: str) -> Path:
-    return Path(se.path_to_folder) / f"{phone}{PID_SUFFIX}"
+class _LazyAttribute:
+    """Импортирует ``module:name`` при первом обращении к атрибуту класса.
+
+    После загрузки значение кладется прямо в класс, так что дескриптор
+    срабатывает один раз.
+    """
+
+    def __init__(self, path: str) -> None:
+        self._module, _, self._name = path.partition(":")
+        self._attr = self._name
 
+    def __set_name__(self, owner: type, name: str) -> None:
+        self._attr = name
 
-def _read_pid(pid_path: Path) -> int | None:
-    try:
-        return int(pid_path.read_text().strip())
-    except FileNotFoundError:
-        logger.info("PID-файл не найден: %s", pid_path)
-    except (OSError, ValueError) as exc:
-        logger.warning("Не удалось прочитать PID-файл %s: %s", pid_path, exc)
-    return None
+    def __get__(self, instance: object, owner: type) -> Any:
+        value = getattr(importlib.import_module(self._module), self._name)
+        setattr(owner, self._attr, value)
+        return value
 
 
 class Function:
-    max_length_message: Final[int] = 4000
+    max_length_message: Final[int] = MAX_PAGE_LENGTH
+
+    # Telethon и psutil тянут заметное время импорта, а нужны единицам
+    # обработчиков, поэтому эти части грузятся только по требованию.
+    Manager: type[Manager] = _LazyAttribute("bot.utils.manager:Manager")  # type: ignore[assignment]
+    Telethon: type[Telethon] = _LazyAttribute("bot.utils.telethon_auth:Telethon")  # type: ignore[assignment]
 
     @staticmethod
-    def get_log(path: str | os.PathLike[str], line_count: int) -> list[str] | str:
+    async def get_log(
+        path: str | os.PathLike[str], line_count: int, pattern: str | None = None
+    ) -> list[str] | str:
         if line_count <= 0:
             return "Количество строк должно быть больше нуля"
 
@@ -72,16 +77,17 @@ class Function:
             return "Указанный путь не является файлом"
 
         try:
-            with log_path.open("r", encoding="utf-8", errors="ignore") as file:
-                lines = deque(file, maxlen=line_count)
+            lines = await asyncio.to_thread(
+                tail_lines, log_path, line_count, compile_filter(pattern)
+            )
         except Exception as exc:  # noqa: BLE001
             logger.exception("Не удалось прочитать лог %s: %s", log_path, exc)
             return "Не удалось прочитать лог"
 
         if not lines:
-            return "Файл пуст"
+            return "Совпадений нет" if pattern else "Файл пуст"
 
-        return [line.rstrip("\n") for line in lines]
+        return lines
 
     @staticmethod
     async def get_closer_data_users(
@@ -151,47 +157,25 @@ class Function:
         return [item for item in unique if item not in to_remove]
 
     @staticmethod
-    async def watch_data(
-        data: list[str], sep: str, q_string_per_page: int, page: int
-    ) -> str:
-        q = max(1, q_string_per_page)
-        data_enumerate = list(enumerate(data))
-
-        while True:
-            data_ = data_enumerate[(page - 1) * q : page * q]
-            s = "".join(f"{ind + 1}) {item}{sep}" for ind, item in data_)
-
-            if len(s) <= Function.max_length_message or q == 1:
-                return s
-
-            q -= 1
-
-    @staticmethod
-    async def count_page(len_data: int, q_string_per_page: int) -> int:
-        remains = len_data % q_string_per_page
-        return len_data // q_string_per_page + (1 if remains else 0)
+    def data_paginator(data: list[str], sep: str, q_string_per_page: int) -> Paginator:
+        return Paginator.from_rows(
+            (f"{ind}) {item}{sep}" for ind, item in enumerate(data, 1)),
+            q_string_per_page,
+            Function.max_length_message,
+        )
 
     @staticmethod
-    async def watch_data_chats(
-        chats: list[MonitoringChat],
-        sep: str,
-        q_string_per_page: int,
-        page: int,
-    ) -> str:
-        q = max(1, q_string_per_page)
-        chats_enumerate = list(enumerate(chats))
-
-        while True:
-            chats_ = chats_enumerate[(page - 1) * q : page * q]
-            s = "".join(
-                f"{ind + 1}) {chat.chat_id} ({chat.title or '🌀'}){sep}"
-                for ind, chat in chats_
-            )
-
-            if len(s) <= Function.max_length_message or q == 1:
-                return s
-
-            q -= 1
+    def chats_paginator(
+        chats: list[MonitoringChat], sep: str, q_string_per_page: int
+    ) -> Paginator:
+        return Paginator.from_rows(
+            (
+                f"{ind}) {chat.chat_id} ({chat.title or '🌀'}){sep}"
+                for ind, chat in enumerate(chats, 1)
+            ),
+            q_string_per_page,
+            Function.max_length_message,
+        )
 
     @staticmethod
     def get_id_from_message(message: str) -> int | None:
@@ -201,334 +185,75 @@ class Function:
         return None
 
     @staticmethod
-    async def watch_processed_users(
-        processed_users: list[dict[str, Any]],
-        sep: str,
-        q_string_per_page: int,
-        page: int,
-        formatting: list[bool],
+    def _render_processed_user(
+        user: dict[str, Any], first_name: bool, username: bool, copy: bool
     ) -> str:
-        q = max(1, q_string_per_page)
+        parts: list[str] = []
+        for name, value in user.items():
+            if name in {"id", "phone", "last_name"}:
+                continue
+            if not username and name == "username":
+                continue
+            if not first_name and name == "first_name":
+                continue
+
+            if name == "username":
+                rendered = f"@{value}" if value else "@нет"
+            else:
+                if value is None or value == "":
+                    rendered_value = "нет значения"
+                else:
+                    rendered_value = str(value)
+                rendered = (
+                    rendered_value if copy else Code(str(rendered_value)).as_html()
+                )
+            parts.append(rendered)
+
+        parts.reverse()
+        return " - ".join(parts)
 
+    @staticmethod
+    def _processed_user_flags(formatting: list[bool]) -> tuple[bool, bool, bool]:
         # Be tolerant to older state payloads.
         first_name = formatting[0] if len(formatting) > 0 else True
         username = formatting[1] if len(formatting) > 1 else True
         copy = formatting[2] if len(formatting) > 2 else False
+        return first_name, username, copy
 
-        while True:
-            page_items = processed_users[(page - 1) * q : page * q]
-            rows: list[str] = []
-
-            for user in page_items:
-                parts: list[str] = []
-                for name, value in user.items():
-                    if name in {"id", "phone", "last_name"}:
-                        continue
-                    if not username and name == "username":
-                        continue
-                    if not first_name and name == "first_name":
-                        continue
-
-                    if name == "username":
-                        rendered = f"@{value}" if value else "@нет"
-                    else:
-                        if value is None or value == "":
-                            rendered_value = "нет значения"
-                        else:
-                            rendered_value = str(value)
-                        rendered = (
-                            rendered_value
-                            if copy
-                            else Code(str(rendered_value)).as_html()
-                        )
-                    parts.append(rendered)
-
-                parts.reverse()
-                rows.append(" - ".join(parts))
-
-            rows_str = "\n\n".join(rows)
-            if len(rows_str) <= Function.max_length_message or q == 1:
-                return Code(rows_str).as_html() if copy else rows_str
-
-            q -= 1
-
-    class Manager:
-        @staticmethod
-        async def start_bot(
-            phone: str, path_session: str, api_id: int, api_hash: str
-        ) -> int:
-            script_path = Path(se.script_path)
-            if not script_path.exists():
-                logger.error("Bash script not found: %s", script_path)
-                return -1
-
-            proc = await asyncio.create_subprocess_exec(
-                str(script_path),
-                path_session,
-                str(api_id),
-                api_hash,
-                phone,
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-                stdin=subprocess.DEVNULL,
-                preexec_fn=os.setpgrp,
-                start_new_session=True,
-            )
-
-            try:
-                await asyncio.wait_for(proc.wait(), timeout=START_BOT_SCRIPT_TIMEOUT)
-            except asyncio.TimeoutError:
-                logger.error("start_bot.sh timed out for %s", phone)
-                return -1
-
-            path_pid = _pid_file(phone)
-            pid = _read_pid(path_pid)
-            if pid:
-                logger.info("Bot started with PID: %s", pid)
-                return pid
-
-            logger.error("PID file not created for %s", phone)
-            return -1
-
-        @staticmethod
-        async def bot_run(phone: str) -> bool:
-            pid = _read_pid(_pid_file(phone))
-            return bool(pid and psutil.pid_exists(pid))
-
-        @staticmethod
-        async def stop_bot(phone: str, delete_session: bool = False) -> None:
-            pid_file = _pid_file(phone)
-            pid = _read_pid(pid_file)
-            if pid is None:
-                logger.info("PID-файл не найден для %s", phone)
-                return
+    @staticmethod
+    def formatting_key(formatting: list[bool]) -> str:
+        """Ключ варианта форматирования: ``"110"`` для [True, True, False]."""
+        flags = Function._processed_user_flags(formatting)
+        return "".join("1" if flag else "0" for flag in flags)
 
-            try:
-                os.killpg(os.getpgid(pid), signal.SIGTERM)
-                logger.info("Отправлен сигнал завершения процессу с PID: %s", pid)
-            except ProcessLookupError:
-                logger.info("Процесс не найден: %s", pid)
-            except PermissionError:
-                logger.info("Нет прав на завершение процесса: %s", pid)
-
-            files = [pid_file.name]
-            if delete_session:
-                files.append(f"{phone}{SESSION_SUFFIX}")
-            await Function.Manager.delete_files_by_name(se.path_to_folder, files)
-
-        @staticmethod
-        async def delete_files_by_name(folder_path: str, filenames: list[str]) -> None:
-            folder = Path(folder_path)
-            if not folder.exists():
-                logger.info("Папка %s не существует.", folder)
-                return
-
-            targets = set(filenames)
-            for file_path in folder.iterdir():
-                if file_path.is_file() and file_path.name in targets:
-                    try:
-                        file_path.unlink()
-                        logger.info("Удален файл: %s", file_path)
-                    except Exception as exc:  # noqa: BLE001
-                        logger.info("Не удалось удалить %s: %s", file_path, exc)
-
-    class Telethon:
-        ALREADY_AUTHORIZED = "already_authorized"
-
-        @staticmethod
-        def _is_valid_phone(phone: str) -> bool:
-            return bool(phone) and phone.lstrip("+").isdigit()
-
-        @staticmethod
-        def _is_valid_api_id(api_id: int) -> bool:
-            return isinstance(api_id, int) and api_id > 0
-
-        @staticmethod
-        def _is_valid_api_hash(api_hash: str) -> bool:
-            return isinstance(api_hash, str) and len(api_hash.strip()) == 32
-
-        @staticmethod
-        def _is_valid_session_path(path: str) -> bool:
-            session_path = str(path)
-            return bool(session_path) and session_path.endswith(SESSION_SUFFIX)
-
-        @classmethod
-        async def _with_client(
-            cls,
-            path: str,
-            api_id: int,
-            api_hash: str,
-            action: Callable[[TelegramClient], Awaitable[Result]],
-            context: str,
-        ) -> Result:
-            client: TelegramClient | None = None
-            try:
-                session_path = str(path)
-                client = TelegramClient(session_path, api_id, api_hash)
-                await client.connect()
-                logger.info(context)
-                return await action(client)
-            except Exception as exc:  # noqa: BLE001
-                logger.exception("Критическая ошибка при работе с сессией: %s", exc)
-                return Result(success=False, message="critical_error")
-            finally:
-                if client:
-                    try:
-                        await client.disconnect()  # pyright: ignore
-                    except Exception as disconnect_exc:  # noqa: BLE001
-                        logger.debug(
-                            "Ошибка при отключении клиента: %s", disconnect_exc
-                        )
-
-        @classmethod
-        async def create_telethon_session(
-            cls,
-            phone: str,
-            code: str | int,
-            api_id: int,
-            api_hash: str,
-            phone_code_hash: str,
-            password: str | None,
-            path: str,
-        ) -> Result:
-            if not cls._is_valid_phone(phone):
-                return Result(success=False, message="invalid_phone")
-            if not cls._is_valid_api_id(api_id):
-                return Result(success=False, message="invalid_api_id")
-            if not cls._is_valid_api_hash(api_hash):
-                return Result(success=False, message="invalid_api_hash")
-            if not cls._is_valid_session_path(path):
-                return Result(success=False, message="invalid_path")
-
-            code_str = str(code).strip()
-
-            async def _authorize(client: TelegramClient) -> Result:
-                if await client.is_user_authorized():
-                    me = await client.get_me()
-                    logger.info(
-                        "Пользователь уже авторизован: %s (@%s)",
-                        me.first_name,
-                        me.username,
-                    )
-                    return Result(success=True, message=None)
-
-                try:
-                    try:
-                        await client.sign_in(
-                            phone=phone, code=code_str, phone_code_hash=phone_code_hash
-                        )
-                    except SessionPasswordNeededError:
-                        if not password:
-                            logger.info("Требуется пароль 2FA для номера %s.", phone)
-                            return Result(success=False, message="password_required")
-                        await client.sign_in(password=password)
-
-                    if await client.is_user_authorized():
-                        me = await client.get_me()
-                        logger.info("Авторизация прошла успешно!")
-                        logger.info(
-                            "Пользователь: %s (@%s)", me.first_name, me.username
-                        )
-                        return Result(success=True, message=None)
-                    return Result(success=False, message="auth_failed")
-                except PhoneCodeInvalidError:
-                    logger.warning("Неверный код для номера %s.", phone)
-                    return Result(success=False, message="invalid_code")
-                except PhoneCodeExpiredError:
-                    logger.warning("Код устарел для номера %s.", phone)
-                    return Result(success=False, message="code_expired")
-                except SessionPasswordNeededError:
-                    logger.info("Требуется пароль 2FA для номера %s.", phone)
-                    return Result(success=False, message="password_required")
-                except FloodWaitError as e:
-                    logger.warning(
-                        "Ожидание FloodWait: необходимо подождать %s секунд.", e.seconds
-                    )
-                    return Result(success=False, message=f"flood_wait:{e.seconds}")
-                except Exception as exc:  # noqa: BLE001
-                    logger.exception("Неожиданная ошибка при авторизации: %s", exc)
-                    return Result(success=False, message=f"error:{exc!s}")
-
-            return await cls._with_client(
-                path,
-                api_id,
-                api_hash,
-                _authorize,
-                f"Подключение к Telegram для номера {phone}...",
-            )
+    @staticmethod
+    def processed_users_index(
+        processed_users: list[dict[str, Any]],
+        q_string_per_page: int,
+        formatting: list[bool],
+    ) -> PageIndex:
+        first_name, username, copy = Function._processed_user_flags(formatting)
+        return build_page_index(
+            [
+                len(Function._render_processed_user(user, first_name, username, copy))
+                for user in processed_users
+            ],
+            q_string_per_page,
+            Function.max_length_message,
+            joiner_length=len(PROCESSED_USERS_JOINER),
+        )
 
-        @classmethod
-        async def send_code_via_telethon(
-            cls,
-            phone: str,
-            api_id: int,
-            api_hash: str,
-            path: str,
-        ) -> Result:
-            if not cls._is_valid_phone(phone):
-                logger.warning("Неверный формат номера телефона: %s", phone)
-                return Result(success=False, message="Неверный формат номера телефона")
-            if not cls._is_valid_api_id(api_id):
-                logger.warning("Неверный API ID: %s", api_id)
-                return Result(success=False, message="Неверный API ID")
-            if not cls._is_valid_api_hash(api_hash):
-                logger.warning("Неверный или отсутствующий API Hash.")
-                return Result(success=False, message="Неверный API Hash")
-            if not cls._is_valid_session_path(path):
-                logger.warning("Некорректный путь к сессии: %s", path)
-                return Result(success=False, message="Некорректный путь к сессии")
-
-            async def _send_code(client: TelegramClient) -> Result:
-                if await client.is_user_authorized():
-                    logger.info("Пользователь с номером %s уже авторизован.", phone)
-                    return Result(success=True, message=cls.ALREADY_AUTHORIZED)
-
-                try:
-                    result = await client.send_code_request(
-                        phone=phone,
-                        force_sms=False,
-                    )
-                    phone_code_hash = result.phone_code_hash
-                    logger.info(
-                        "Код подтверждения успешно отправлен на %s. Hash: %s...",
-                        phone,
-                        phone_code_hash[:8],
-                    )
-                    return Result(success=True, message=phone_code_hash)
-                except PhoneNumberInvalidError:
-                    logger.warning("Неверный номер телефона: %s", phone)
-                    return Result(success=False, message="Неверный номер телефона")
-                except PhoneNumberBannedError:
-                    logger.exception(
-                        "Номер %s заблокирован (banned) в Telegram.", phone
-                    )
-                    return Result(success=False, message="Номер заблокирован")
-                except SessionPasswordNeededError:
-                    logger.warning(
-                        "Для номера %s требуется пароль (2FA), но сессия не авторизована.",
-                        phone,
-                    )
-                    return Result(success=False, message="Требуется пароль")
-                except FloodWaitError as e:
-                    wait_msg = f"Ограничение FloodWait: нельзя отправлять код. Подождите {e.seconds} секунд."
-                    logger.warning(wait_msg)
-                    return Result(success=False, message=wait_msg)
-                except Exception as exc:  # noqa: BLE001
-                    logger.exception(
-                        "Неизвестная ошибка при отправке кода на %s: %s", phone, exc
-                    )
-                    return Result(
-                        success=False,
-                        message=f"Неизвестная ошибка при отправке кода на {phone}: {exc}",
-                    )
-
-            return await cls._with_client(
-                path,
-                api_id,
-                api_hash,
-                _send_code,
-                f"Подключение к Telegram для отправки кода на {phone}...",
-            )
+    @staticmethod
+    def render_processed_users(
+        processed_users: list[dict[str, Any]], formatting: list[bool]
+    ) -> str:
+        """Текст страницы из уже выбранных по индексу строк."""
+        first_name, username, copy = Function._processed_user_flags(formatting)
+        rows_str = PROCESSED_USERS_JOINER.join(
+            Function._render_processed_user(user, first_name, username, copy)
+            for user in processed_users
+        )
+        return Code(rows_str).as_html() if copy and rows_str else rows_str
 
     # Backward-compatible wrappers
     @staticmethod
@@ -0,0 +1,95 @@
+"""Реестр живости юзерботов по heartbeat'ам в Redis.
+
+Контракт для юзербота: раз в ``HEARTBEAT_INTERVAL_SECONDS`` выполнять
+``SET manager_for_userbot:heartbeat:<phone> <msgpack> EX HEARTBEAT_TTL_SECONDS``,
+где payload - словарь ``{"version", "pid", "started_at", "last_activity"}``
+(время - unix timestamp). Пропавший ключ означает, что юзербот не жив.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import logging
+import time
+from collections.abc import Sequence
+from typing import TYPE_CHECKING, Any, Final
+
+import msgpack
+
+from bot.utils.redis_keys import redis_key
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_INTERVAL_SECONDS: Final[int] = 10
+HEARTBEAT_TTL_SECONDS: Final[int] = 3 * HEARTBEAT_INTERVAL_SECONDS
+
+
+def heartbeat_key(phone: str) -> str:
+    return redis_key("heartbeat", phone)
+
+
+@dataclasses.dataclass(frozen=True)
+class Heartbeat:
+    version: str | None
+    pid: int | None
+    started_at: float | None
+    last_activity: float | None
+
+    @property
+    def uptime(self) -> float | None:
+        return time.time() - self.started_at if self.started_at else None
+
+    @classmethod
+    def from_raw(cls, raw: bytes) -> Heartbeat | None:
+        try:
+            payload: dict[str, Any] = msgpack.unpackb(raw, raw=False)
+        except (ValueError, msgpack.UnpackException):
+            logger.warning("Некорректный heartbeat: %r", raw[:64])
+            return None
+        if not isinstance(payload, dict):
+            return None
+        return cls(
+            version=payload.get("version"),
+            pid=payload.get("pid"),
+            started_at=payload.get("started_at"),
+            last_activity=payload.get("last_activity"),
+        )
+
+
+async def publish_heartbeat(
+    redis: Redis,
+    phone: str,
+    *,
+    version: str | None = None,
+    pid: int | None = None,
+    started_at: float | None = None,
+    last_activity: float | None = None,
+) -> None:
+    """Эталонная запись heartbeat'а (так же пишет юзербот)."""
+    payload = {
+        "version": version,
+        "pid": pid,
+        "started_at": started_at,
+        "last_activity": last_activity,
+    }
+    await redis.set(
+        heartbeat_key(phone), msgpack.packb(payload), ex=HEARTBEAT_TTL_SECONDS
+    )
+
+
+class HeartbeatRegistry:
+    def __init__(self, redis: Redis) -> None:
+        self._redis = redis
+
+    async def fetch(self, phones: Sequence[str]) -> dict[str, Heartbeat | None]:
+        """Читает heartbeat'ы всех переданных юзерботов одним MGET."""
+        if not phones:
+            return {}
+        raws = await self._redis.mget([heartbeat_key(phone) for phone in phones])
+        return {
+            phone: Heartbeat.from_raw(raw) if raw is not None else None
+            for phone, raw in zip(phones, raws)
+        }
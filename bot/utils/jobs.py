@@ -0,0 +1,241 @@
+"""Постановка задач юзерботу и ожидание ответов из таблицы ``jobs``.
+
+Тот, кто записал ``answer`` и закоммитил транзакцию, сигналит о готовности
+задачи: ``RPUSH manager_for_userbot:job_done:<job_id> 1`` с TTL
+(см. ``signal_job_done``). Менеджер блокируется на этом ключе через BLPOP
+и ходит в БД только по сигналу либо редким контрольным опросом.
+
+Задачи, которые закрывает сам менеджер (``handle_job_from_userbot``),
+сигналятся здесь. Ответы на задачи менеджера пишет юзербот, и сигнал
+должен отправлять он. Пока он этого не делает, ``submit_and_wait`` опрашивает
+БД раз в ``POLL_INTERVAL`` секунд; с ``USERBOT_JOB_SIGNALS`` опрос
+становится контрольным, раз в ``FALLBACK_POLL_INTERVAL`` секунд.
+
+Задачи ставятся через ``JobClient``: одинаковые ожидающие задачи
+(бот, задача, хеш метаданных) схлопываются уникальным ``dedup_key`` в БД.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import time
+from collections.abc import Awaitable, Callable, Iterable
+from typing import TYPE_CHECKING, Any, Final
+
+import msgpack
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.exc import IntegrityError
+
+from bot.db.models import Job, JobName, JobStatus
+from bot.settings import se
+from bot.utils.redis_keys import redis_key
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+logger = logging.getLogger(__name__)
+
+JOB_DONE_SIGNAL_TTL_SECONDS: Final[int] = 120
+SIGNAL_WAIT_SLICE: Final[float] = 0.8
+# Опрос БД, пока юзербот не сигналит сам (как прежний цикл ожидания)
+POLL_INTERVAL: Final[float] = 0.35
+FALLBACK_POLL_INTERVAL: Final[float] = 3.0
+# BLPOP с нулевым таймаутом ждал бы бесконечно
+MIN_BLPOP_TIMEOUT: Final[float] = 0.01
+
+
+def job_done_key(job_id: int) -> str:
+    return redis_key("job_done", str(job_id))
+
+
+async def signal_job_done(redis: Redis, job_id: int) -> None:
+    """Сообщает ожидающим менеджерам, что у задачи появился ответ."""
+    await signal_jobs_done(redis, [job_id])
+
+
+async def signal_jobs_done(redis: Redis, job_ids: Iterable[int]) -> None:
+    async with redis.pipeline(transaction=True) as pipe:
+        for job_id in job_ids:
+            key = job_done_key(job_id)
+            pipe.rpush(key, 1)
+            pipe.expire(key, JOB_DONE_SIGNAL_TTL_SECONDS)
+        await pipe.execute()
+
+
+async def _load_answered_job(
+    sessionmaker: async_sessionmaker[AsyncSession], job_id: int, bot_id: int
+) -> Job | None:
+    async with sessionmaker() as session:
+        job: Job | None = await session.get(Job, job_id)
+        if not (job and job.bot_id == bot_id and job.answer):
+            return None
+        if job.answered_at is None:
+            # Ответ юзербота замечен: фиксируем время ответа и освобождаем
+            # ключ дедупликации. GC делает то же для задач, которых не ждали.
+            await session.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.answered_at.is_(None))
+                .values(
+                    status=JobStatus.done.value,
+                    answered_at=func.now(),
+                    dedup_key=None,
+                )
+            )
+            await session.commit()
+    return job
+
+
+async def wait_for_job(
+    sessionmaker: async_sessionmaker[AsyncSession],
+    redis: Redis,
+    *,
+    job_id: int,
+    bot_id: int,
+    timeout: float,
+    on_tick: Callable[[], Awaitable[None]] | None = None,
+) -> Job | None:
+    """Ждет ответа на задачу не дольше ``timeout`` секунд.
+
+    ``on_tick`` вызывается примерно раз в ``SIGNAL_WAIT_SLICE`` секунд,
+    пока ответа нет (например, для анимации в сообщении).
+    """
+    key = job_done_key(job_id)
+    poll_interval = (
+        FALLBACK_POLL_INTERVAL if se.userbot.job_signals else POLL_INTERVAL
+    )
+    deadline = time.monotonic() + timeout
+    next_db_poll = time.monotonic() + poll_interval
+
+    while (remaining := deadline - time.monotonic()) > 0:
+        wait = min(SIGNAL_WAIT_SLICE, remaining, next_db_poll - time.monotonic())
+        signalled = await redis.blpop([key], timeout=max(wait, MIN_BLPOP_TIMEOUT))
+        now = time.monotonic()
+        if signalled or now >= next_db_poll:
+            job = await _load_answered_job(sessionmaker, job_id, bot_id)
+            if job:
+                if signalled:
+                    # Возвращаем сигнал для других менеджеров, ждущих ту же
+                    # (схлопнутую) задачу.
+                    await signal_job_done(redis, job_id)
+                return job
+            if signalled:
+                logger.warning("Сигнал для job_id=%s пришел раньше ответа", job_id)
+            next_db_poll = now + poll_interval
+        if on_tick:
+            await on_tick()
+
+    return await _load_answered_job(sessionmaker, job_id, bot_id)
+
+
+def job_dedup_key(bot_id: int, task: str, task_metadata: bytes | None) -> str:
+    digest = hashlib.sha1(f"{bot_id}:{task}:".encode())
+    digest.update(task_metadata or b"")
+    return digest.hexdigest()
+
+
+class JobClient:
+    """Типизированный API задач юзербота поверх текущей сессии БД.
+
+    ``submit`` и ``cancel`` работают в транзакции переданной сессии, коммит
+    остается за вызывающим. ``submit_and_wait`` коммитит сам, иначе
+    юзербот не увидит задачу, и требует ``redis`` и ``sessionmaker``.
+    """
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        *,
+        redis: Redis | None = None,
+        sessionmaker: async_sessionmaker[AsyncSession] | None = None,
+    ) -> None:
+        self._session = session
+        self._redis = redis
+        self._sessionmaker = sessionmaker
+        # Сколько задач реально добавлено (без схлопнутых в существующие)
+        self.created = 0
+
+    async def submit(
+        self, bot_id: int, task: JobName | str, metadata: Any = None
+    ) -> int:
+        """Ставит задачу и возвращает ее id.
+
+        Если такая же задача уже ждет ответа, новая не создается и
+        возвращается id существующей.
+        """
+        task_name = task.value if isinstance(task, JobName) else task
+        task_metadata = msgpack.packb(metadata) if metadata is not None else None
+        dedup_key = job_dedup_key(bot_id, task_name, task_metadata)
+
+        for _ in range(2):
+            job = Job(
+                bot_id=bot_id,
+                task=task_name,
+                task_metadata=task_metadata,
+                dedup_key=dedup_key,
+            )
+            try:
+                async with self._session.begin_nested():
+                    self._session.add(job)
+                self.created += 1
+                return job.id
+            except IntegrityError:
+                existing = await self._session.scalar(
+                    select(Job).where(Job.dedup_key == dedup_key)
+                )
+                if existing is None:
+                    continue
+                if existing.answer is None:
+                    logger.debug(
+                        "Задача %s для bot_id=%s уже в очереди (job_id=%s)",
+                        task_name,
+                        bot_id,
+                        existing.id,
+                    )
+                    return existing.id
+                # Ответ уже есть, но GC еще не освободил ключ: освобождаем сами.
+                await self._release(existing)
+
+        raise RuntimeError(f"Не удалось поставить задачу {task_name} для {bot_id}")
+
+    async def submit_and_wait(
+        self,
+        bot_id: int,
+        task: JobName | str,
+        metadata: Any = None,
+        *,
+        timeout: float,
+        on_tick: Callable[[], Awaitable[None]] | None = None,
+    ) -> Job | None:
+        """Ставит задачу, коммитит и ждет ответа не дольше ``timeout``."""
+        if self._redis is None or self._sessionmaker is None:
+            raise RuntimeError("submit_and_wait требует redis и sessionmaker")
+
+        job_id = await self.submit(bot_id, task, metadata)
+        await self._session.commit()
+        job = await wait_for_job(
+            self._sessionmaker,
+            self._redis,
+            job_id=job_id,
+            bot_id=bot_id,
+            timeout=timeout,
+            on_tick=on_tick,
+        )
+        if job is None:
+            await self.cancel(job_id)
+            await self._session.commit()
+        return job
+
+    async def cancel(self, job_id: int) -> bool:
+        """Удаляет задачу, если юзербот еще не ответил на нее."""
+        result = await self._session.execute(
+            delete(Job).where(Job.id == job_id, Job.answer.is_(None))
+        )
+        return bool(result.rowcount)
+
+    async def _release(self, job: Job) -> None:
+        job.dedup_key = None
+        job.status = JobStatus.done.value
+        job.answered_at = func.now()
+        await self._session.flush()
@@ -0,0 +1,177 @@
+"""Ведущая реплика.
+
+Вебхук принимает любая реплика, а юзерботы (дочерние процессы
+супервизора), ``restore_connected`` и планировщик работают только на
+ведущей: иначе две реплики запустили бы одни и те же аккаунты.
+
+``LeaderElection`` держит ключ в Redis с TTL и продлевает его, остальные
+реплики раз в ``LEADER_RENEW_SECONDS`` пробуют его занять. Если ведущая
+упала или перезапустилась, не отдав ключ, обязанности переходят к другой
+реплике (или к ней же) не позже чем через TTL. Реплика, которая не смогла
+продлить ключ, останавливает обязанности до истечения TTL и снова ждет.
+
+``LeaderCalls`` - вызовы ведущей с ведомых реплик через Redis: запрос
+кладется в общий список, ведущая выполняет его и кладет ответ в ключ
+запроса. Запрос, который никто не взял до дедлайна, отбрасывается.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import logging
+import time
+import uuid
+from collections.abc import Awaitable, Callable, Mapping, Sequence
+from typing import TYPE_CHECKING, Any, Final
+
+from redis.exceptions import LockError, LockNotOwnedError, RedisError
+
+from bot.utils.redis_keys import redis_key
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+logger = logging.getLogger(__name__)
+
+LEADER_TTL_SECONDS: Final[float] = 30.0
+LEADER_RENEW_SECONDS: Final[float] = 10.0
+LEADER_CALL_TIMEOUT: Final[float] = 60.0
+LEADER_POLL_SECONDS: Final[float] = 5.0
+LEADER_REPLY_TTL_SECONDS: Final[int] = 60
+
+Duty = Callable[[], Awaitable[None]]
+
+
+class LeaderCallError(Exception):
+    """Ведущая реплика не ответила вовремя или вызов на ней упал."""
+
+
+class LeaderElection:
+    def __init__(
+        self,
+        redis: Redis,
+        on_elected: Duty,
+        on_demoted: Duty,
+        ttl: float = LEADER_TTL_SECONDS,
+        renew_interval: float = LEADER_RENEW_SECONDS,
+    ) -> None:
+        self._lock = redis.lock(redis_key("leader"), timeout=ttl, thread_local=False)
+        self._on_elected = on_elected
+        self._on_demoted = on_demoted
+        self._ttl = ttl
+        self._renew_interval = renew_interval
+
+    async def run(self) -> None:
+        """Борется за ключ до отмены; при отмене отдает его."""
+        while True:
+            try:
+                acquired = await self._lock.acquire(blocking=False)
+            except RedisError as exc:
+                logger.warning("Не удалось занять ключ ведущей реплики: %s", exc)
+                acquired = False
+            if not acquired:
+                await asyncio.sleep(self._renew_interval)
+                continue
+
+            logger.info("Реплика стала ведущей")
+            try:
+                await self._on_elected()
+                await self._hold()
+            finally:
+                await self._on_demoted()
+                with contextlib.suppress(LockError, RedisError):
+                    await self._lock.release()
+            logger.warning("Реплика больше не ведущая")
+
+    async def _hold(self) -> None:
+        """Продлевает ключ; возвращается, когда держать его дальше нельзя."""
+        renewed_at = time.monotonic()
+        while True:
+            await asyncio.sleep(self._renew_interval)
+            try:
+                await self._lock.reacquire()
+                renewed_at = time.monotonic()
+            except LockNotOwnedError:
+                logger.critical("Ключ ведущей реплики перехватили")
+                return
+            except RedisError as exc:
+                # Отдаем обязанности до истечения TTL, пока ключ не занял другой
+                if time.monotonic() - renewed_at >= self._ttl - self._renew_interval:
+                    logger.critical("Ключ ведущей реплики не продлить: %s", exc)
+                    return
+                logger.warning("Не удалось продлить ключ ведущей реплики: %s", exc)
+
+
+class LeaderCalls:
+    """Очередь вызовов ``name`` к ведущей реплике."""
+
+    def __init__(self, redis: Redis, name: str) -> None:
+        self._redis = redis
+        self._queue = redis_key("leader", name)
+        self._handlers: dict[str, Callable[..., Awaitable[Any]]] = {}
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    def register(self, op: str, handler: Callable[..., Awaitable[Any]]) -> None:
+        self._handlers[op] = handler
+
+    async def call(
+        self,
+        op: str,
+        args: Sequence[Any] = (),
+        kwargs: Mapping[str, Any] | None = None,
+        timeout: float = LEADER_CALL_TIMEOUT,
+    ) -> Any:
+        """Выполняет ``op`` на ведущей реплике; аргументы и результат - JSON."""
+        reply = redis_key("leader", "reply", uuid.uuid4().hex)
+        request = {
+            "op": op,
+            "args": list(args),
+            "kwargs": dict(kwargs or {}),
+            "reply": reply,
+            "deadline": time.time() + timeout,
+        }
+        await self._redis.rpush(self._queue, json.dumps(request))
+        popped = await self._redis.blpop([reply], timeout=timeout)
+        if popped is None:
+            raise LeaderCallError(f"{op}: ведущая реплика не ответила")
+        response = json.loads(popped[1])
+        if not response.get("ok"):
+            raise LeaderCallError(f"{op}: {response.get('error')}")
+        return response.get("result")
+
+    async def serve(self) -> None:
+        """Выполняет вызовы ведомых реплик до отмены."""
+        try:
+            while True:
+                popped = await self._redis.blpop(
+                    [self._queue], timeout=LEADER_POLL_SECONDS
+                )
+                if popped:
+                    task = asyncio.create_task(self._answer(popped[1]))
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+        finally:
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _answer(self, raw: bytes) -> None:
+        request = json.loads(raw)
+        if request["deadline"] < time.time():
+            logger.warning("Вызов %s просрочен, пропускаем", request["op"])
+            return
+        handler = self._handlers.get(request["op"])
+        try:
+            if handler is None:
+                raise LeaderCallError("неизвестная операция")
+            result = await handler(*request["args"], **request["kwargs"])
+            response = {"ok": True, "result": result}
+        except Exception as exc:  # noqa: BLE001
+            logger.exception("Вызов %s упал", request["op"])
+            response = {"ok": False, "error": str(exc)}
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.rpush(request["reply"], json.dumps(response))
+            pipe.expire(request["reply"], LEADER_REPLY_TTL_SECONDS)
+            await pipe.execute()
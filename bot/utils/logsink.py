@@ -0,0 +1,290 @@
+"""Лог юзерботов: ротация по размеру, gzip-архивы и индекс по времени.
+
+Активный файл - ``<path_to_folder>/<name>.log`` (его читают ``/log`` и
+``/log follow``). Когда он дорастает до ``USERBOT_LOG_MAX_MB``, содержимое
+сжимается в ``<path_to_folder>/logs/<name>/<name>.<начало>.log.gz``, а
+активный файл начинается заново.
+
+Архив - цепочка gzip-членов (обычный gzip, читается ``zcat``). Рядом
+лежит индекс ``.idx`` со строками ``ts member_offset skip``: время,
+смещение gzip-члена в архиве и число несжатых байт от начала члена.
+Поэтому выборка "за последние N минут" распаковывает только хвост архива.
+У активного файла свой индекс ``<name>.log.idx`` со строками ``ts offset``.
+Точность выборки - ``INDEX_INTERVAL_SECONDS``.
+
+Суммарный размер архивов всех аккаунтов ограничен
+``USERBOT_LOG_BUDGET_MB``: первыми удаляются самые старые сегменты.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import bisect
+import contextlib
+import dataclasses
+import gzip
+import logging
+import os
+import time
+from collections import deque
+from collections.abc import Iterator
+from pathlib import Path
+from typing import IO, Final
+
+from bot.settings import se
+from bot.utils.logtail import LineFilter
+
+logger = logging.getLogger(__name__)
+
+LOG_SUFFIX: Final[str] = ".log"
+INDEX_SUFFIX: Final[str] = ".idx"
+ARCHIVE_SUFFIX: Final[str] = ".log.gz"
+ARCHIVE_DIR: Final[str] = "logs"
+INDEX_INTERVAL_SECONDS: Final[float] = 10.0
+# Меньшие gzip-члены хуже сжимаются, большие - дольше распаковывать
+MEMBER_MIN_BYTES: Final[int] = 256 * 1024
+MB: Final[int] = 1024 * 1024
+
+
+def log_path(name: str) -> Path:
+    return Path(se.path_to_folder) / f"{name}{LOG_SUFFIX}"
+
+
+def archive_dir(name: str) -> Path:
+    return Path(se.path_to_folder) / ARCHIVE_DIR / name
+
+
+def _index_path(path: Path) -> Path:
+    return path.with_name(path.name + INDEX_SUFFIX)
+
+
+def _decode(raw: bytes) -> str:
+    return raw.decode("utf-8", errors="ignore").rstrip("\r\n")
+
+
+@dataclasses.dataclass(frozen=True)
+class Segment:
+    """Архивный сегмент; ``entries`` - (ts, member_offset, skip)."""
+
+    path: Path
+    entries: list[tuple[float, int, int]]
+
+    @property
+    def started_at(self) -> float:
+        return self.entries[0][0] if self.entries else self.path.stat().st_mtime
+
+    def read_from(self, since: float) -> Iterator[bytes]:
+        position = bisect.bisect_right([entry[0] for entry in self.entries], since)
+        _, offset, skip = self.entries[position - 1] if position else (0.0, 0, 0)
+        with self.path.open("rb") as raw:
+            raw.seek(offset)
+            # GzipFile дочитывает и все следующие члены цепочки
+            with gzip.GzipFile(fileobj=raw) as file:
+                file.seek(skip)
+                yield from file
+
+
+def _load_active_index(path: Path) -> list[tuple[float, int]]:
+    entries = []
+    with contextlib.suppress(FileNotFoundError):
+        for line in _index_path(path).read_text().splitlines():
+            with contextlib.suppress(ValueError):
+                ts, offset = line.split()
+                entries.append((float(ts), int(offset)))
+    return entries
+
+
+def _load_segment(path: Path) -> Segment:
+    entries = []
+    with contextlib.suppress(FileNotFoundError):
+        for line in _index_path(path).read_text().splitlines():
+            with contextlib.suppress(ValueError):
+                ts, offset, skip = line.split()
+                entries.append((float(ts), int(offset), int(skip)))
+    return Segment(path, entries)
+
+
+def segments(name: str) -> list[Segment]:
+    folder = archive_dir(name)
+    if not folder.is_dir():
+        return []
+    found = [_load_segment(path) for path in folder.glob(f"*{ARCHIVE_SUFFIX}")]
+    return sorted(found, key=lambda segment: segment.started_at)
+
+
+def _archive_target(name: str, started_at: float) -> Path:
+    folder = archive_dir(name)
+    folder.mkdir(parents=True, exist_ok=True)
+    stamp = time.strftime("%Y%m%dT%H%M%S", time.localtime(started_at))
+    target = folder / f"{name}.{stamp}{ARCHIVE_SUFFIX}"
+    suffix = 1
+    while target.exists():
+        target = folder / f"{name}.{stamp}-{suffix}{ARCHIVE_SUFFIX}"
+        suffix += 1
+    return target
+
+
+def _compress(source: Path, entries: list[tuple[float, int]], target: Path) -> None:
+    """Сжимает ``source`` в цепочку gzip-членов и пишет индекс архива."""
+    size = source.stat().st_size
+    boundaries = [0]
+    for _, offset in entries:
+        if offset - boundaries[-1] >= MEMBER_MIN_BYTES and offset < size:
+            boundaries.append(offset)
+    boundaries.append(size)
+
+    tmp = target.with_name(target.name + ".tmp")
+    member_offsets = []
+    with source.open("rb") as src, tmp.open("wb") as dst:
+        for start, end in zip(boundaries, boundaries[1:], strict=False):
+            member_offsets.append(dst.tell())
+            dst.write(gzip.compress(src.read(end - start), mtime=0))
+
+    index_lines = []
+    for ts, offset in entries:
+        member = bisect.bisect_right(boundaries, offset, hi=len(member_offsets)) - 1
+        skip = offset - boundaries[member]
+        index_lines.append(f"{ts:.3f} {member_offsets[member]} {skip}\n")
+    _index_path(target).write_text("".join(index_lines))
+    tmp.rename(target)
+
+
+def enforce_budget(budget_bytes: int | None = None) -> int:
+    """Удаляет самые старые архивы, пока их сумма больше бюджета."""
+    budget = se.userbot.log_budget_mb * MB if budget_bytes is None else budget_bytes
+    root = Path(se.path_to_folder) / ARCHIVE_DIR
+    if budget <= 0 or not root.is_dir():
+        return 0
+
+    archives = []
+    total = 0
+    for path in root.glob(f"*/*{ARCHIVE_SUFFIX}"):
+        with contextlib.suppress(FileNotFoundError):
+            stat = path.stat()
+            index = _index_path(path)
+            size = stat.st_size + (index.stat().st_size if index.exists() else 0)
+            archives.append((stat.st_mtime, size, path))
+            total += size
+
+    removed = 0
+    for _, size, path in sorted(archives):
+        if total <= budget:
+            break
+        path.unlink(missing_ok=True)
+        _index_path(path).unlink(missing_ok=True)
+        total -= size
+        removed += 1
+        logger.info("Удален архив лога %s: превышен бюджет", path)
+    return removed
+
+
+def read_since(
+    name: str,
+    since: float,
+    limit: int,
+    line_filter: LineFilter | None = None,
+) -> list[str]:
+    """Последние ``limit`` строк лога, записанных не раньше ``since``.
+
+    Просматриваются только сегменты, которые пересекаются с интервалом.
+    """
+    active = log_path(name)
+    active_index = _load_active_index(active)
+    archived = segments(name)
+    starts = [segment.started_at for segment in archived]
+    starts.append(active_index[0][0] if active_index else time.time())
+
+    lines: deque[str] = deque(maxlen=limit)
+
+    def collect(raw_lines: Iterator[bytes]) -> None:
+        for raw in raw_lines:
+            line = _decode(raw)
+            if line_filter is None or line_filter(line):
+                lines.append(line)
+
+    for position, segment in enumerate(archived):
+        if starts[position + 1] <= since:
+            continue
+        try:
+            collect(segment.read_from(since))
+        except (OSError, EOFError) as exc:
+            logger.info("Не удалось прочитать архив %s: %s", segment.path, exc)
+
+    position = bisect.bisect_right([entry[0] for entry in active_index], since)
+    offset = active_index[position - 1][1] if position else 0
+    with contextlib.suppress(FileNotFoundError), active.open("rb") as file:
+        if offset <= file.seek(0, os.SEEK_END):
+            file.seek(offset)
+            collect(iter(file))
+    return list(lines)
+
+
+class LogSink:
+    """Пишет вывод одного процесса в активный файл и ротирует его."""
+
+    def __init__(self, name: str, max_bytes: int | None = None) -> None:
+        self.name = name
+        self.path = log_path(name)
+        self._max_bytes = max_bytes or se.userbot.log_max_mb * MB
+        self._limit = self._max_bytes
+        self._file: IO[bytes] | None = None
+        self._index_file: IO[str] | None = None
+        self._index: list[tuple[float, int]] = []
+        self._size = 0
+
+    def _open(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = self.path.open("ab", buffering=0)
+        self._size = self._file.tell()
+        self._index = [
+            entry for entry in _load_active_index(self.path) if entry[1] <= self._size
+        ]
+        self._index_file = _index_path(self.path).open("a", buffering=1)
+        self._limit = max(self._max_bytes, self._size)
+
+    def _close(self) -> None:
+        for file in (self._file, self._index_file):
+            if file is not None:
+                file.close()
+        self._file = self._index_file = None
+
+    def _rotate(self) -> None:
+        self._close()
+        try:
+            started_at = self._index[0][0] if self._index else time.time()
+            _compress(self.path, self._index, _archive_target(self.name, started_at))
+        except OSError:
+            logger.exception("Не удалось заархивировать лог %s", self.path)
+            self._open()
+            # Повторим, когда файл вырастет еще на лимит
+            self._limit = self._size + self._max_bytes
+            return
+        self.path.write_bytes(b"")
+        _index_path(self.path).write_text("")
+        self._open()
+        enforce_budget()
+
+    async def open(self) -> None:
+        await asyncio.to_thread(self._open)
+
+    def _write(self, data: bytes) -> None:
+        if self._file is None or self._index_file is None:
+            self._open()
+        if self._size and self._size + len(data) > self._limit:
+            self._rotate()
+        assert self._file is not None and self._index_file is not None
+        now = time.time()
+        if not self._index or now - self._index[-1][0] >= INDEX_INTERVAL_SECONDS:
+            self._index.append((now, self._size))
+            self._index_file.write(f"{now:.3f} {self._size}\n")
+        self._file.write(data)
+        self._size += len(data)
+
+    async def write(self, data: bytes) -> None:
+        # Запись, индекс и ротация с gzip - в потоке, чтобы медленный диск
+        # не останавливал цикл событий. Вызовы идут по очереди из одного
+        # читателя вывода, поэтому блокировка не нужна.
+        await asyncio.to_thread(self._write, data)
+
+    async def close(self) -> None:
+        await asyncio.to_thread(self._close)
@@ -0,0 +1,102 @@
+"""Чтение хвоста лог-файлов без прохода по всему файлу.
+
+Файл читается с конца блоками по ``TAIL_BLOCK_SIZE``, пока не набрано
+нужное число (подходящих под фильтр) строк. Функции синхронные и
+вызываются через ``asyncio.to_thread``.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from collections.abc import Callable, Iterator
+from typing import Final
+
+TAIL_BLOCK_SIZE: Final[int] = 64 * 1024
+# Защита от гигантских "строк" без переводов строки
+MAX_LINE_BYTES: Final[int] = 64 * 1024
+
+LineFilter = Callable[[str], bool]
+
+
+def compile_filter(pattern: str | None) -> LineFilter | None:
+    """Регулярное выражение без учета регистра, иначе - подстрока."""
+    if not pattern:
+        return None
+    try:
+        regex = re.compile(pattern, re.IGNORECASE)
+    except re.error:
+        needle = pattern.lower()
+        return lambda line: needle in line.lower()
+    return lambda line: regex.search(line) is not None
+
+
+def _reverse_lines(path: str | os.PathLike[str]) -> Iterator[bytes]:
+    with open(path, "rb") as file:
+        position = file.seek(0, os.SEEK_END)
+        remainder = b""
+        while position > 0:
+            step = min(TAIL_BLOCK_SIZE, position)
+            position -= step
+            file.seek(position)
+            block = file.read(step) + remainder
+            lines = block.split(b"\n")
+            # Первая часть блока может быть обрывком строки - доберем ее
+            # со следующим (более ранним) блоком.
+            remainder = lines.pop(0)
+            if len(remainder) > MAX_LINE_BYTES:
+                yield remainder[-MAX_LINE_BYTES:]
+                remainder = b""
+            yield from reversed(lines)
+        yield remainder
+
+
+def tail_lines(
+    path: str | os.PathLike[str],
+    count: int,
+    line_filter: LineFilter | None = None,
+) -> list[str]:
+    """Последние ``count`` строк файла (после фильтра), в прямом порядке."""
+    result: list[str] = []
+    skip_trailing = True
+    for raw in _reverse_lines(path):
+        # Пустой хвост после последнего перевода строки - не строка
+        if skip_trailing:
+            skip_trailing = False
+            if not raw:
+                continue
+        line = raw.decode("utf-8", errors="ignore").rstrip("\r")
+        if line_filter and not line_filter(line):
+            continue
+        result.append(line)
+        if len(result) >= count:
+            break
+    result.reverse()
+    return result
+
+
+def read_new_lines(
+    path: str | os.PathLike[str],
+    offset: int,
+    line_filter: LineFilter | None = None,
+) -> tuple[int, list[str]]:
+    """Дочитывает полные строки с ``offset``; возвращает новый offset.
+
+    Если файл стал короче (ротация/усечение), чтение начинается сначала.
+    """
+    with open(path, "rb") as file:
+        size = file.seek(0, os.SEEK_END)
+        if size < offset:
+            offset = 0
+        file.seek(offset)
+        data = file.read(size - offset)
+    end = data.rfind(b"\n")
+    if end < 0:
+        return offset, []
+    lines = [
+        line.decode("utf-8", errors="ignore").rstrip("\r")
+        for line in data[:end].split(b"\n")
+    ]
+    if line_filter:
+        lines = [line for line in lines if line_filter(line)]
+    return offset + end + 1, lines
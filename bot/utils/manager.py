@@ -0,0 +1,367 @@
+"""Управление процессами юзерботов.
+
+Модуль загружается лениво через ``fn.Manager``. Процессами владеет
+``bot.utils.supervisor``, ``Manager`` - тонкий фасад для обработчиков.
+
+Процессы живут только на ведущей реплике (см. ``bot.utils.leader``):
+на ведомой операции над ними (``_leader_op``) уходят ведущей через
+``LeaderCalls``. ``liveness`` читает heartbeat'ы из Redis и работает на
+любой реплике.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import sys
+from collections.abc import Awaitable, Callable, Sequence
+from functools import partial
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Final, ParamSpec, TypeVar
+
+from sqlalchemy import select
+
+from bot.db.models import Bot
+from bot.settings import se
+from bot.utils.func import SESSION_SUFFIX
+from bot.utils.heartbeat import HeartbeatRegistry
+from bot.utils.leader import LeaderCalls
+from bot.utils.readiness import (
+    READY_HANDSHAKE_TIMEOUT,
+    READY_OK,
+    READY_UNAUTHORIZED,
+    reset_ready,
+    wait_ready_signal,
+)
+from bot.utils.runner import SUPERVISED_STATES, ControlError, MultiplexedRunner
+from bot.utils.session_vault import SessionVault, SessionVaultError
+from bot.utils.supervisor import (
+    ProcessSpec,
+    ProcessStatus,
+    SessionPrepareError,
+    UserbotSpec,
+    supervisor,
+)
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+logger = logging.getLogger(__name__)
+
+# Чуть больше таймаута рукопожатия: успеваем дождаться его решения
+READY_TIMEOUT: Final[float] = READY_HANDSHAKE_TIMEOUT + 5.0
+MULTIPLEXED_RUNNER: Final[str] = "multiplexed"
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+_runner: MultiplexedRunner | None = None
+_redis: Redis | None = None
+_vault: SessionVault | None = None
+_calls: LeaderCalls | None = None
+_leader = False
+# Операции над процессами без обертки: их выполняет ведущая реплика
+_leader_ops: dict[str, Callable[..., Awaitable[Any]]] = {}
+
+
+def _leader_op(func: Callable[P, Awaitable[T]]) -> Callable[P, Awaitable[T]]:
+    """Операция над процессами: на ведомой реплике ее выполняет ведущая."""
+    _leader_ops[func.__name__] = func
+
+    @functools.wraps(func)
+    async def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
+        if _leader or _calls is None:
+            return await func(*args, **kwargs)
+        result = await _calls.call(func.__name__, args, kwargs)
+        # Из словарей по сети приходит только ProcessStatus
+        if isinstance(result, dict):
+            return ProcessStatus.from_dict(result)  # type: ignore[return-value]
+        return result  # type: ignore[no-any-return]
+
+    return wrapper
+
+
+async def _serve_leader_op(name: str, *args: Any, **kwargs: Any) -> Any:
+    result = await _leader_ops[name](*args, **kwargs)
+    return result.to_dict() if isinstance(result, ProcessStatus) else result
+
+
+async def _discard_auth_client(phone: str) -> None:
+    """Закрывает клиент авторизации, который держит файл сессии ``phone``."""
+    # Пул есть, только если модуль уже загружен: не тянем telethon ради него
+    module = sys.modules.get("bot.utils.telethon_auth")
+    if module is not None:
+        await module.auth_pool.discard(phone)
+
+
+def _multiplexed() -> MultiplexedRunner | None:
+    """Раннер мультиплексного режима или None в режиме процесс-на-аккаунт."""
+    global _runner
+    if se.userbot.runner != MULTIPLEXED_RUNNER:
+        return None
+    if _runner is None:
+        _runner = MultiplexedRunner(se.userbot.workers)
+    return _runner
+
+
+async def _reset_handshake(redis: Redis, spec: ProcessSpec) -> None:
+    # До запуска: быстрый процесс может прислать сигнал раньше, чем
+    # супервизор начнет его ждать
+    await reset_ready(redis, spec.name)
+
+
+async def _handshake_ready(
+    redis: Redis, spec: ProcessSpec, process: asyncio.subprocess.Process
+) -> bool:
+    """Готовность юзербота по сигналу в Redis (см. ``bot.utils.readiness``)."""
+    status = await wait_ready_signal(
+        redis,
+        spec.name,
+        READY_HANDSHAKE_TIMEOUT,
+        alive=lambda: process.returncode is None,
+    )
+    if status == READY_OK:
+        return True
+    if status is None and process.returncode is None:
+        # Юзербот без поддержки сигнала: считаем готовым, раз он жив
+        logger.warning("Юзербот %s не прислал сигнал готовности", spec.name)
+        return True
+    if status == READY_UNAUTHORIZED:
+        logger.info("Юзербот %s: сессия не авторизована", spec.name)
+    return False
+
+
+class Manager:
+    @staticmethod
+    def configure(
+        redis: Redis, sessionmaker: async_sessionmaker[AsyncSession] | None = None
+    ) -> None:
+        """Настраивает менеджер при старте.
+
+        ``USERBOT_READY_HANDSHAKE`` включает рукопожатие готовности через
+        Redis, без него готовность - grace-период супервизора. С
+        ``sessionmaker`` и заданным ``SESSION_VAULT_KEY`` сессии берутся из
+        хранилища (см. ``bot.utils.session_vault``).
+        """
+        global _redis, _vault, _calls
+        _calls = LeaderCalls(redis, "manager")
+        for name in _leader_ops:
+            _calls.register(name, partial(_serve_leader_op, name))
+        if se.userbot.ready_handshake:
+            _redis = redis
+            supervisor.set_ready_check(
+                partial(_handshake_ready, redis),
+                before_spawn=partial(_reset_handshake, redis),
+            )
+        if sessionmaker is not None and se.vault.key:
+            _vault = SessionVault(se.vault.key, sessionmaker)
+
+    @staticmethod
+    def vault() -> SessionVault | None:
+        return _vault
+
+    @staticmethod
+    def set_leader(leader: bool) -> None:
+        """Реплика стала ведущей или перестала ею быть."""
+        global _leader
+        _leader = leader
+
+    @staticmethod
+    async def serve_calls() -> None:
+        """Выполняет операции ведомых реплик; работает на ведущей до отмены."""
+        if _calls is not None:
+            await _calls.serve()
+
+    @staticmethod
+    async def start_bot(
+        phone: str,
+        path_session: str,
+        api_id: int,
+        api_hash: str,
+        bot_id: int | None = None,
+    ) -> int:
+        """Запускает юзербот.
+
+        Хранилище сессий привязано к ``Bot.id``: без ``bot_id`` (бот еще не
+        сохранен в БД) сессия берется из ``path_session`` напрямую.
+        """
+        # Клиент авторизации живет на реплике, которая принимала код
+        await _discard_auth_client(phone)
+        return await Manager._launch(phone, path_session, api_id, api_hash, bot_id)
+
+    @staticmethod
+    @_leader_op
+    async def _launch(
+        phone: str,
+        path_session: str,
+        api_id: int,
+        api_hash: str,
+        bot_id: int | None,
+    ) -> int:
+        if _vault and bot_id is not None:
+            try:
+                path_session = await _vault.checkout(bot_id, path_session)
+            except SessionVaultError as exc:
+                logger.error("Сессия %s из хранилища недоступна: %s", phone, exc)
+                return -1
+        spec = UserbotSpec(
+            phone=phone, path_session=path_session, api_id=api_id, api_hash=api_hash
+        )
+        runner = _multiplexed()
+        try:
+            if runner:
+                if _redis and not await Manager.bot_run(phone):
+                    await reset_ready(_redis, phone)
+                pid = await runner.start(spec)
+            else:
+                pid = (await supervisor.start(spec)).pid
+        except SessionPrepareError as exc:
+            logger.error("Не удалось подготовить сессию %s: %s", phone, exc)
+            return -1
+        except (OSError, ControlError) as exc:
+            logger.error("Не удалось запустить юзербот %s: %s", phone, exc)
+            return -1
+        return pid or -1
+
+    @staticmethod
+    @_leader_op
+    async def bot_run(phone: str) -> bool:
+        if runner := _multiplexed():
+            session = await runner.status(phone)
+            return bool(session and session["state"] in SUPERVISED_STATES)
+        status = supervisor.status(phone)
+        return bool(status and status.supervised)
+
+    @staticmethod
+    async def liveness(redis: Redis, phones: Sequence[str]) -> dict[str, bool]:
+        """Живость юзерботов: heartbeat в Redis либо процесс под супервизором.
+
+        Heartbeat'ы читаются одним MGET, статус супервизора - из памяти.
+        """
+        heartbeats = await HeartbeatRegistry(redis).fetch(phones)
+        if runner := _multiplexed():
+            sessions = await runner.statuses()
+            supervised = {
+                phone
+                for phone, session in sessions.items()
+                if session["state"] in SUPERVISED_STATES
+            }
+        else:
+            supervised = {
+                name
+                for name, status in supervisor.statuses().items()
+                if status.supervised
+            }
+        return {
+            phone: heartbeats.get(phone) is not None or phone in supervised
+            for phone in phones
+        }
+
+    @staticmethod
+    @_leader_op
+    async def wait_ready(phone: str, timeout: float = READY_TIMEOUT) -> bool:
+        if runner := _multiplexed():
+            if _redis:
+                status = await wait_ready_signal(_redis, phone, timeout)
+                if status is not None:
+                    return status == READY_OK
+                # Сигнала нет (юзербот без его поддержки): решает статус воркера
+                timeout = 0.0
+            return await runner.wait_ready(phone, timeout)
+        return await supervisor.wait_ready(phone, timeout)
+
+    @staticmethod
+    @_leader_op
+    async def status(phone: str) -> ProcessStatus | None:
+        """Статус процесса юзербота, в мультиплексном режиме - его воркера."""
+        if runner := _multiplexed():
+            return supervisor.status(runner.worker_for(phone).name)
+        return supervisor.status(phone)
+
+    @staticmethod
+    @_leader_op
+    async def restart_bot(phone: str) -> ProcessStatus | None:
+        if runner := _multiplexed():
+            spec = runner.spec(phone)
+            if spec is None:
+                return None
+            await runner.stop(phone)
+            await runner.start(spec)
+            return await Manager.status(phone)
+        return await supervisor.restart(phone)
+
+    @staticmethod
+    async def stop_bot(
+        phone: str, delete_session: bool = False, bot_id: int | None = None
+    ) -> None:
+        if delete_session:
+            await _discard_auth_client(phone)
+        await Manager._halt(phone, delete_session, bot_id)
+
+    @staticmethod
+    @_leader_op
+    async def _halt(phone: str, delete_session: bool, bot_id: int | None) -> None:
+        if runner := _multiplexed():
+            await runner.stop(phone)
+        else:
+            await supervisor.stop(phone)
+        if _vault and bot_id is not None:
+            if delete_session:
+                await _vault.forget(bot_id)
+            else:
+                await _vault.checkin(bot_id)
+        if delete_session:
+            await Manager.delete_files_by_name(
+                se.path_to_folder, [f"{phone}{SESSION_SUFFIX}"]
+            )
+
+    @staticmethod
+    async def restore_connected(
+        sessionmaker: async_sessionmaker[AsyncSession],
+    ) -> int:
+        """Поднимает юзерботы, которые в БД помечены подключенными."""
+        async with sessionmaker() as session:
+            bots = (
+                await session.execute(
+                    select(
+                        Bot.id, Bot.phone, Bot.path_session, Bot.api_id, Bot.api_hash
+                    ).where(Bot.is_connected.is_(True))
+                )
+            ).all()
+
+        started = 0
+        for bot_id, phone, path_session, api_id, api_hash in bots:
+            pid = await Manager.start_bot(
+                phone, path_session, api_id, api_hash, bot_id=bot_id
+            )
+            if pid > 0:
+                started += 1
+        logger.info("Восстановлено юзерботов: %s из %s", started, len(bots))
+        return started
+
+    @staticmethod
+    async def stop_all() -> None:
+        global _runner
+        await supervisor.stop_all()
+        # Новый раннер на следующей ведущей реплике начнет с чистого списка
+        _runner = None
+        if _vault:
+            await _vault.checkin_all()
+
+    @staticmethod
+    async def delete_files_by_name(folder_path: str, filenames: list[str]) -> None:
+        folder = Path(folder_path)
+        if not folder.exists():
+            logger.info("Папка %s не существует.", folder)
+            return
+
+        targets = set(filenames)
+        for file_path in folder.iterdir():
+            if file_path.is_file() and file_path.name in targets:
+                try:
+                    file_path.unlink()
+                    logger.info("Удален файл: %s", file_path)
+                except Exception as exc:  # noqa: BLE001
+                    logger.info("Не удалось удалить %s: %s", file_path, exc)
@@ -0,0 +1,103 @@
+"""Кэш отрисованных страниц списков ИТОИ и бана.
+
+Страницы списка менеджера лежат в Redis-хеше
+``manager_for_userbot:pages:<manager>:<type>:<version>``: поле ``pages`` -
+число страниц, поле ``<N>`` - текст страницы N, ``last`` - последней.
+Версия списка - счетчик ``manager_for_userbot:pages:ver:<manager>:<type>``,
+который обработчики добавления/удаления увеличивают через ``bump``.
+Хеши старых версий больше не читаются и истекают по TTL.
+
+Листание - один round trip: в пайплайне читаются текущая версия и страница
+из хеша версии, известной по FSM. Если версия сменилась, это промах. При
+открытии списка версия еще не известна и читается отдельным GET.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import logging
+from typing import TYPE_CHECKING, Final
+
+from bot.utils.redis_keys import redis_key
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+    from bot.utils.pagination import Paginator
+
+logger = logging.getLogger(__name__)
+
+PAGE_CACHE_TTL_SECONDS: Final[int] = 60 * 60
+PAGES_FIELD: Final[str] = "pages"
+LAST_FIELD: Final[str] = "last"
+
+
+@dataclasses.dataclass(frozen=True)
+class CachedPage:
+    text: str
+    page: int
+    pages: int
+    version: int
+
+
+class PageCache:
+    def __init__(self, redis: Redis, ttl: int = PAGE_CACHE_TTL_SECONDS) -> None:
+        self._redis = redis
+        self._ttl = ttl
+
+    @staticmethod
+    def _version_key(manager_id: int, list_type: str) -> str:
+        return redis_key("pages", "ver", str(manager_id), list_type)
+
+    @staticmethod
+    def _pages_key(manager_id: int, list_type: str, version: int) -> str:
+        return redis_key("pages", str(manager_id), list_type, str(version))
+
+    async def version(self, manager_id: int, list_type: str) -> int:
+        raw = await self._redis.get(self._version_key(manager_id, list_type))
+        return int(raw or 0)
+
+    async def bump(self, manager_id: int, list_type: str) -> None:
+        """Список изменился: все закэшированные страницы устарели."""
+        await self._redis.incr(self._version_key(manager_id, list_type))
+
+    async def fetch(
+        self,
+        manager_id: int,
+        list_type: str,
+        version: int | None,
+        page: int | None,
+    ) -> CachedPage | None:
+        """Страница (``None`` - последняя) из кэша версии ``version``."""
+        if version is None:
+            version = await self.version(manager_id, list_type)
+        field = str(page) if page else LAST_FIELD
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.get(self._version_key(manager_id, list_type))
+            pipe.hmget(
+                self._pages_key(manager_id, list_type, version), PAGES_FIELD, field
+            )
+            current, (pages, text) = await pipe.execute()
+        if int(current or 0) != version or pages is None or text is None:
+            return None
+        pages = int(pages)
+        return CachedPage(text.decode(), page or pages, pages, version)
+
+    async def store(
+        self,
+        manager_id: int,
+        list_type: str,
+        version: int,
+        paginator: Paginator,
+    ) -> None:
+        """Кладет все страницы списка одним HSET."""
+        mapping = {PAGES_FIELD: paginator.pages}
+        for page in range(1, paginator.pages + 1):
+            mapping[str(page)] = paginator.render(page)
+        if paginator.pages:
+            mapping[LAST_FIELD] = mapping[str(paginator.pages)]
+        key = self._pages_key(manager_id, list_type, version)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping=mapping)
+            pipe.expire(key, self._ttl)
+            await pipe.execute()
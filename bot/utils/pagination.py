@@ -0,0 +1,100 @@
+"""Разбиение списков на страницы с учетом длины сообщения.
+
+Строки рендерятся один раз, границы страниц строятся за один проход по
+накопленной длине: страница - не больше ``per_page`` строк и не больше
+``max_length`` символов (строка длиннее лимита занимает страницу одна).
+Число страниц, границы и текст страницы берутся из одного ``PageIndex``,
+поэтому не расходятся между собой.
+
+Границы ``PageIndex`` можно посчитать один раз и сохранить рядом с данными
+(см. ``bot.utils.blob_store``), чтобы потом читать только строки страницы.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+from collections.abc import Iterable, Sequence
+from typing import Final
+
+MAX_PAGE_LENGTH: Final[int] = 4000
+
+
+@dataclasses.dataclass(frozen=True)
+class PageIndex:
+    """Начала страниц и конец последней: страница N - ``bounds[N-1:N+1]``."""
+
+    bounds: tuple[int, ...]
+
+    @property
+    def pages(self) -> int:
+        return max(len(self.bounds) - 1, 0)
+
+    def clamp(self, page: int) -> int:
+        """Номер страницы в пределах ``1..pages`` (0, если страниц нет)."""
+        if not self.pages:
+            return 0
+        return min(max(page, 1), self.pages)
+
+    def span(self, page: int) -> tuple[int, int]:
+        page = self.clamp(page)
+        if not page:
+            return 0, 0
+        return self.bounds[page - 1], self.bounds[page]
+
+
+def build_page_index(
+    lengths: Sequence[int],
+    per_page: int,
+    max_length: int = MAX_PAGE_LENGTH,
+    joiner_length: int = 0,
+) -> PageIndex:
+    per_page = max(1, per_page)
+    bounds = [0]
+    start = 0
+    size = 0
+    for position, length in enumerate(lengths):
+        extra = length + (joiner_length if position > start else 0)
+        if position > start and (
+            position - start >= per_page or size + extra > max_length
+        ):
+            bounds.append(position)
+            start = position
+            size = length
+        else:
+            size += extra
+    if lengths:
+        bounds.append(len(lengths))
+    return PageIndex(tuple(bounds))
+
+
+@dataclasses.dataclass(frozen=True)
+class Paginator:
+    rows: tuple[str, ...]
+    index: PageIndex
+    joiner: str = ""
+
+    @classmethod
+    def from_rows(
+        cls,
+        rows: Iterable[str],
+        per_page: int,
+        max_length: int = MAX_PAGE_LENGTH,
+        joiner: str = "",
+    ) -> Paginator:
+        rendered = tuple(rows)
+        index = build_page_index(
+            [len(row) for row in rendered], per_page, max_length, len(joiner)
+        )
+        return cls(rendered, index, joiner)
+
+    @property
+    def pages(self) -> int:
+        return self.index.pages
+
+    def clamp(self, page: int) -> int:
+        return self.index.clamp(page)
+
+    def render(self, page: int) -> str:
+        start, end = self.index.span(page)
+        return self.joiner.join(self.rows[start:end])
+
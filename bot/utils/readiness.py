@@ -0,0 +1,68 @@
+"""Сигнал готовности юзербота.
+
+Контракт для юзербота: после ``client.connect()`` и проверки авторизации
+выполнить ``RPUSH manager_for_userbot:ready:<phone> <status>`` и ``EXPIRE``
+на ``READY_TTL_SECONDS``, где ``status`` - ``ok`` или ``unauthorized``
+(см. ``signal_ready``). Менеджер очищает ключ перед запуском и ждет его
+через BLPOP, поэтому подключение занимает ровно реальное время старта.
+
+Прочитанный сигнал кладется обратно, чтобы его увидели все ожидающие
+(супервизор и обработчик подключения).
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Final
+
+from bot.utils.redis_keys import redis_key
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+logger = logging.getLogger(__name__)
+
+READY_OK: Final[str] = "ok"
+READY_UNAUTHORIZED: Final[str] = "unauthorized"
+READY_TTL_SECONDS: Final[int] = 300
+READY_HANDSHAKE_TIMEOUT: Final[float] = 30.0
+SIGNAL_WAIT_SLICE: Final[float] = 1.0
+
+
+def ready_key(phone: str) -> str:
+    return redis_key("ready", phone)
+
+
+async def reset_ready(redis: Redis, phone: str) -> None:
+    await redis.delete(ready_key(phone))
+
+
+async def signal_ready(redis: Redis, phone: str, status: str = READY_OK) -> None:
+    """Эталонная отправка сигнала (так же делает юзербот)."""
+    key = ready_key(phone)
+    async with redis.pipeline(transaction=True) as pipe:
+        pipe.rpush(key, status)
+        pipe.expire(key, READY_TTL_SECONDS)
+        await pipe.execute()
+
+
+async def wait_ready_signal(
+    redis: Redis,
+    phone: str,
+    timeout: float,
+    alive: Callable[[], bool] | None = None,
+) -> str | None:
+    """Ждет сигнала готовности; None - таймаут или процесс умер раньше."""
+    key = ready_key(phone)
+    deadline = time.monotonic() + timeout
+    while (remaining := deadline - time.monotonic()) > 0:
+        popped = await redis.blpop([key], timeout=min(SIGNAL_WAIT_SLICE, remaining))
+        if popped:
+            status = popped[1].decode()
+            await signal_ready(redis, phone, status)
+            return status
+        if alive and not alive():
+            return None
+    return None
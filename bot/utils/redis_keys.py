@@ -0,0 +1,9 @@
+from __future__ import annotations
+
+from typing import Final
+
+REDIS_PREFIX: Final[str] = "manager_for_userbot"
+
+
+def redis_key(*parts: str) -> str:
+    return ":".join((REDIS_PREFIX, *parts))
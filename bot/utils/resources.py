@@ -0,0 +1,181 @@
+"""Сэмплирование ресурсов процессов юзерботов.
+
+Раз в ``SAMPLE_INTERVAL_SECONDS`` для каждого процесса под супервизором
+(вместе с его потомками) снимаются CPU%, RSS, число открытых FD и потоков.
+Сэмплы пишутся в Redis-список ``manager_for_userbot:resources:<name>``
+(LPUSH + LTRIM), новые в начале.
+
+Если заданы ``USERBOT_RSS_LIMIT_MB``/``USERBOT_FD_LIMIT``, процесс, который
+превышает лимит ``LIMIT_STRIKES`` сэмплов подряд, перезапускается.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import logging
+import time
+from typing import TYPE_CHECKING, Any, Final
+
+import msgpack
+
+from bot.settings import se
+from bot.utils.redis_keys import redis_key
+from bot.utils.supervisor import supervisor
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_INTERVAL_SECONDS: Final[int] = 15
+SERIES_LENGTH: Final[int] = 240
+SERIES_TTL_SECONDS: Final[int] = 6 * 60 * 60
+LIMIT_STRIKES: Final[int] = 3
+MB: Final[int] = 1024 * 1024
+
+
+def resources_key(name: str) -> str:
+    return redis_key("resources", name)
+
+
+@dataclasses.dataclass(frozen=True)
+class ResourceSample:
+    ts: float
+    cpu_percent: float
+    rss: int
+    fds: int
+    threads: int
+    processes: int
+
+    def pack(self) -> bytes:
+        return msgpack.packb(dataclasses.astuple(self))
+
+    @classmethod
+    def unpack(cls, raw: bytes) -> ResourceSample:
+        return cls(*msgpack.unpackb(raw))
+
+    def describe(self) -> str:
+        return (
+            f"CPU {self.cpu_percent:.1f}% · RSS {self.rss / MB:.0f} MB · "
+            f"FD {self.fds} · потоков {self.threads}"
+        )
+
+
+async def latest_sample(redis: Redis, name: str) -> ResourceSample | None:
+    raw = await redis.lindex(resources_key(name), 0)
+    return ResourceSample.unpack(raw) if raw else None
+
+
+async def sample_history(
+    redis: Redis, name: str, count: int = SERIES_LENGTH
+) -> list[ResourceSample]:
+    raws = await redis.lrange(resources_key(name), 0, count - 1)
+    return [ResourceSample.unpack(raw) for raw in raws]
+
+
+class ResourceSampler:
+    """Держит объекты psutil между проходами: CPU% считается по дельте."""
+
+    def __init__(self) -> None:
+        self._processes: dict[int, Any] = {}
+        self._strikes: dict[str, int] = {}
+
+    def _sample_tree(self, pid: int, visited: set[int]) -> ResourceSample | None:
+        # psutil импортируется лениво: модуль нужен и обработчикам ради
+        # latest_sample, а им psutil ни к чему.
+        import psutil  # type: ignore
+
+        try:
+            root = self._processes.get(pid)
+            if root is None or not root.is_running():
+                # PID мог достаться новому процессу
+                root = psutil.Process(pid)
+            tree = [root, *root.children(recursive=True)]
+        except psutil.NoSuchProcess:
+            self._processes.pop(pid, None)
+            return None
+
+        cpu = 0.0
+        rss = fds = threads = 0
+        alive = 0
+        for proc in tree:
+            cached = self._processes.get(proc.pid)
+            if cached is not None and cached.is_running():
+                proc = cached
+            self._processes[proc.pid] = proc
+            visited.add(proc.pid)
+            try:
+                with proc.oneshot():
+                    cpu += proc.cpu_percent(interval=None)
+                    rss += proc.memory_info().rss
+                    fds += proc.num_fds()
+                    threads += proc.num_threads()
+                alive += 1
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                self._processes.pop(proc.pid, None)
+        if not alive:
+            return None
+        return ResourceSample(
+            ts=time.time(),
+            cpu_percent=cpu,
+            rss=rss,
+            fds=fds,
+            threads=threads,
+            processes=alive,
+        )
+
+    def _sample_all(self, targets: dict[str, int]) -> dict[str, ResourceSample]:
+        samples = {}
+        visited: set[int] = set()
+        for name, pid in targets.items():
+            sample = self._sample_tree(pid, visited)
+            if sample:
+                samples[name] = sample
+        # Процессы, которых не было ни в одном дереве, больше не нужны
+        for pid in self._processes.keys() - visited:
+            del self._processes[pid]
+        return samples
+
+    def _over_limit(self, sample: ResourceSample) -> str | None:
+        rss_limit = se.userbot.rss_limit_mb
+        if rss_limit and sample.rss > rss_limit * MB:
+            return f"RSS {sample.rss / MB:.0f} MB > {rss_limit} MB"
+        fd_limit = se.userbot.fd_limit
+        if fd_limit and sample.fds > fd_limit:
+            return f"FD {sample.fds} > {fd_limit}"
+        return None
+
+    async def run(self, redis: Redis) -> None:
+        targets = {
+            name: status.pid
+            for name, status in supervisor.statuses().items()
+            if status.pid
+        }
+        if not targets:
+            self._processes.clear()
+            return
+        samples = await asyncio.to_thread(self._sample_all, targets)
+
+        async with redis.pipeline(transaction=False) as pipe:
+            for name, sample in samples.items():
+                key = resources_key(name)
+                pipe.lpush(key, sample.pack())
+                pipe.ltrim(key, 0, SERIES_LENGTH - 1)
+                pipe.expire(key, SERIES_TTL_SECONDS)
+            await pipe.execute()
+
+        for name, sample in samples.items():
+            reason = self._over_limit(sample)
+            if reason is None:
+                self._strikes.pop(name, None)
+                continue
+            strikes = self._strikes[name] = self._strikes.get(name, 0) + 1
+            if strikes < LIMIT_STRIKES:
+                continue
+            logger.warning("Перезапуск %s по лимиту ресурсов: %s", name, reason)
+            self._strikes.pop(name, None)
+            await supervisor.restart(name)
+
+
+sampler: Final[ResourceSampler] = ResourceSampler()
@@ -0,0 +1,213 @@
+"""Мультиплексный режим: много сессий юзербота в общих воркерах.
+
+Воркеры (``userbot_worker.py``) запускаются супервизором интерпретатором
+юзербота, их число - ``USERBOT_WORKERS`` (по умолчанию число CPU).
+Телефоны распределяются по воркерам консистентным хешированием, так что
+изменение числа воркеров переносит лишь часть сессий. Управление идет по
+unix-сокетам воркеров в ``<path_to_folder>/runner/``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import bisect
+import contextlib
+import dataclasses
+import hashlib
+import json
+import logging
+import time
+from collections.abc import Sequence
+from functools import partial
+from pathlib import Path
+from typing import Any, Final
+
+from bot.settings import se
+from bot.utils.supervisor import ProcessSpec, UserbotSpec, supervisor
+
+logger = logging.getLogger(__name__)
+
+WORKER_SCRIPT: Final[Path] = Path(__file__).with_name("userbot_worker.py")
+RUNNER_DIR_NAME: Final[str] = "runner"
+HASH_REPLICAS: Final[int] = 64
+CONTROL_TIMEOUT: Final[float] = 5.0
+SOCKET_WAIT_SECONDS: Final[float] = 15.0
+STATUS_POLL_INTERVAL: Final[float] = 0.5
+SUPERVISED_STATES: Final[frozenset[str]] = frozenset({"starting", "running", "backoff"})
+
+
+class ControlError(Exception):
+    """Воркер недоступен или отклонил команду."""
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.sha1(value.encode()).digest()[:8], "big")
+
+
+class HashRing:
+    def __init__(self, nodes: Sequence[int], replicas: int = HASH_REPLICAS) -> None:
+        ring = sorted(
+            (_hash(f"{node}:{replica}"), node)
+            for node in nodes
+            for replica in range(replicas)
+        )
+        self._hashes = [point for point, _ in ring]
+        self._nodes = [node for _, node in ring]
+
+    def node_for(self, key: str) -> int:
+        index = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._nodes[index]
+
+
+@dataclasses.dataclass(frozen=True)
+class WorkerSpec:
+    index: int
+
+    @property
+    def name(self) -> str:
+        return f"worker-{self.index}"
+
+    @property
+    def socket_path(self) -> Path:
+        # Воркер работает из каталога юзербота, путь должен быть абсолютным
+        return Path(se.path_to_folder).resolve() / RUNNER_DIR_NAME / f"{self.name}.sock"
+
+    def argv(self) -> list[str]:
+        return [
+            se.userbot.python,
+            str(WORKER_SCRIPT),
+            "--socket",
+            str(self.socket_path),
+            "--entrypoint",
+            se.userbot.entrypoint,
+        ]
+
+    def prepare(self) -> None:
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+
+
+async def _request(socket_path: Path, payload: dict[str, Any]) -> dict[str, Any]:
+    try:
+        async with asyncio.timeout(CONTROL_TIMEOUT):
+            reader, writer = await asyncio.open_unix_connection(str(socket_path))
+            try:
+                writer.write(json.dumps(payload).encode() + b"\n")
+                await writer.drain()
+                line = await reader.readline()
+            finally:
+                writer.close()
+        response = json.loads(line)
+    except (OSError, TimeoutError, ValueError) as exc:
+        raise ControlError(f"{socket_path.name}: {exc}") from exc
+    if not response.get("ok"):
+        raise ControlError(f"{socket_path.name}: {response.get('error', response)}")
+    return response
+
+
+async def _socket_ready(spec: ProcessSpec, process: asyncio.subprocess.Process) -> bool:
+    """Воркер готов, когда отвечает на ping по своему сокету."""
+    assert isinstance(spec, WorkerSpec)
+    deadline = time.monotonic() + SOCKET_WAIT_SECONDS
+    while time.monotonic() < deadline and process.returncode is None:
+        with contextlib.suppress(ControlError):
+            await _request(spec.socket_path, {"op": "ping"})
+            return True
+        await asyncio.sleep(STATUS_POLL_INTERVAL)
+    return False
+
+
+class MultiplexedRunner:
+    def __init__(self, workers: int) -> None:
+        self._workers = [WorkerSpec(index) for index in range(workers)]
+        self._ring = HashRing(range(workers))
+        # Что должно работать в каждом воркере: после перезапуска воркера
+        # сессии поднимаются заново из этого списка.
+        self._specs: dict[str, UserbotSpec] = {}
+
+    def worker_for(self, phone: str) -> WorkerSpec:
+        return self._workers[self._ring.node_for(phone)]
+
+    async def _ensure_worker(self, worker: WorkerSpec) -> None:
+        status = supervisor.status(worker.name)
+        if not (status and status.supervised):
+            await supervisor.start(
+                worker,
+                ready_check=_socket_ready,
+                on_ready=partial(self._resync, worker),
+            )
+        if not await supervisor.wait_ready(worker.name, SOCKET_WAIT_SECONDS):
+            raise ControlError(f"{worker.name} не запустился")
+
+    async def _start_session(self, worker: WorkerSpec, spec: UserbotSpec) -> None:
+        await _request(
+            worker.socket_path,
+            {
+                "op": "start",
+                "phone": spec.phone,
+                "path_session": spec.path_session,
+                "api_id": spec.api_id,
+                "api_hash": spec.api_hash,
+            },
+        )
+
+    async def _resync(self, worker: WorkerSpec) -> None:
+        for spec in list(self._specs.values()):
+            if self.worker_for(spec.phone) == worker:
+                await self._start_session(worker, spec)
+
+    async def start(self, spec: UserbotSpec) -> int | None:
+        """Запускает сессию и возвращает PID ее воркера."""
+        await asyncio.to_thread(spec.prepare)
+        worker = self.worker_for(spec.phone)
+        self._specs[spec.phone] = spec
+        await self._ensure_worker(worker)
+        await self._start_session(worker, spec)
+        status = supervisor.status(worker.name)
+        return status.pid if status else None
+
+    async def stop(self, phone: str) -> None:
+        self._specs.pop(phone, None)
+        worker = self.worker_for(phone)
+        if supervisor.status(worker.name) is None:
+            return
+        try:
+            await _request(worker.socket_path, {"op": "stop", "phone": phone})
+        except ControlError as exc:
+            logger.info("Сессия %s не остановлена: %s", phone, exc)
+
+    def spec(self, phone: str) -> UserbotSpec | None:
+        return self._specs.get(phone)
+
+    async def status(self, phone: str) -> dict[str, Any] | None:
+        worker = self.worker_for(phone)
+        if supervisor.status(worker.name) is None:
+            return None
+        try:
+            response = await _request(worker.socket_path, {"op": "status"})
+        except ControlError:
+            return None
+        return response["sessions"].get(phone)
+
+    async def statuses(self) -> dict[str, dict[str, Any]]:
+        """Статусы всех сессий: по одному запросу на запущенный воркер."""
+        running = [w for w in self._workers if supervisor.status(w.name)]
+        responses = await asyncio.gather(
+            *(_request(w.socket_path, {"op": "status"}) for w in running),
+            return_exceptions=True,
+        )
+        result: dict[str, dict[str, Any]] = {}
+        for response in responses:
+            if isinstance(response, dict):
+                result.update(response["sessions"])
+        return result
+
+    async def wait_ready(self, phone: str, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while True:
+            status = await self.status(phone)
+            state = status["state"] if status else None
+            if state == "running":
+                return True
+            if state not in SUPERVISED_STATES or time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(STATUS_POLL_INTERVAL)
@@ -0,0 +1,251 @@
+"""Хранилище сессий Telethon в БД.
+
+Если задан ``SESSION_VAULT_KEY`` (ключ Fernet), файл сессии хранится в
+``bots.session_data`` в зашифрованном виде (zlib + Fernet), поэтому
+аккаунт можно запустить на любом узле без общего диска.
+
+Перед запуском юзербота сессия выкладывается в ``SESSION_RUNTIME_DIR``
+(по умолчанию tmpfs ``/dev/shm``), и SQLite-ввод-вывод Telethon идет из
+памяти. После остановки сессия возвращается в БД, а файл удаляется. Пока
+юзербот работает, ``sync_running`` раз в ``SESSION_VAULT_SYNC_MINUTES``
+сохраняет согласованный снимок (SQLite backup API), чтобы падение узла не
+откатывало сессию далеко.
+
+Сессия, которой еще нет в хранилище, импортируется из ``path_session`` при
+первом запуске; исходный файл не трогается.
+
+Сессии в хранилище и файлы на tmpfs привязаны к ``Bot.id``: номер телефона
+в ``bots`` не уникален.
+
+Снимок сохраняется, только если ``session_synced_at`` в БД не изменился с
+последней выкладки или сохранения: устаревший файл (например, оставшийся
+после падения, пока сессию обновил другой узел) не затирает более новую.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sqlite3
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Final
+
+from cryptography.fernet import Fernet, InvalidToken
+from sqlalchemy import select, update
+
+from bot.db.models import Bot
+from bot.settings import se
+from bot.utils.func import SESSION_SUFFIX
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_SUFFIXES: Final[tuple[str, ...]] = ("-journal", "-wal", "-shm")
+
+
+class SessionVaultError(Exception):
+    """Сессию из хранилища не удалось расшифровать или выложить."""
+
+
+def _session_file(path_session: str) -> Path:
+    if not path_session.endswith(SESSION_SUFFIX):
+        path_session = f"{path_session}{SESSION_SUFFIX}"
+    return Path(path_session)
+
+
+def _snapshot(path: Path) -> bytes | None:
+    """Согласованная копия SQLite-файла (он может быть открыт юзерботом)."""
+    if not path.is_file() or path.stat().st_size == 0:
+        return None
+    source = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    memory = sqlite3.connect(":memory:")
+    try:
+        source.backup(memory)
+        return memory.serialize()
+    except sqlite3.DatabaseError as exc:
+        logger.warning("Файл сессии %s не читается как SQLite: %s", path, exc)
+        return None
+    finally:
+        source.close()
+        memory.close()
+
+
+def _write_private(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True, mode=0o700)
+    tmp = path.with_name(path.name + ".tmp")
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "wb") as file:
+        file.write(data)
+    tmp.replace(path)
+
+
+def _remove(path: Path) -> None:
+    for candidate in (path, *(Path(f"{path}{s}") for s in JOURNAL_SUFFIXES)):
+        candidate.unlink(missing_ok=True)
+
+
+class SessionVault:
+    def __init__(
+        self, key: str, sessionmaker: async_sessionmaker[AsyncSession]
+    ) -> None:
+        self._fernet = Fernet(key)
+        self._sessionmaker = sessionmaker
+        self._runtime_dir = Path(se.vault.runtime_dir)
+        self._materialized: dict[int, Path] = {}
+        # session_synced_at, с которым сессия выложена или сохранена
+        self._synced_at: dict[int, datetime | None] = {}
+        self._lock = asyncio.Lock()
+
+    def seal(self, raw: bytes) -> bytes:
+        return self._fernet.encrypt(zlib.compress(raw))
+
+    def unseal(self, token: bytes) -> bytes:
+        try:
+            return zlib.decompress(self._fernet.decrypt(token))
+        except (InvalidToken, zlib.error) as exc:
+            raise SessionVaultError("Не удалось расшифровать сессию") from exc
+
+    def runtime_path(self, bot_id: int) -> Path:
+        return self._runtime_dir / f"{bot_id}{SESSION_SUFFIX}"
+
+    async def _store(self, snapshots: dict[int, bytes]) -> int:
+        """Сохраняет снимки, если сессии в БД не менялись с нашей версии."""
+        # DATETIME без дробной части: иначе сравнение с БД не совпадет
+        synced_at = datetime.now().replace(microsecond=0)
+        stored = []
+        async with self._sessionmaker() as session:
+            for bot_id, raw in snapshots.items():
+                expected = self._synced_at.get(bot_id)
+                result = await session.execute(
+                    update(Bot)
+                    .where(
+                        Bot.id == bot_id,
+                        Bot.session_synced_at.is_(None)
+                        if expected is None
+                        else Bot.session_synced_at == expected,
+                    )
+                    .values(session_data=self.seal(raw), session_synced_at=synced_at)
+                )
+                if result.rowcount:
+                    stored.append(bot_id)
+                else:
+                    logger.warning(
+                        "Сессия бота %s в хранилище новее снимка: снимок не сохранен",
+                        bot_id,
+                    )
+            await session.commit()
+        for bot_id in stored:
+            self._synced_at[bot_id] = synced_at
+        return len(stored)
+
+    async def checkout(self, bot_id: int, path_session: str) -> str:
+        """Путь к сессии для запуска юзербота.
+
+        Без данных в хранилище (и без файла для импорта) возвращает
+        ``path_session`` как есть: юзербот работает по-старому.
+        """
+        async with self._lock:
+            if bot_id in self._materialized:
+                return str(self._materialized[bot_id])
+
+            async with self._sessionmaker() as session:
+                row = (
+                    await session.execute(
+                        select(Bot.session_data, Bot.session_synced_at).where(
+                            Bot.id == bot_id
+                        )
+                    )
+                ).first()
+            data, self._synced_at[bot_id] = row if row else (None, None)
+            if data is None:
+                raw = await asyncio.to_thread(_snapshot, _session_file(path_session))
+                if raw is None:
+                    return path_session
+                await self._store({bot_id: raw})
+                logger.info("Сессия бота %s импортирована в хранилище", bot_id)
+            else:
+                raw = await asyncio.to_thread(self.unseal, data)
+
+            target = self.runtime_path(bot_id)
+            try:
+                await asyncio.to_thread(_write_private, target, raw)
+            except OSError as exc:
+                raise SessionVaultError(f"Не удалось выложить сессию: {exc}") from exc
+            self._materialized[bot_id] = target
+            return str(target)
+
+    async def checkin(self, bot_id: int) -> bool:
+        """Возвращает сессию остановленного юзербота в БД и удаляет файл."""
+        async with self._lock:
+            path = self._materialized.pop(bot_id, None)
+            if path is None:
+                return False
+            raw = await asyncio.to_thread(_snapshot, path)
+            stored = raw is not None and await self._store({bot_id: raw}) > 0
+            self._synced_at.pop(bot_id, None)
+            await asyncio.to_thread(_remove, path)
+            return stored
+
+    async def forget(self, bot_id: int) -> None:
+        """Удаляет сессию из хранилища и с tmpfs."""
+        async with self._lock:
+            path = self._materialized.pop(bot_id, None) or self.runtime_path(bot_id)
+            self._synced_at.pop(bot_id, None)
+            await asyncio.to_thread(_remove, path)
+            async with self._sessionmaker() as session:
+                await session.execute(
+                    update(Bot)
+                    .where(Bot.id == bot_id)
+                    .values(session_data=None, session_synced_at=None)
+                )
+                await session.commit()
+
+    async def forget_all(self) -> None:
+        """Очищает хранилище целиком (``/delete_sessions``)."""
+        async with self._lock:
+            paths = list(self._materialized.values())
+            self._materialized.clear()
+            self._synced_at.clear()
+            for path in paths:
+                await asyncio.to_thread(_remove, path)
+            async with self._sessionmaker() as session:
+                await session.execute(
+                    update(Bot)
+                    .where(Bot.session_data.is_not(None))
+                    .values(session_data=None, session_synced_at=None)
+                )
+                await session.commit()
+
+    async def sync_running(self) -> int:
+        """Сохраняет снимки сессий работающих юзерботов."""
+        async with self._lock:
+            materialized = dict(self._materialized)
+        snapshots = {}
+        for bot_id, path in materialized.items():
+            raw = await asyncio.to_thread(_snapshot, path)
+            if raw is not None:
+                snapshots[bot_id] = raw
+        if not snapshots:
+            return 0
+        async with self._lock:
+            # Сессию могли вернуть или удалить, пока снимались копии
+            snapshots = {
+                bot_id: raw
+                for bot_id, raw in snapshots.items()
+                if bot_id in self._materialized
+            }
+            return await self._store(snapshots)
+
+    async def checkin_all(self) -> None:
+        for bot_id in list(self._materialized):
+            try:
+                await self.checkin(bot_id)
+            except Exception:  # noqa: BLE001
+                logger.exception(
+                    "Не удалось вернуть сессию бота %s в хранилище", bot_id
+                )
@@ -0,0 +1,522 @@
+"""Супервизор процессов юзерботов.
+
+Менеджер сам владеет дочерними процессами: запускает их интерпретатором из
+venv юзербота (без ``uv run`` и bash-обертки), пишет stdout/stderr в
+``<path_to_folder>/<name>.log`` через ``LogSink`` (с ротацией, см.
+``bot.utils.logsink``) и держит последние строки в памяти, перезапускает
+упавшие процессы с экспоненциальной задержкой.
+
+Процесс описывается ``ProcessSpec``: юзербот на одну сессию
+(``UserbotSpec``, имя - номер телефона) или воркер мультиплексного режима.
+
+Процесс, который умер, так и не став готовым (например, сессия не
+авторизована), не перезапускается: он получает состояние ``failed``.
+
+Вывод юзерботов идет через pipe менеджера, поэтому пережить менеджер они
+не могут: при остановке менеджера ``Manager.stop_all`` гасит их штатно,
+а при запуске ``restore_connected`` поднимает подключенные заново.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import dataclasses
+import enum
+import logging
+import os
+import signal
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Final, Protocol
+
+from bot.settings import se
+from bot.utils.logsink import LogSink, log_path
+
+logger = logging.getLogger(__name__)
+
+READY_GRACE_SECONDS: Final[float] = 2.0
+STOP_TIMEOUT: Final[float] = 10.0
+RESTART_BACKOFF_BASE: Final[float] = 1.0
+# Процесс, проработавший дольше, считается стабильным: счетчик падений
+# обнуляется и задержка перезапуска начинается заново.
+STABLE_UPTIME_SECONDS: Final[float] = 60.0
+OUTPUT_TAIL_LINES: Final[int] = 200
+OUTPUT_CHUNK_BYTES: Final[int] = 64 * 1024
+# Строка без перевода строки длиннее лимита пишется принудительно
+MAX_OUTPUT_LINE_BYTES: Final[int] = 1024 * 1024
+OUTPUT_LINE_CHARS: Final[int] = 4096
+
+
+class SessionPrepareError(Exception):
+    """Файл или каталог сессии недоступен для юзербота."""
+
+
+class ProcessState(enum.Enum):
+    starting = "starting"
+    running = "running"
+    backoff = "backoff"
+    stopping = "stopping"
+    stopped = "stopped"
+    failed = "failed"
+
+
+class ProcessSpec(Protocol):
+    @property
+    def name(self) -> str: ...
+
+    def argv(self) -> list[str]: ...
+
+    def prepare(self) -> None:
+        """Синхронная подготовка перед запуском (выполняется в потоке)."""
+
+
+@dataclasses.dataclass(frozen=True)
+class UserbotSpec:
+    phone: str
+    path_session: str
+    api_id: int
+    api_hash: str
+
+    @property
+    def name(self) -> str:
+        return self.phone
+
+    def argv(self) -> list[str]:
+        return [
+            se.userbot.python,
+            "-m",
+            "bot",
+            self.path_session,
+            str(self.api_id),
+            self.api_hash,
+        ]
+
+    def prepare(self) -> None:
+        _prepare_session(self.path_session)
+
+
+@dataclasses.dataclass(frozen=True)
+class ProcessStatus:
+    name: str
+    state: ProcessState
+    pid: int | None
+    ready: bool
+    restarts: int
+    last_exit_code: int | None
+    uptime: float
+
+    @property
+    def supervised(self) -> bool:
+        """Процесс работает или будет перезапущен супервизором."""
+        return self.state in (
+            ProcessState.starting,
+            ProcessState.running,
+            ProcessState.backoff,
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        return {**dataclasses.asdict(self), "state": self.state.value}
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> ProcessStatus:
+        return cls(**{**data, "state": ProcessState(data["state"])})
+
+
+ReadyCheck = Callable[[ProcessSpec, asyncio.subprocess.Process], Awaitable[bool]]
+OnReady = Callable[[], Awaitable[None]]
+BeforeSpawn = Callable[[ProcessSpec], Awaitable[None]]
+
+
+async def grace_period_ready(
+    spec: ProcessSpec, process: asyncio.subprocess.Process
+) -> bool:
+    """Готовность по умолчанию: процесс пережил короткий grace-период."""
+    with contextlib.suppress(asyncio.TimeoutError):
+        await asyncio.wait_for(process.wait(), timeout=READY_GRACE_SECONDS)
+    return process.returncode is None
+
+
+def _prepare_session(path_session: str) -> None:
+    """Готовит каталог и файл сессии, чтобы Telethon мог писать в SQLite."""
+    session = Path(path_session)
+    session_dir = session.parent
+    try:
+        session_dir.mkdir(parents=True, exist_ok=True)
+    except OSError as exc:
+        raise SessionPrepareError(
+            f"Не удалось создать каталог для сессий: {session_dir}"
+        ) from exc
+    if not os.access(session_dir, os.W_OK):
+        raise SessionPrepareError(
+            f"Каталог сессии недоступен для записи: {session_dir}"
+        )
+
+    if session.exists():
+        if not os.access(session, os.W_OK):
+            logger.info("Снимаем read-only с файла сессии %s", session)
+            try:
+                session.chmod(session.stat().st_mode | 0o600)
+            except OSError as exc:
+                raise SessionPrepareError(
+                    "Не удалось сделать файл сессии доступным для записи"
+                ) from exc
+        return
+
+    try:
+        session.touch()
+    except OSError as exc:
+        raise SessionPrepareError(
+            f"Не удалось создать файл сессии {session}"
+        ) from exc
+    with contextlib.suppress(OSError):
+        session.chmod(0o600)
+
+
+def _userbot_env() -> dict[str, str]:
+    env = os.environ.copy()
+    # Чужой VIRTUAL_ENV сбивает интерпретатор юзербота
+    env.pop("VIRTUAL_ENV", None)
+    env["PYTHONUNBUFFERED"] = "1"
+    return env
+
+
+class _Child:
+    def __init__(
+        self, spec: ProcessSpec, ready_check: ReadyCheck, on_ready: OnReady | None
+    ) -> None:
+        self.spec = spec
+        self.ready_check = ready_check
+        self.on_ready = on_ready
+        self.state = ProcessState.starting
+        self.process: asyncio.subprocess.Process | None = None
+        self.started_at = 0.0
+        self.restarts = 0
+        self.failures = 0
+        self.last_exit_code: int | None = None
+        self.ready = asyncio.Event()
+        self.settled = asyncio.Event()
+        self.output: deque[str] = deque(maxlen=OUTPUT_TAIL_LINES)
+        self.stopping = False
+        self.stopped = asyncio.Event()
+        self.watcher: asyncio.Task[None] | None = None
+        self.pump: asyncio.Task[None] | None = None
+
+    def status(self) -> ProcessStatus:
+        alive = self.process is not None and self.process.returncode is None
+        return ProcessStatus(
+            name=self.spec.name,
+            state=self.state,
+            pid=self.process.pid if alive and self.process else None,
+            ready=self.ready.is_set(),
+            restarts=self.restarts,
+            last_exit_code=self.last_exit_code,
+            uptime=time.monotonic() - self.started_at if alive else 0.0,
+        )
+
+
+class Supervisor:
+    """Владеет дочерними процессами, ключ - ``spec.name``."""
+
+    def __init__(self, ready_check: ReadyCheck = grace_period_ready) -> None:
+        self._children: dict[str, _Child] = {}
+        self._ready_check = ready_check
+        self._before_spawn: BeforeSpawn | None = None
+        self._lock = asyncio.Lock()
+
+    def set_ready_check(
+        self, ready_check: ReadyCheck, before_spawn: BeforeSpawn | None = None
+    ) -> None:
+        """Меняет проверку готовности по умолчанию для новых процессов.
+
+        ``before_spawn`` вызывается перед каждым запуском и перезапуском,
+        например чтобы сбросить сигнал готовности прошлого процесса.
+        """
+        self._ready_check = ready_check
+        self._before_spawn = before_spawn
+
+    async def start(
+        self,
+        spec: ProcessSpec,
+        *,
+        ready_check: ReadyCheck | None = None,
+        on_ready: OnReady | None = None,
+    ) -> ProcessStatus:
+        """Запускает процесс, если он еще не под надзором.
+
+        ``on_ready`` вызывается после каждого перехода в готовность,
+        включая перезапуски.
+        """
+        while True:
+            async with self._lock:
+                child = self._children.get(spec.name)
+                if child is None or not child.stopping:
+                    return await self._start_locked(spec, child, ready_check, on_ready)
+            # Прошлый процесс с этим именем еще завершается
+            await child.stopped.wait()
+
+    async def _start_locked(
+        self,
+        spec: ProcessSpec,
+        child: _Child | None,
+        ready_check: ReadyCheck | None,
+        on_ready: OnReady | None,
+    ) -> ProcessStatus:
+        if child and child.status().supervised:
+            return child.status()
+
+        await asyncio.to_thread(spec.prepare)
+        child = _Child(spec, ready_check or self._ready_check, on_ready)
+        self._children[spec.name] = child
+        try:
+            await self._spawn(child)
+        except OSError:
+            del self._children[spec.name]
+            raise
+        child.watcher = asyncio.create_task(self._watch(child))
+        return child.status()
+
+    async def stop(self, name: str, timeout: float = STOP_TIMEOUT) -> None:
+        """Останавливает процесс.
+
+        Запись остается в ``_children`` в состоянии ``stopping``, пока процесс
+        не завершится и вывод не будет дочитан: параллельный ``start`` с тем
+        же именем дождется этого, а не запустит второй процесс на ту же сессию.
+        """
+        async with self._lock:
+            child = self._children.get(name)
+            if child is not None and not child.stopping:
+                child.stopping = True
+                child.state = ProcessState.stopping
+                owner = True
+            else:
+                owner = False
+        if child is None:
+            logger.info("Процесс %s не запущен", name)
+            return
+        if not owner:
+            await child.stopped.wait()
+            return
+
+        try:
+            process = child.process
+            if process and process.returncode is None:
+                self._signal(process, signal.SIGTERM)
+                try:
+                    await asyncio.wait_for(process.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    logger.warning("Процесс %s не завершился, SIGKILL", name)
+                    self._signal(process, signal.SIGKILL)
+                    await process.wait()
+            if child.watcher:
+                child.watcher.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await child.watcher
+            await self._finish_pump(child)
+        finally:
+            child.state = ProcessState.stopped
+            child.settled.set()
+            async with self._lock:
+                if self._children.get(name) is child:
+                    del self._children[name]
+            child.stopped.set()
+        logger.info("Процесс %s остановлен", name)
+
+    async def restart(self, name: str) -> ProcessStatus | None:
+        child = self._children.get(name)
+        if child is None:
+            return None
+        # stop дожидается выхода процесса и его потока вывода
+        await self.stop(name)
+        return await self.start(
+            child.spec, ready_check=child.ready_check, on_ready=child.on_ready
+        )
+
+    def status(self, name: str) -> ProcessStatus | None:
+        child = self._children.get(name)
+        return child.status() if child else None
+
+    def statuses(self) -> dict[str, ProcessStatus]:
+        return {name: child.status() for name, child in self._children.items()}
+
+    def tail(self, name: str, lines: int = OUTPUT_TAIL_LINES) -> list[str]:
+        child = self._children.get(name)
+        if child is None:
+            return []
+        return list(child.output)[-lines:]
+
+    async def wait_ready(self, name: str, timeout: float) -> bool:
+        """Ждет, пока процесс станет готов либо окончательно упадет."""
+        child = self._children.get(name)
+        if child is None:
+            return False
+        with contextlib.suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(child.settled.wait(), timeout=timeout)
+        return child.ready.is_set() and child.status().supervised
+
+    async def stop_all(self) -> None:
+        await asyncio.gather(
+            *(self.stop(name) for name in list(self._children)),
+            return_exceptions=True,
+        )
+
+    @staticmethod
+    def _signal(process: asyncio.subprocess.Process, sig: signal.Signals) -> None:
+        try:
+            os.killpg(os.getpgid(process.pid), sig)
+        except ProcessLookupError:
+            logger.info("Процесс не найден: %s", process.pid)
+        except PermissionError:
+            logger.info("Нет прав на завершение процесса: %s", process.pid)
+
+    @staticmethod
+    async def _finish_pump(child: _Child) -> None:
+        """Дочитывает вывод завершенного процесса, чтобы не писать два в один лог."""
+        pump = child.pump
+        if pump is None or pump.cancelled():
+            return
+        try:
+            await asyncio.wait_for(pump, timeout=STOP_TIMEOUT)
+        except asyncio.TimeoutError:
+            # pipe держит кто-то еще (например, внук процесса)
+            logger.warning("Вывод процесса %s не закрылся", child.spec.name)
+        except Exception:  # noqa: BLE001
+            logger.exception("Чтение вывода %s упало", child.spec.name)
+
+    async def _spawn(self, child: _Child) -> None:
+        spec = child.spec
+        await self._finish_pump(child)
+        child.state = ProcessState.starting
+        child.ready.clear()
+        child.settled.clear()
+        if self._before_spawn:
+            await self._before_spawn(spec)
+        child.process = await asyncio.create_subprocess_exec(
+            *spec.argv(),
+            cwd=se.userbot.project_dir,
+            env=_userbot_env(),
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            start_new_session=True,
+        )
+        child.started_at = time.monotonic()
+        child.pump = asyncio.create_task(self._pump_output(child, child.process))
+        logger.info("Процесс %s запущен, PID: %s", spec.name, child.process.pid)
+
+    async def _pump_output(
+        self, child: _Child, process: asyncio.subprocess.Process
+    ) -> None:
+        sink = LogSink(child.spec.name)
+        await sink.open()
+        try:
+            started = datetime.now().isoformat(timespec="seconds")
+            await sink.write(f"[{started}] === start {child.spec.name} ===\n".encode())
+            assert process.stdout is not None
+            # Читаем кусками, а не построчно: строка длиннее лимита
+            # StreamReader остановила бы чтение, и процесс повис бы на
+            # записи в заполненный pipe.
+            pending = b""
+            while chunk := await process.stdout.read(OUTPUT_CHUNK_BYTES):
+                pending += chunk
+                cut = pending.rfind(b"\n") + 1
+                if not cut and len(pending) >= MAX_OUTPUT_LINE_BYTES:
+                    pending += b"\n"
+                    cut = len(pending)
+                if cut:
+                    await self._emit(child, sink, pending[:cut])
+                    pending = pending[cut:]
+            if pending:
+                await self._emit(child, sink, pending + b"\n")
+        finally:
+            await sink.close()
+
+    @staticmethod
+    async def _emit(child: _Child, sink: LogSink, data: bytes) -> None:
+        """Пишет целые строки в лог и их хвост в память."""
+        await sink.write(data)
+        lines = data.decode(errors="replace").splitlines()
+        child.output.extend(line[:OUTPUT_LINE_CHARS] for line in lines)
+
+    async def _await_ready(self, child: _Child) -> bool:
+        assert child.process is not None
+        try:
+            ready = await child.ready_check(child.spec, child.process)
+        except Exception:  # noqa: BLE001
+            logger.exception("Проверка готовности %s упала", child.spec.name)
+            ready = False
+        if ready and child.process.returncode is None:
+            child.state = ProcessState.running
+            child.ready.set()
+        elif child.process.returncode is None:
+            # Живой, но не готовый процесс (например, сессия не авторизована)
+            # не должен держать файл сессии: завершаем, _watch пометит failed.
+            logger.warning("Процесс %s не прошел проверку готовности", child.spec.name)
+            self._signal(child.process, signal.SIGTERM)
+        child.settled.set()
+        if child.ready.is_set() and child.on_ready:
+            try:
+                await child.on_ready()
+            except Exception:  # noqa: BLE001
+                logger.exception("on_ready для %s упал", child.spec.name)
+        return child.ready.is_set()
+
+    async def _watch(self, child: _Child) -> None:
+        name = child.spec.name
+        while True:
+            process = child.process
+            assert process is not None
+            await self._await_ready(child)
+            code = await process.wait()
+            if child.pump:
+                # shield: отмена наблюдателя в stop не должна обрывать чтение
+                with contextlib.suppress(Exception):
+                    await asyncio.shield(child.pump)
+            child.last_exit_code = code
+            if child.stopping:
+                return
+
+            if not child.ready.is_set():
+                logger.error(
+                    "Процесс %s завершился до готовности (код %s), см. %s",
+                    name,
+                    code,
+                    log_path(name),
+                )
+                child.state = ProcessState.failed
+                child.settled.set()
+                return
+
+            uptime = time.monotonic() - child.started_at
+            if uptime >= STABLE_UPTIME_SECONDS:
+                child.failures = 0
+            child.failures += 1
+            delay = min(
+                RESTART_BACKOFF_BASE * 2 ** (child.failures - 1),
+                se.userbot.restart_backoff_max,
+            )
+            logger.warning(
+                "Процесс %s упал (код %s), перезапуск через %.0f с",
+                name,
+                code,
+                delay,
+            )
+            child.state = ProcessState.backoff
+            child.ready.clear()
+            await asyncio.sleep(delay)
+            if child.stopping:
+                return
+            try:
+                await self._spawn(child)
+            except OSError:
+                logger.exception("Не удалось перезапустить процесс %s", name)
+                child.state = ProcessState.failed
+                child.settled.set()
+                return
+            child.restarts += 1
+
+
+supervisor: Final[Supervisor] = Supervisor()
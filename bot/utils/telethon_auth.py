@@ -0,0 +1,463 @@
+"""Авторизация аккаунтов через Telethon.
+
+Модуль загружается лениво через ``fn.Telethon``: импорт ``telethon`` заметно
+тяжелее остального пакета и нужен только при регистрации/подключении бота.
+
+Клиенты авторизации живут в ``AuthClientPool``: соединение, на котором
+запрошен код, остается открытым до ``sign_in`` (или до истечения
+``AUTH_CLIENT_TTL_SECONDS``), поэтому код проверяется на том же
+MTProto-соединении и без второго рукопожатия.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import dataclasses
+import logging
+import time
+from collections.abc import AsyncIterator
+from typing import Awaitable, Callable, Final
+
+from telethon import TelegramClient  # type: ignore
+from telethon.errors import (
+    PhoneCodeExpiredError,
+    PhoneCodeInvalidError,
+    PhoneNumberBannedError,
+    PhoneNumberInvalidError,
+    SessionPasswordNeededError,
+)
+from telethon.errors.rpcerrorlist import FloodWaitError
+
+from bot.utils.func import SESSION_SUFFIX, Result
+
+logger = logging.getLogger(__name__)
+
+# Код подтверждения Telegram живет несколько минут, дольше держать незачем
+AUTH_CLIENT_TTL_SECONDS: Final[float] = 300.0
+AUTH_POOL_MAX_CLIENTS: Final[int] = 20
+AUTH_POOL_SWEEP_SECONDS: Final[float] = 30.0
+
+
+class AuthPoolFullError(Exception):
+    """Все клиенты пула заняты, новый создать нельзя."""
+
+
+class AuthClientBusyError(Exception):
+    """Клиент номера занят авторизацией с другой сессией или ключами."""
+
+
+@dataclasses.dataclass
+class AuthPoolMetrics:
+    handshakes: int = 0
+    reused: int = 0
+    expired: int = 0
+    evicted: int = 0
+    rejected: int = 0
+    handshake_seconds: float = 0.0
+
+    def describe(self) -> str:
+        average = self.handshake_seconds / self.handshakes if self.handshakes else 0
+        return (
+            f"рукопожатий {self.handshakes} (в среднем {average:.2f} с), "
+            f"переиспользовано {self.reused}, истекло {self.expired}, "
+            f"вытеснено {self.evicted}, отказов {self.rejected}"
+        )
+
+
+@dataclasses.dataclass
+class _PooledClient:
+    phone: str
+    key: tuple[str, int, str]
+    client: TelegramClient
+    lock: asyncio.Lock = dataclasses.field(default_factory=asyncio.Lock)
+    users: int = 0
+    expires_at: float = 0.0
+
+
+@dataclasses.dataclass
+class AuthLease:
+    client: TelegramClient
+    # Оставить клиента в пуле после выхода из контекста
+    keep: bool = False
+
+
+class AuthClientPool:
+    """Подключенные клиенты авторизации по номеру телефона."""
+
+    def __init__(
+        self,
+        ttl: float = AUTH_CLIENT_TTL_SECONDS,
+        max_clients: int = AUTH_POOL_MAX_CLIENTS,
+    ) -> None:
+        self.ttl = ttl
+        self.max_clients = max_clients
+        self.metrics = AuthPoolMetrics()
+        self._entries: dict[str, _PooledClient] = {}
+        self._lock = asyncio.Lock()
+        self._sweeper: asyncio.Task[None] | None = None
+
+    @staticmethod
+    async def _disconnect(entry: _PooledClient) -> None:
+        try:
+            await entry.client.disconnect()  # pyright: ignore
+        except Exception as exc:  # noqa: BLE001
+            logger.debug("Ошибка при отключении клиента: %s", exc)
+
+    def _drop_expired(self) -> list[_PooledClient]:
+        now = time.monotonic()
+        expired = [
+            phone
+            for phone, entry in self._entries.items()
+            if not entry.users and entry.expires_at <= now
+        ]
+        self.metrics.expired += len(expired)
+        return [self._entries.pop(phone) for phone in expired]
+
+    async def _checkout(self, phone: str, key: tuple[str, int, str]) -> _PooledClient:
+        async with self._lock:
+            dropped = self._drop_expired()
+            entry = self._entries.get(phone)
+            if entry and entry.key != key:
+                if entry.users:
+                    # Клиентом пользуется другая корутина: не отключаем его
+                    self.metrics.rejected += 1
+                    raise AuthClientBusyError
+                dropped.append(self._entries.pop(phone))
+                entry = None
+            if entry is None:
+                if len(self._entries) >= self.max_clients:
+                    idle = [e for e in self._entries.values() if not e.users]
+                    if not idle:
+                        self.metrics.rejected += 1
+                        raise AuthPoolFullError
+                    victim = min(idle, key=lambda e: e.expires_at)
+                    dropped.append(self._entries.pop(victim.phone))
+                    self.metrics.evicted += 1
+                entry = _PooledClient(phone, key, TelegramClient(*key))
+                self._entries[phone] = entry
+            entry.users += 1
+        for stale in dropped:
+            await self._disconnect(stale)
+        return entry
+
+    async def _release(self, entry: _PooledClient, keep: bool) -> None:
+        async with self._lock:
+            entry.users -= 1
+            owned = self._entries.get(entry.phone) is entry
+            if keep and owned:
+                entry.expires_at = time.monotonic() + self.ttl
+                self._ensure_sweeper()
+                return
+            if owned and not entry.users:
+                del self._entries[entry.phone]
+        if not entry.users:
+            await self._disconnect(entry)
+
+    @contextlib.asynccontextmanager
+    async def lease(
+        self, phone: str, path: str, api_id: int, api_hash: str
+    ) -> AsyncIterator[AuthLease]:
+        entry = await self._checkout(phone, (str(path), api_id, api_hash))
+        lease = AuthLease(entry.client)
+        try:
+            async with entry.lock:
+                if entry.client.is_connected():
+                    self.metrics.reused += 1
+                else:
+                    started = time.monotonic()
+                    await entry.client.connect()
+                    elapsed = time.monotonic() - started
+                    self.metrics.handshakes += 1
+                    self.metrics.handshake_seconds += elapsed
+                    logger.info("Рукопожатие с Telegram для %s: %.2f с", phone, elapsed)
+                yield lease
+        except BaseException:
+            lease.keep = False
+            raise
+        finally:
+            await self._release(entry, lease.keep)
+
+    def _ensure_sweeper(self) -> None:
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.create_task(self._sweep())
+
+    async def _sweep(self) -> None:
+        while self._entries:
+            await asyncio.sleep(AUTH_POOL_SWEEP_SECONDS)
+            async with self._lock:
+                dropped = self._drop_expired()
+            for entry in dropped:
+                await self._disconnect(entry)
+
+    async def discard(self, phone: str) -> None:
+        """Убирает клиента номера из пула и отключает его.
+
+        Вызывается до того, как файл сессии переносят, удаляют или отдают
+        юзерботу. Занятый клиент отключится, когда его отпустят.
+        """
+        async with self._lock:
+            entry = self._entries.pop(phone, None)
+        if entry is not None and not entry.users:
+            await self._disconnect(entry)
+
+    async def close(self) -> None:
+        async with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            await self._disconnect(entry)
+
+
+auth_pool: Final[AuthClientPool] = AuthClientPool()
+
+
+class Telethon:
+    ALREADY_AUTHORIZED = "already_authorized"
+
+    @staticmethod
+    def _is_valid_phone(phone: str) -> bool:
+        return bool(phone) and phone.lstrip("+").isdigit()
+
+    @staticmethod
+    def _is_valid_api_id(api_id: int) -> bool:
+        return isinstance(api_id, int) and api_id > 0
+
+    @staticmethod
+    def _is_valid_api_hash(api_hash: str) -> bool:
+        return isinstance(api_hash, str) and len(api_hash.strip()) == 32
+
+    @staticmethod
+    def _is_valid_session_path(path: str) -> bool:
+        session_path = str(path)
+        return bool(session_path) and session_path.endswith(SESSION_SUFFIX)
+
+    @classmethod
+    async def _with_client(
+        cls,
+        phone: str,
+        path: str,
+        api_id: int,
+        api_hash: str,
+        action: Callable[[TelegramClient], Awaitable[Result]],
+        context: str,
+        keep: Callable[[Result], bool],
+    ) -> Result:
+        """Выполняет ``action`` на клиенте из пула.
+
+        ``keep`` решает по результату, нужен ли клиент следующему шагу
+        авторизации; иначе он отключается сразу.
+        """
+        try:
+            async with auth_pool.lease(phone, path, api_id, api_hash) as lease:
+                logger.info(context)
+                result = await action(lease.client)
+                lease.keep = keep(result)
+                return result
+        except AuthPoolFullError:
+            logger.warning("Пул клиентов авторизации заполнен, номер %s", phone)
+            return Result(
+                success=False,
+                message="Слишком много одновременных авторизаций, попробуйте позже",
+            )
+        except AuthClientBusyError:
+            logger.warning("Номер %s уже авторизуется с другой сессией", phone)
+            return Result(
+                success=False,
+                message="Авторизация этого номера уже идет, попробуйте позже",
+            )
+        except Exception as exc:  # noqa: BLE001
+            logger.exception("Критическая ошибка при работе с сессией: %s", exc)
+            return Result(success=False, message="critical_error")
+
+    @staticmethod
+    def pool_metrics() -> AuthPoolMetrics:
+        return auth_pool.metrics
+
+    @classmethod
+    async def create_telethon_session(
+        cls,
+        phone: str,
+        code: str | int,
+        api_id: int,
+        api_hash: str,
+        phone_code_hash: str,
+        password: str | None,
+        path: str,
+    ) -> Result:
+        if not cls._is_valid_phone(phone):
+            return Result(success=False, message="invalid_phone")
+        if not cls._is_valid_api_id(api_id):
+            return Result(success=False, message="invalid_api_id")
+        if not cls._is_valid_api_hash(api_hash):
+            return Result(success=False, message="invalid_api_hash")
+        if not cls._is_valid_session_path(path):
+            return Result(success=False, message="invalid_path")
+
+        code_str = str(code).strip()
+
+        async def _authorize(client: TelegramClient) -> Result:
+            if await client.is_user_authorized():
+                me = await client.get_me()
+                logger.info(
+                    "Пользователь уже авторизован: %s (@%s)",
+                    me.first_name,
+                    me.username,
+                )
+                return Result(success=True, message=None)
+
+            try:
+                try:
+                    await client.sign_in(
+                        phone=phone, code=code_str, phone_code_hash=phone_code_hash
+                    )
+                except SessionPasswordNeededError:
+                    if not password:
+                        logger.info("Требуется пароль 2FA для номера %s.", phone)
+                        return Result(success=False, message="password_required")
+                    await client.sign_in(password=password)
+
+                if await client.is_user_authorized():
+                    me = await client.get_me()
+                    logger.info("Авторизация прошла успешно!")
+                    logger.info(
+                        "Пользователь: %s (@%s)", me.first_name, me.username
+                    )
+                    return Result(success=True, message=None)
+                return Result(success=False, message="auth_failed")
+            except PhoneCodeInvalidError:
+                logger.warning("Неверный код для номера %s.", phone)
+                return Result(success=False, message="invalid_code")
+            except PhoneCodeExpiredError:
+                logger.warning("Код устарел для номера %s.", phone)
+                return Result(success=False, message="code_expired")
+            except SessionPasswordNeededError:
+                logger.info("Требуется пароль 2FA для номера %s.", phone)
+                return Result(success=False, message="password_required")
+            except FloodWaitError as e:
+                logger.warning(
+                    "Ожидание FloodWait: необходимо подождать %s секунд.", e.seconds
+                )
+                return Result(success=False, message=f"flood_wait:{e.seconds}")
+            except Exception as exc:  # noqa: BLE001
+                logger.exception("Неожиданная ошибка при авторизации: %s", exc)
+                return Result(success=False, message=f"error:{exc!s}")
+
+        return await cls._with_client(
+            phone,
+            path,
+            api_id,
+            api_hash,
+            _authorize,
+            f"Подключение к Telegram для номера {phone}...",
+            # После ввода пароля sign_in продолжится на этом же соединении
+            keep=lambda result: result.message == "password_required",
+        )
+
+    @classmethod
+    async def check_authorized(
+        cls,
+        phone: str,
+        api_id: int,
+        api_hash: str,
+        path: str,
+    ) -> Result:
+        """Проверяет, что готовая сессия авторизована (без отправки кода)."""
+        if not cls._is_valid_api_id(api_id):
+            return Result(success=False, message="Неверный API ID")
+        if not cls._is_valid_api_hash(api_hash):
+            return Result(success=False, message="Неверный API Hash")
+        if not cls._is_valid_session_path(path):
+            return Result(success=False, message="Некорректный путь к сессии")
+
+        async def _check(client: TelegramClient) -> Result:
+            if await client.is_user_authorized():
+                return Result(success=True, message=None)
+            return Result(success=False, message="Сессия не авторизована")
+
+        return await cls._with_client(
+            phone,
+            path,
+            api_id,
+            api_hash,
+            _check,
+            f"Проверка сессии {phone}...",
+            keep=lambda result: False,
+        )
+
+    @classmethod
+    async def send_code_via_telethon(
+        cls,
+        phone: str,
+        api_id: int,
+        api_hash: str,
+        path: str,
+    ) -> Result:
+        if not cls._is_valid_phone(phone):
+            logger.warning("Неверный формат номера телефона: %s", phone)
+            return Result(success=False, message="Неверный формат номера телефона")
+        if not cls._is_valid_api_id(api_id):
+            logger.warning("Неверный API ID: %s", api_id)
+            return Result(success=False, message="Неверный API ID")
+        if not cls._is_valid_api_hash(api_hash):
+            logger.warning("Неверный или отсутствующий API Hash.")
+            return Result(success=False, message="Неверный API Hash")
+        if not cls._is_valid_session_path(path):
+            logger.warning("Некорректный путь к сессии: %s", path)
+            return Result(success=False, message="Некорректный путь к сессии")
+
+        async def _send_code(client: TelegramClient) -> Result:
+            if await client.is_user_authorized():
+                logger.info("Пользователь с номером %s уже авторизован.", phone)
+                return Result(success=True, message=cls.ALREADY_AUTHORIZED)
+
+            try:
+                result = await client.send_code_request(
+                    phone=phone,
+                    force_sms=False,
+                )
+                phone_code_hash = result.phone_code_hash
+                logger.info(
+                    "Код подтверждения успешно отправлен на %s. Hash: %s...",
+                    phone,
+                    phone_code_hash[:8],
+                )
+                return Result(success=True, message=phone_code_hash)
+            except PhoneNumberInvalidError:
+                logger.warning("Неверный номер телефона: %s", phone)
+                return Result(success=False, message="Неверный номер телефона")
+            except PhoneNumberBannedError:
+                logger.exception(
+                    "Номер %s заблокирован (banned) в Telegram.", phone
+                )
+                return Result(success=False, message="Номер заблокирован")
+            except SessionPasswordNeededError:
+                logger.warning(
+                    "Для номера %s требуется пароль (2FA), но сессия не авторизована.",
+                    phone,
+                )
+                return Result(success=False, message="Требуется пароль")
+            except FloodWaitError as e:
+                wait_msg = f"Ограничение FloodWait: нельзя отправлять код. Подождите {e.seconds} секунд."
+                logger.warning(wait_msg)
+                return Result(success=False, message=wait_msg)
+            except Exception as exc:  # noqa: BLE001
+                logger.exception(
+                    "Неизвестная ошибка при отправке кода на %s: %s", phone, exc
+                )
+                return Result(
+                    success=False,
+                    message=f"Неизвестная ошибка при отправке кода на {phone}: {exc}",
+                )
+
+        return await cls._with_client(
+            phone,
+            path,
+            api_id,
+            api_hash,
+            _send_code,
+            f"Подключение к Telegram для отправки кода на {phone}...",
+            keep=lambda result: (
+                result.success and result.message != cls.ALREADY_AUTHORIZED
+            ),
+        )
@@ -0,0 +1,244 @@
+"""Трассировка апдейтов: сколько времени ушло на БД, Redis и Bot API.
+
+Текущий ``UpdateTrace`` лежит в contextvar, который выставляет
+``TracingMiddleware``. Хуки SQLAlchemy (``instrument_engine``), клиента
+Redis (``instrument_redis``) и сессии aiogram пишут в него число вызовов и
+время. Вне апдейта (фоновые задачи) хуки ничего не делают.
+
+Итоги апдейтов копятся в ``trace_registry`` гистограммами по обработчику и
+виду времени и выгружаются в текстовом формате Prometheus.
+"""
+
+from __future__ import annotations
+
+import bisect
+import dataclasses
+import functools
+import time
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, Final
+
+from sqlalchemy import event
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+    from sqlalchemy.ext.asyncio import AsyncEngine
+
+KIND_TOTAL: Final[str] = "total"
+KIND_DB: Final[str] = "db"
+KIND_REDIS: Final[str] = "redis"
+KIND_API: Final[str] = "api"
+TRACE_KINDS: Final[tuple[str, ...]] = (KIND_DB, KIND_REDIS, KIND_API)
+# Верхние границы корзин гистограммы, секунды
+TRACE_BUCKETS: Final[tuple[float, ...]] = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+)
+UNKNOWN_HANDLER: Final[str] = "unhandled"
+
+
+@dataclasses.dataclass
+class Span:
+    calls: int = 0
+    seconds: float = 0.0
+
+
+@dataclasses.dataclass
+class UpdateTrace:
+    event_type: str
+    started: float = dataclasses.field(default_factory=time.perf_counter)
+    handler: str | None = None
+    spans: dict[str, Span] = dataclasses.field(default_factory=dict)
+
+    def record(self, kind: str, seconds: float) -> None:
+        span = self.spans.setdefault(kind, Span())
+        span.calls += 1
+        span.seconds += seconds
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def describe(self) -> str:
+        parts = [
+            f"{kind} {span.calls}x{span.seconds * 1000:.1f}мс"
+            for kind, span in self.spans.items()
+        ]
+        return ", ".join(parts) or "без внешних вызовов"
+
+
+_current_trace: ContextVar[UpdateTrace | None] = ContextVar(
+    "current_trace", default=None
+)
+
+
+def current_trace() -> UpdateTrace | None:
+    return _current_trace.get()
+
+
+def start_trace(event_type: str) -> tuple[UpdateTrace, Any]:
+    trace = UpdateTrace(event_type)
+    return trace, _current_trace.set(trace)
+
+
+def finish_trace(token: Any) -> None:
+    _current_trace.reset(token)
+
+
+def record(kind: str, seconds: float) -> None:
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.record(kind, seconds)
+
+
+@dataclasses.dataclass
+class Histogram:
+    buckets: list[int] = dataclasses.field(
+        default_factory=lambda: [0] * (len(TRACE_BUCKETS) + 1)
+    )
+    count: int = 0
+    total: float = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.buckets[bisect.bisect_left(TRACE_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def quantile(self, q: float) -> float:
+        """Оценка квантиля сверху: граница корзины, где он лежит."""
+        rank = q * self.count
+        seen = 0
+        for bound, hits in zip(TRACE_BUCKETS, self.buckets):
+            seen += hits
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class TraceRegistry:
+    def __init__(self) -> None:
+        self._histograms: dict[tuple[str, str], Histogram] = {}
+
+    def observe(self, trace: UpdateTrace, total: float) -> None:
+        handler = trace.handler or UNKNOWN_HANDLER
+        self._histogram(handler, KIND_TOTAL).observe(total)
+        for kind in TRACE_KINDS:
+            span = trace.spans.get(kind)
+            self._histogram(handler, kind).observe(span.seconds if span else 0.0)
+
+    def _histogram(self, handler: str, kind: str) -> Histogram:
+        key = (handler, kind)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = Histogram()
+        return histogram
+
+    def reset(self) -> None:
+        self._histograms.clear()
+
+    def summary(self, limit: int = 15) -> list[str]:
+        """Самые частые обработчики: число апдейтов, среднее и p95."""
+        totals = sorted(
+            (
+                (handler, histogram)
+                for (handler, kind), histogram in self._histograms.items()
+                if kind == KIND_TOTAL
+            ),
+            key=lambda item: item[1].count,
+            reverse=True,
+        )
+        lines = []
+        for handler, histogram in totals[:limit]:
+            average = histogram.total / histogram.count * 1000
+            p95 = histogram.quantile(0.95) * 1000
+            lines.append(
+                f"{handler}: {histogram.count} шт., "
+                f"в среднем {average:.0f} мс, p95 до {p95:.0f} мс"
+            )
+        return lines
+
+    def export(self) -> str:
+        """Гистограммы в текстовом формате Prometheus."""
+        name = "manager_update_seconds"
+        lines = [
+            f"# HELP {name} Update handling time by handler and kind.",
+            f"# TYPE {name} histogram",
+        ]
+        for (handler, kind), histogram in sorted(self._histograms.items()):
+            labels = f'handler="{handler}",kind="{kind}"'
+            seen = 0
+            for bound, hits in zip(TRACE_BUCKETS, histogram.buckets):
+                seen += hits
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {seen}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+            lines.append(f"{name}_sum{{{labels}}} {histogram.total:.6f}")
+            lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+trace_registry: Final = TraceRegistry()
+
+
+def _before_cursor_execute(
+    conn: Any,
+    cursor: Any,
+    statement: str,
+    parameters: Any,
+    context: Any,
+    executemany: bool,
+) -> None:
+    context._trace_started = time.perf_counter()
+
+
+def _after_cursor_execute(
+    conn: Any,
+    cursor: Any,
+    statement: str,
+    parameters: Any,
+    context: Any,
+    executemany: bool,
+) -> None:
+    started = getattr(context, "_trace_started", None)
+    if started is not None:
+        record(KIND_DB, time.perf_counter() - started)
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _timed(func: Any) -> Any:
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            record(KIND_REDIS, time.perf_counter() - started)
+
+    return wrapper
+
+
+def instrument_redis(redis: Redis) -> None:
+    """Оборачивает команды клиента и ``execute`` его пайплайнов.
+
+    Пайплайн считается одним вызовом: это один round trip.
+    """
+    redis.execute_command = _timed(redis.execute_command)  # type: ignore[method-assign]
+    make_pipeline = redis.pipeline
+
+    @functools.wraps(make_pipeline)
+    def pipeline(*args: Any, **kwargs: Any) -> Any:
+        pipe = make_pipeline(*args, **kwargs)
+        pipe.execute = _timed(pipe.execute)
+        return pipe
+
+    redis.pipeline = pipeline  # type: ignore[method-assign]
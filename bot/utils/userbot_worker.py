@@ -0,0 +1,210 @@
+"""Воркер мультиплексного режима: много сессий юзербота в одном процессе.
+
+Скрипт запускается интерпретатором юзербота из каталога его проекта и не
+импортирует ничего из менеджера (пакеты обоих проектов называются ``bot``)::
+
+    python userbot_worker.py --socket PATH --entrypoint bot.runner:run
+
+``entrypoint`` - корутина ``run(path_session, api_id, api_hash)`` юзербота,
+работающая до отмены. Управление - JSON lines по unix-сокету, один запрос и
+один ответ на соединение:
+
+    {"op": "start", "phone": ..., "path_session": ..., "api_id": ..., "api_hash": ...}
+    {"op": "stop", "phone": ...}
+    {"op": "status"}  -> {"ok": true, "sessions": {phone: {"state", "restarts"}}}
+    {"op": "ping"}
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import contextvars
+import importlib
+import json
+import logging
+import os
+import signal
+import sys
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any, Final
+
+READY_GRACE_SECONDS: Final[float] = 2.0
+RESTART_BACKOFF_BASE: Final[float] = 1.0
+RESTART_BACKOFF_MAX: Final[float] = 300.0
+STABLE_UPTIME_SECONDS: Final[float] = 60.0
+
+logger = logging.getLogger("userbot_worker")
+current_phone: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "current_phone", default="-"
+)
+
+Entrypoint = Callable[[str, int, str], Awaitable[None]]
+
+
+class _PhoneFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.phone = current_phone.get()
+        return True
+
+
+class _Session:
+    def __init__(self, phone: str, path_session: str, api_id: int, api_hash: str):
+        self.phone = phone
+        self.args = (path_session, api_id, api_hash)
+        self.state = "starting"
+        self.restarts = 0
+        self.task: asyncio.Task[None] | None = None
+
+    def as_dict(self) -> dict[str, Any]:
+        return {"state": self.state, "restarts": self.restarts}
+
+
+class Worker:
+    def __init__(self, entrypoint: Entrypoint) -> None:
+        self._entrypoint = entrypoint
+        self._sessions: dict[str, _Session] = {}
+
+    async def _run_session(self, session: _Session) -> None:
+        current_phone.set(session.phone)
+        failures = 0
+        while True:
+            started = time.monotonic()
+            run = asyncio.ensure_future(self._entrypoint(*session.args))
+            try:
+                done, _ = await asyncio.wait({run}, timeout=READY_GRACE_SECONDS)
+                if not done:
+                    session.state = "running"
+                await run
+                logger.warning("Сессия завершилась сама")
+            except Exception:  # noqa: BLE001
+                logger.exception("Сессия упала")
+            finally:
+                # Отмена во время ожидания готовности не должна оставлять
+                # сессию работать без присмотра
+                if not run.done():
+                    run.cancel()
+                    with contextlib.suppress(BaseException):
+                        await run
+
+            if session.state != "running":
+                # Упала до готовности (например, не авторизована)
+                session.state = "failed"
+                return
+
+            uptime = time.monotonic() - started
+            if uptime >= STABLE_UPTIME_SECONDS:
+                failures = 0
+            failures += 1
+            delay = min(RESTART_BACKOFF_BASE * 2 ** (failures - 1), RESTART_BACKOFF_MAX)
+            session.state = "backoff"
+            await asyncio.sleep(delay)
+            session.restarts += 1
+            session.state = "starting"
+
+    def start(self, phone: str, path_session: str, api_id: int, api_hash: str) -> None:
+        current = self._sessions.get(phone)
+        if current and current.state != "failed":
+            return
+        session = _Session(phone, path_session, api_id, api_hash)
+        session.task = asyncio.create_task(self._run_session(session))
+        self._sessions[phone] = session
+        logger.info("Сессия %s запущена", phone)
+
+    async def stop(self, phone: str) -> bool:
+        session = self._sessions.pop(phone, None)
+        if session is None or session.task is None:
+            return False
+        session.task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await session.task
+        logger.info("Сессия %s остановлена", phone)
+        return True
+
+    async def stop_all(self) -> None:
+        for phone in list(self._sessions):
+            await self.stop(phone)
+
+    def status(self) -> dict[str, Any]:
+        return {phone: s.as_dict() for phone, s in self._sessions.items()}
+
+    async def handle(self, request: dict[str, Any]) -> dict[str, Any]:
+        op = request.get("op")
+        if op == "ping":
+            return {"ok": True}
+        if op == "status":
+            return {"ok": True, "sessions": self.status()}
+        if op == "start":
+            self.start(
+                request["phone"],
+                request["path_session"],
+                int(request["api_id"]),
+                request["api_hash"],
+            )
+            return {"ok": True}
+        if op == "stop":
+            return {"ok": await self.stop(request["phone"])}
+        return {"ok": False, "error": f"unknown op: {op}"}
+
+    async def serve_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            line = await reader.readline()
+            try:
+                response = await self.handle(json.loads(line))
+            except (ValueError, KeyError, TypeError) as exc:
+                response = {"ok": False, "error": str(exc)}
+            writer.write(json.dumps(response).encode() + b"\n")
+            await writer.drain()
+        finally:
+            writer.close()
+
+
+def _load_entrypoint(path: str) -> Entrypoint:
+    module_name, _, attr = path.partition(":")
+    return getattr(importlib.import_module(module_name), attr or "run")
+
+
+async def _main(args: argparse.Namespace) -> None:
+    worker = Worker(_load_entrypoint(args.entrypoint))
+    with contextlib.suppress(FileNotFoundError):
+        os.unlink(args.socket)
+    server = await asyncio.start_unix_server(worker.serve_client, path=args.socket)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    logger.info("Воркер слушает %s", args.socket)
+    async with server:
+        await stop.wait()
+    await worker.stop_all()
+    with contextlib.suppress(FileNotFoundError):
+        os.unlink(args.socket)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--socket", required=True)
+    parser.add_argument("--entrypoint", required=True)
+    args = parser.parse_args()
+
+    # Скрипт лежит в пакете менеджера: импорты должны идти из проекта юзербота
+    sys.path[0] = os.getcwd()
+
+    handler = logging.StreamHandler()
+    handler.addFilter(_PhoneFilter())
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s [%(phone)s] %(name)s: %(message)s",
+        handlers=[handler],
+    )
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
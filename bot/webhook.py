@@ -0,0 +1,133 @@
+"""Прием апдейтов через вебхук вместо long polling.
+
+aiohttp-сервер проверяет заголовок ``X-Telegram-Bot-Api-Secret-Token`` и
+передает апдейт в ``Dispatcher.feed_update``. Одновременно обрабатывается
+не больше ``concurrency`` апдейтов: когда все слоты заняты, ответ Telegram
+задерживается, и он сам притормаживает доставку.
+
+Апдейт подтверждается (200) только после ``feed_update``: если процесс
+упадет раньше, Telegram пришлет апдейт снова (доставка "хотя бы один
+раз"). Обработка идет в отдельной задаче, поэтому обрыв соединения ее не
+прерывает; при штатной остановке (SIGTERM/SIGINT) сервер перестает
+принимать новые апдейты и дожидается начатых.
+
+Реплик может быть несколько: юзерботами и планировщиком занимается только
+ведущая, см. ``bot.utils.leader``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hmac
+import logging
+import signal
+from typing import TYPE_CHECKING, Any, Final
+
+from aiohttp import web
+from aiogram.types import Update
+
+if TYPE_CHECKING:
+    from aiogram import Bot, Dispatcher
+
+    from bot.settings import WebhookSettings
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER: Final[str] = "X-Telegram-Bot-Api-Secret-Token"
+# Предел max_connections в setWebhook
+MAX_WEBHOOK_CONNECTIONS: Final[int] = 100
+STOP_SIGNALS: Final[tuple[signal.Signals, ...]] = (signal.SIGTERM, signal.SIGINT)
+
+
+class WebhookServer:
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        settings: WebhookSettings,
+    ) -> None:
+        self._dispatcher = dispatcher
+        self._bot = bot
+        self._settings = settings
+        self._secret = settings.secret.encode()
+        self._semaphore = asyncio.Semaphore(settings.concurrency)
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post(self._settings.path, self.handle)
+        app.router.add_get("/healthz", self.health)
+        return app
+
+    async def health(self, request: web.Request) -> web.Response:
+        return web.Response(text="ok")
+
+    async def handle(self, request: web.Request) -> web.Response:
+        secret = request.headers.get(SECRET_HEADER, "").encode()
+        if not hmac.compare_digest(secret, self._secret):
+            return web.Response(status=401)
+        try:
+            update = Update.model_validate(
+                await request.json(), context={"bot": self._bot}
+            )
+        except ValueError:
+            logger.warning("Некорректный апдейт от %s", request.remote)
+            return web.Response(status=400)
+
+        await self._semaphore.acquire()
+        task = asyncio.create_task(self._process(update))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        await asyncio.shield(task)
+        return web.Response()
+
+    async def _process(self, update: Update) -> None:
+        try:
+            await self._dispatcher.feed_update(self._bot, update)
+        except Exception:
+            logger.exception("Ошибка обработки апдейта %s", update.update_id)
+        finally:
+            self._semaphore.release()
+
+    async def serve(self, **workflow_data: Any) -> None:
+        """Ставит вебхук и держит сервер до SIGTERM/SIGINT или отмены."""
+        await self._dispatcher.emit_startup(
+            bot=self._bot, dispatcher=self._dispatcher, **workflow_data
+        )
+        runner = web.AppRunner(self.app())
+        await runner.setup()
+        site = web.TCPSite(runner, self._settings.host, self._settings.port)
+        loop = asyncio.get_running_loop()
+        stop = asyncio.Event()
+        for sig in STOP_SIGNALS:
+            loop.add_signal_handler(sig, stop.set)
+        try:
+            await site.start()
+            await self._bot.set_webhook(
+                url=self._settings.url.rstrip("/") + self._settings.path,
+                secret_token=self._settings.secret,
+                allowed_updates=self._dispatcher.resolve_used_update_types(),
+                max_connections=min(
+                    self._settings.concurrency, MAX_WEBHOOK_CONNECTIONS
+                ),
+                # Ожидающие апдейты не теряются при перезапуске
+                drop_pending_updates=False,
+            )
+            logger.info(
+                "Вебхук слушает %s:%s%s",
+                self._settings.host,
+                self._settings.port,
+                self._settings.path,
+            )
+            await stop.wait()
+            logger.info("Получен сигнал остановки, вебхук завершается")
+        finally:
+            for sig in STOP_SIGNALS:
+                loop.remove_signal_handler(sig)
+            await runner.cleanup()
+            if self._tasks:
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+            await self._dispatcher.emit_shutdown(
+                bot=self._bot, dispatcher=self._dispatcher, **workflow_data
+            )
+            await self._bot.session.close()
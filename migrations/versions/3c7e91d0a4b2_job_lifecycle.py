@@ -0,0 +1,50 @@
+"""job lifecycle: status and timestamps
+
+Revision ID: 3c7e91d0a4b2
+Revises: e1f931b7a0e5
+Create Date: 2026-10-19
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "3c7e91d0a4b2"
+down_revision = "e1f931b7a0e5"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "jobs",
+        sa.Column(
+            "status", sa.String(length=20), nullable=False, server_default="pending"
+        ),
+    )
+    op.add_column(
+        "jobs",
+        sa.Column(
+            "created_at", sa.DateTime(), nullable=False, server_default=sa.func.now()
+        ),
+    )
+    op.add_column("jobs", sa.Column("answered_at", sa.DateTime(), nullable=True))
+
+    # Уже отвеченные задачи сразу считаем завершенными, чтобы их подобрал GC.
+    op.execute(
+        "UPDATE jobs SET status = 'done', answered_at = NOW() "
+        "WHERE answer IS NOT NULL"
+    )
+
+    op.create_index("ix_jobs_created_at", "jobs", ["created_at"])
+    op.create_index("ix_jobs_status_answered_at", "jobs", ["status", "answered_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_jobs_status_answered_at", table_name="jobs")
+    op.drop_index("ix_jobs_created_at", table_name="jobs")
+    op.drop_column("jobs", "answered_at")
+    op.drop_column("jobs", "created_at")
+    op.drop_column("jobs", "status")
@@ -0,0 +1,27 @@
+"""bot session_missing_since
+
+Revision ID: 5b8d2e4f7a19
+Revises: 8a41f6c2d9e7
+Create Date: 2026-10-19
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "5b8d2e4f7a19"
+down_revision = "8a41f6c2d9e7"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "bots", sa.Column("session_missing_since", sa.DateTime(), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("bots", "session_missing_since")
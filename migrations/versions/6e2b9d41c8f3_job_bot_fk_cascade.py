@@ -0,0 +1,39 @@
+"""jobs.bot_id: ON DELETE CASCADE
+
+Revision ID: 6e2b9d41c8f3
+Revises: d4f0a83c6b15
+Create Date: 2026-10-19
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "6e2b9d41c8f3"
+down_revision = "d4f0a83c6b15"
+branch_labels = None
+depends_on = None
+
+FK_NAME = "fk_jobs_bot_id_bots"
+
+
+def _drop_bot_fk() -> None:
+    # Таблица создавалась create_all, имя ключа сгенерировал MySQL
+    inspector = sa.inspect(op.get_bind())
+    for fk in inspector.get_foreign_keys("jobs"):
+        if fk["referred_table"] == "bots" and fk["name"]:
+            op.drop_constraint(fk["name"], "jobs", type_="foreignkey")
+
+
+def upgrade() -> None:
+    _drop_bot_fk()
+    op.create_foreign_key(
+        FK_NAME, "jobs", "bots", ["bot_id"], ["id"], ondelete="CASCADE"
+    )
+
+
+def downgrade() -> None:
+    _drop_bot_fk()
+    op.create_foreign_key(FK_NAME, "jobs", "bots", ["bot_id"], ["id"])
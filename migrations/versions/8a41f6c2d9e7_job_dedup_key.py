@@ -0,0 +1,27 @@
+"""job dedup key
+
+Revision ID: 8a41f6c2d9e7
+Revises: 3c7e91d0a4b2
+Create Date: 2026-10-19
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "8a41f6c2d9e7"
+down_revision = "3c7e91d0a4b2"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("jobs", sa.Column("dedup_key", sa.String(length=40), nullable=True))
+    op.create_unique_constraint("uq_jobs_dedup_key", "jobs", ["dedup_key"])
+
+
+def downgrade() -> None:
+    op.drop_constraint("uq_jobs_dedup_key", "jobs", type_="unique")
+    op.drop_column("jobs", "dedup_key")
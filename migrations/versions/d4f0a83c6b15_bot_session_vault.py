@@ -0,0 +1,30 @@
+"""bot session vault
+
+Revision ID: d4f0a83c6b15
+Revises: 5b8d2e4f7a19
+Create Date: 2026-10-19
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision = "d4f0a83c6b15"
+down_revision = "5b8d2e4f7a19"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("bots", sa.Column("session_data", mysql.MEDIUMBLOB(), nullable=True))
+    op.add_column(
+        "bots", sa.Column("session_synced_at", sa.DateTime(), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("bots", "session_synced_at")
+    op.drop_column("bots", "session_data")
@@ -0,0 +1,28 @@
+"""Разбор файлов массового импорта аккаунтов."""
+
+from __future__ import annotations
+
+import io
+import zipfile
+
+from bot.utils.account_import import parse_import_file
+
+
+def test_csv_repeated_phone_is_imported_once() -> None:
+    text = "phone,api_id,api_hash\n+7 900 111,1,aaa\n7900111,2,bbb\n7900222,3,ccc\n"
+    rows = parse_import_file("accounts.csv", text.encode())
+    assert [(row.phone, row.api_id, row.api_hash) for row in rows] == [
+        ("7900111", 2, "bbb"),
+        ("7900222", 3, "ccc"),
+    ]
+
+
+def test_zip_matches_session_to_csv_row() -> None:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("accounts.csv", "7900111,1,aaa\n7900111,1,aaa\n")
+        archive.writestr("sessions/+7900111.session", b"data")
+    rows = parse_import_file("accounts.zip", buffer.getvalue())
+    assert len(rows) == 1
+    assert rows[0].session_data == b"data"
+    assert rows[0].api_hash == "aaa"
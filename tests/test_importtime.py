@@ -0,0 +1,47 @@
+"""Бюджет времени импорта ``bot.handlers``.
+
+Тяжелые библиотеки (Telethon, psutil) должны грузиться лениво, при первом
+обращении к ``fn.Telethon``/``fn.Manager``. Время собственных модулей
+``bot.*`` (self time из ``-X importtime``) не зависит от aiogram и других
+зависимостей, поэтому бюджет на него ловит регрессии в коде проекта.
+"""
+
+from __future__ import annotations
+
+import subprocess
+import sys
+from pathlib import Path
+
+LAZY_MODULES = ("telethon", "psutil")
+# Сейчас около 120 мс; запас на медленные машины CI
+OWN_IMPORT_BUDGET_US = 400_000
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _import_times(statement: str) -> dict[str, int]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        cwd=ROOT,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line.removeprefix("import time:").split("|")
+        times[name.strip()] = int(self_us)
+    return times
+
+
+def test_heavy_modules_are_lazy() -> None:
+    times = _import_times("import bot.handlers")
+    eager = sorted(name for name in times if name.split(".")[0] in LAZY_MODULES)
+    assert not eager, f"eager imports: {eager}"
+
+
+def test_own_modules_import_budget() -> None:
+    times = _import_times("import bot.handlers")
+    own = sum(us for name, us in times.items() if name.split(".")[0] == "bot")
+    assert own <= OWN_IMPORT_BUDGET_US, f"bot.* import took {own} us"